@@ -0,0 +1,365 @@
+import os
+import time
+import signal
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from watchdog.events import FileSystemEventHandler
+import collectionwitharch as collector
+from shift_schedule import ShiftScheduler, JobThrottle, shift_starts
+from transfer_control import FairTransferQueue
+from jpeg_validation import InvalidJPEGError
+from fs_walker import walk_files, JPEG_EXTENSIONS
+from share_manifest import list_share_files
+
+# Seconds a file must go without new events before it is copied (stations write in several steps)
+debounce_seconds = 2.0
+
+# Concurrent copies (worker tasks, each running its copy on the thread pool)
+copy_workers = 8
+
+# Seconds before a copy is given up and retried, and the number of attempts per file
+copy_timeout = 120
+copy_retries = 3
+retry_delay = 5
+
+heartbeat_interval = 60  # Print a heartbeat every 60 seconds
+
+class EventBridge(FileSystemEventHandler):
+    """Hands watchdog events of one production line over to the event loop."""
+
+    def __init__(self, core, line):
+        self.core = core
+        self.line = line
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ('created', 'modified', 'moved', 'closed'):
+            return
+        path = event.dest_path if event.event_type == 'moved' else event.src_path
+        if path.lower().endswith(JPEG_EXTENSIONS):
+            self.core.loop.call_soon_threadsafe(self.core.file_seen, self.line, path)
+
+def scan_share(line):
+    """List the JPEG files already on a production line's share (from its manifest if fresh)."""
+    share_path = collector.get_share_path(line)
+    if collector.use_share_manifests:
+        return [record.path for record in list_share_files(share_path, JPEG_EXTENSIONS)]
+    return [record.path for record in walk_files(share_path, JPEG_EXTENSIONS, stat=False)]
+
+def copy_file(line, source_file, live=True):
+    """
+    Copy one station file to the central store unless it was already archived.
+
+    Live files have transfer priority over backlog files (see transfer_control.py).
+
+    Returns:
+        str or None: Destination path, or None when the file was skipped
+    """
+    if collector.file_exists_in_archive(os.path.basename(source_file), line['alias']):
+        print(f"[{line['alias']}] File {os.path.basename(source_file)} already exists in archive. Skipping...")
+        with collector.processed_files_lock:
+            collector.processed_files.add(source_file)
+        return None
+    if not os.path.exists(source_file):
+        # Removed or renamed by the station before it settled
+        return None
+    return collector.copy_to_central(source_file, line, live)
+
+def copy_or_quarantine(line, source_file, live, final):
+    """
+    copy_file, handing files that fail JPEG validation to the quarantine policy.
+
+    A file that is not quarantined yet raises again, so the copy worker retries it later.
+    """
+    try:
+        return copy_file(line, source_file, live)
+    except InvalidJPEGError as e:
+        if collector.handle_invalid_image(source_file, line, e, final):
+            return None
+        raise
+
+def count_pending_files(alias):
+    """Count JPEG files waiting in the centralized folder of a line (from the file journal)."""
+    return collector.get_journal().count_files(alias, 'central')
+
+class CollectorCore:
+    """
+    Collector running on one asyncio event loop for all production lines.
+
+    Watchdog events (one observer thread for all lines) are debounced per file, deduplicated
+    and queued; copy workers run the blocking copies on a thread pool with a timeout, and
+    archival and heartbeat are timed tasks instead of a polling loop.
+    """
+
+    def __init__(self, lines=None):
+        self.lines = lines or collector.PRODUCTION_LINES
+        self.loop = None
+        self.observer = None
+        self.executor = None
+        self.copy_queue = None
+        self.stop_event = None
+        self.settled = None
+        self.connected_lines = []
+        # Path -> (line, loop time of the latest event)
+        self.pending = {}
+        # Paths queued or being copied
+        self.in_flight = set()
+        self.counts = {'copied': 0, 'skipped': 0, 'failed': 0, 'retried': 0}
+        self.next_archive = None
+        self.ingest_pool = None
+
+    def file_seen(self, line, path):
+        """Record an event for a file; it is queued once no event arrived for debounce_seconds."""
+        self.pending[path] = (line, self.loop.time())
+        collector.get_latency_tracker().mark_detected(line['alias'], os.path.basename(path))
+        self.settled.set()
+
+    def is_done_or_queued(self, path):
+        with collector.processed_files_lock:
+            if path in collector.processed_files:
+                return True
+        return path in self.in_flight
+
+    async def enqueue(self, line, path, live=True):
+        if self.is_done_or_queued(path):
+            return
+        self.in_flight.add(path)
+        await self.copy_queue.put(line['alias'], (line, path, 1), live)
+
+    async def debounce(self):
+        """Move files that have been quiet for debounce_seconds into the copy queue."""
+        while True:
+            now = self.loop.time()
+            ready = [path for path, (_, seen) in self.pending.items() if now - seen >= debounce_seconds]
+            for path in ready:
+                line, _ = self.pending.pop(path)
+                await self.enqueue(line, path)
+
+            timeout = None
+            if self.pending:
+                timeout = max(min(seen for _, seen in self.pending.values()) + debounce_seconds - self.loop.time(), 0)
+            self.settled.clear()
+            try:
+                await asyncio.wait_for(self.settled.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait_for_late_copy(self, line, path, copy):
+        """
+        Wait for a copy that timed out to finish on its thread (it cannot be interrupted).
+
+        Returns:
+            bool: True if the copy succeeded after all
+        """
+        try:
+            dest_file = await copy
+        except Exception:
+            return False
+        if dest_file:
+            print(f"[{line['alias']}] Copy of {path} finished after timing out")
+            self.counts['copied'] += 1
+            self.in_flight.discard(path)
+            return True
+        return False
+
+    async def retry_later(self, line, path, attempt, live, copy=None):
+        if copy is not None and await self.wait_for_late_copy(line, path, copy):
+            return
+        await asyncio.sleep(retry_delay)
+        await self.copy_queue.put(line['alias'], (line, path, attempt), live)
+
+    async def give_up_later(self, line, path, copy):
+        # The path stays in flight until the last copy thread has let go of it
+        if not await self.wait_for_late_copy(line, path, copy):
+            self.counts['failed'] += 1
+            self.in_flight.discard(path)
+
+    async def copy_worker(self):
+        """Take files from the copy queue (live first, lines in turn) and copy them on the thread pool."""
+        while True:
+            (line, path, attempt), live = await self.copy_queue.get()
+            copy = self.loop.run_in_executor(self.executor, copy_or_quarantine, line, path, live,
+                                             attempt >= copy_retries)
+            try:
+                # Shielded: a timeout stops the wait, not the copy thread
+                dest_file = await asyncio.wait_for(asyncio.shield(copy), copy_timeout)
+                self.counts['copied' if dest_file else 'skipped'] += 1
+                self.in_flight.discard(path)
+            except Exception as e:
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                reason = 'timed out' if timed_out else str(e)
+                if attempt < copy_retries:
+                    print(f"[{line['alias']}] Copy of {path} failed ({reason}), retrying...")
+                    self.counts['retried'] += 1
+                    asyncio.ensure_future(self.retry_later(line, path, attempt + 1, live, copy if timed_out else None))
+                else:
+                    print(f"[{line['alias']}] Giving up on {path} after {attempt} attempts: {reason}")
+                    if timed_out:
+                        asyncio.ensure_future(self.give_up_later(line, path, copy))
+                    else:
+                        self.counts['failed'] += 1
+                        self.in_flight.discard(path)
+
+    async def queue_existing_files(self):
+        """Queue the files already on the shares (the watcher is running, so nothing is missed)."""
+        for line in self.connected_lines:
+            files = await self.loop.run_in_executor(self.executor, scan_share, line)
+            print(f"[{line['alias']}] Found {len(files)} existing files")
+            for path in files:
+                await self.enqueue(line, path, live=False)
+
+    def ingest_busy(self):
+        """True while live files are settling or being copied (archival backs off then)."""
+        return bool(self.pending) or bool(self.in_flight)
+
+    async def archive_scheduler(self):
+        """Run archive_files at every shift boundary, first catching up boundaries missed while stopped."""
+        scheduler = ShiftScheduler(collector.shift_state_path)
+        while True:
+            due_boundaries = scheduler.due_boundaries()
+            if due_boundaries:
+                if len(due_boundaries) > 1:
+                    print(f"\nCatching up {len(due_boundaries)} missed shift boundaries (since {due_boundaries[0]})")
+                print(f"\n*** ARCHIVE TRIGGER *** Shift ended at {due_boundaries[-1]}. Starting archival process...")
+                await self.loop.run_in_executor(self.executor, collector.archive_files,
+                                                JobThrottle(self.ingest_busy))
+                if collector.tiering_enabled:
+                    await self.loop.run_in_executor(self.executor, collector.tier_archive, JobThrottle(self.ingest_busy))
+                    await self.loop.run_in_executor(self.executor, collector.reconcile_journal)
+                scheduler.mark_done(due_boundaries[-1])
+                print("*** ARCHIVE COMPLETED ***")
+
+            self.next_archive = scheduler.next_boundary().timestamp()
+            # Wake at least once a minute so wall-clock changes do not delay a boundary
+            await asyncio.sleep(min(max(self.next_archive - time.time(), 0), 60))
+
+    async def heartbeat(self):
+        """Print the collector state every heartbeat_interval seconds."""
+        while True:
+            await asyncio.sleep(heartbeat_interval)
+            print(f"\n[Heartbeat] Monitoring active at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            if not self.observer.is_alive():
+                print("Observer thread has died. Consider restarting the application.")
+            print(f"Active lines: {', '.join(line['alias'] for line in self.connected_lines)}")
+            print(f"Settling: {len(self.pending)}, queued: {self.copy_queue.qsize()} "
+                  f"(backlog: {self.copy_queue.backlog_size()}), "
+                  f"copied: {self.counts['copied']}, skipped: {self.counts['skipped']}, "
+                  f"retried: {self.counts['retried']}, failed: {self.counts['failed']}")
+            if self.next_archive:
+                next_archive = datetime.fromtimestamp(self.next_archive)
+                print(f"Next archive check: {next_archive.strftime('%Y-%m-%d %H:%M:%S')} "
+                      f"(in {int(self.next_archive - time.time())} seconds)")
+            collector.get_transfer_limiter().print_stats()
+            collector.print_corruption_counts()
+            collector.get_latency_tracker().print_stats()
+            await self.loop.run_in_executor(self.executor, collector.print_ingest_counts, self.ingest_pool)
+            for line in self.lines:
+                file_count = await self.loop.run_in_executor(self.executor, count_pending_files, line['alias'])
+                print(f"  {line['alias']}: {file_count} JPEG files pending archive")
+
+    async def connect_lines(self):
+        """Connect every production line share, keeping the lines that are accessible."""
+        for line in self.lines:
+            folder_to_watch = collector.get_share_path(line)
+            print(f"\n[{line['alias']}] Attempting to connect: {folder_to_watch}")
+            connected = await self.loop.run_in_executor(self.executor, collector.connect_to_shared_folder, line)
+            if not connected:
+                print(f"[{line['alias']}] Failed to connect to {folder_to_watch}. Skipping...")
+                continue
+            self.connected_lines.append(line)
+            print(f"[{line['alias']}] Successfully connected to {folder_to_watch}")
+
+    def request_stop(self, sig=None, frame=None):
+        print("\nShutdown signal received. Stopping monitoring...")
+        self.loop.call_soon_threadsafe(self.stop_event.set)
+
+    async def run(self):
+        """Run the collector until SIGINT/SIGTERM."""
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=copy_workers)
+        self.copy_queue = FairTransferQueue()
+        self.stop_event = asyncio.Event()
+        self.settled = asyncio.Event()
+
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+
+        tasks = []
+        try:
+            await self.connect_lines()
+            if not self.connected_lines:
+                print("No production lines could be connected. Exiting...")
+                return
+
+            # Ingest jobs are queued by collector.copy_to_central
+            self.ingest_pool = collector.start_ingest_pool()
+
+            # Catch up on changes to the store since the last run; files collected before
+            # the restart are not queued again
+            await self.loop.run_in_executor(self.executor, collector.reconcile_journal)
+            with collector.processed_files_lock:
+                collector.processed_files.update(collector.get_journal().get_sources())
+
+            self.observer = collector.create_observer()
+            for line in self.connected_lines:
+                self.observer.schedule(EventBridge(self, line), collector.get_share_path(line), recursive=True)
+            self.observer.start()
+
+            tasks.append(asyncio.ensure_future(self.debounce()))
+            tasks.extend(asyncio.ensure_future(self.copy_worker()) for _ in range(copy_workers))
+            if collector.archive_at_shift_end:
+                tasks.append(asyncio.ensure_future(self.archive_scheduler()))
+            tasks.append(asyncio.ensure_future(self.heartbeat()))
+
+            print(f"\nMonitoring started for {len(self.connected_lines)} production lines:")
+            for line in self.connected_lines:
+                print(f"- {line['alias']} ({collector.get_share_path(line)}) - Suffix: {line['suffix']}")
+            print(f"Output directory: {collector.centralized_folder}")
+            print(f"Archive directory: {collector.archive_base_folder}")
+            print(f"Shift starts: {', '.join(shift_starts)}")
+            print("\nPress Ctrl+C to stop monitoring...")
+
+            await self.queue_existing_files()
+            await self.stop_event.wait()
+        except Exception as e:
+            print(f"\nError in monitoring: {e}")
+        finally:
+            print("\nShutting down...")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.observer is not None:
+                self.observer.stop()
+                await self.loop.run_in_executor(None, self.observer.join, 5)
+            # Let copies already running on the pool finish
+            await self.loop.run_in_executor(None, self.executor.shutdown, True)
+            if self.ingest_pool is not None:
+                await self.loop.run_in_executor(None, self.ingest_pool.stop)
+            collector.close_ingest_queue()
+            collector.close_latency_tracker()
+
+            for line in self.connected_lines:
+                try:
+                    collector.get_backend().disconnect(line)
+                    print(f"[{line['alias']}] Disconnected from {collector.get_share_path(line)}")
+                except Exception as e:
+                    print(f"[{line['alias']}] Error disconnecting: {e}")
+            print(f"Copied: {self.counts['copied']}, skipped: {self.counts['skipped']}, failed: {self.counts['failed']}")
+            print("Monitoring stopped.")
+
+def start_monitoring():
+    """Start monitoring all production line shared folders on one event loop."""
+    asyncio.run(CollectorCore().run())
+
+if __name__ == "__main__":
+    os.makedirs(collector.centralized_folder, exist_ok=True)
+    os.makedirs(collector.archive_base_folder, exist_ok=True)
+
+    print("=" * 70)
+    print("MULTI PRODUCTION LINE MONITOR WITH ARCHIVAL (ASYNCIO CORE)")
+    print("=" * 70)
+    print(f"Debounce: {debounce_seconds}s, copy workers: {copy_workers}")
+    print(f"Shift Starts: {', '.join(shift_starts)}")
+    print("=" * 70)
+
+    start_monitoring()
@@ -0,0 +1,203 @@
+import os
+import csv
+import shutil
+import subprocess
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+
+from module_index import ModuleIndex, IMAGE_EXTENSIONS
+from shift_schedule import get_shift_name
+from fs_walker import find_files
+
+# Lossless recompression of cold-tier images: 'jxl' (JPEG XL lossless JPEG transcode, needs
+# cjxl/djxl), 'jpegtran' (Huffman table optimization, needs jpegtran) or 'auto' for the best
+# available. Both keep the JPEG's DCT coefficients; nothing is decoded and re-encoded.
+compression_method = 'auto'
+
+# jpegtran: arithmetic coding saves more than -optimize but not every viewer can read it
+arithmetic_coding = False
+
+# Tool paths (on PATH by default)
+CJXL = 'cjxl'
+DJXL = 'djxl'
+JPEGTRAN = 'jpegtran'
+
+# Per-file results (path, shift, method, original and stored bytes); also marks files as done
+COMPRESSION_LOG_NAME = 'compression_log.csv'
+LOG_COLUMNS = ['path', 'stored_path', 'shift', 'method', 'original_bytes', 'stored_bytes', 'compressed_at']
+
+def get_method(method=None):
+    """Resolve a compression method to one whose tools are installed, or None."""
+    method = method or compression_method
+    if method == 'auto':
+        if shutil.which(CJXL) and shutil.which(DJXL):
+            return 'jxl'
+        if shutil.which(JPEGTRAN):
+            return 'jpegtran'
+        return None
+    tools = {'jxl': [CJXL, DJXL], 'jpegtran': [JPEGTRAN]}[method]
+    return method if all(shutil.which(tool) for tool in tools) else None
+
+def run_tool(args):
+    result = subprocess.run(args, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise OSError(f"{os.path.basename(args[0])} failed: {result.stderr.strip()}")
+
+def decode_pixels(path):
+    with Image.open(path) as image:
+        return np.asarray(image)
+
+def restore_jpeg(jxl_path, jpeg_path):
+    """Reconstruct the original JPEG (bit for bit) from a JPEG XL transcode."""
+    run_tool([DJXL, jxl_path, jpeg_path])
+
+def compress_file(file_path, method):
+    """
+    Recompress one image next to the original and verify it (runs in a worker process).
+
+    jxl output is verified by reconstructing the JPEG and comparing bytes; jpegtran output
+    by decoding both files and comparing every pixel.
+
+    Returns:
+        tuple: (path, verified temp output, stored extension, original bytes, output bytes)
+    """
+    base = os.path.splitext(file_path)[0]
+    if method == 'jxl':
+        output = f"{base}.jxl.tmp"
+        check = f"{base}.check.jpg"
+        run_tool([CJXL, file_path, output, '--lossless_jpeg=1'])
+        try:
+            restore_jpeg(output, check)
+            with open(file_path, 'rb') as f, open(check, 'rb') as g:
+                if f.read() != g.read():
+                    raise ValueError(f"JPEG XL round trip differs from {file_path}")
+        except Exception:
+            os.remove(output)
+            raise
+        finally:
+            if os.path.exists(check):
+                os.remove(check)
+        extension = '.jxl'
+    else:
+        output = f"{base}.opt.tmp"
+        run_tool([JPEGTRAN, '-copy', 'all', '-arithmetic' if arithmetic_coding else '-optimize',
+                  '-outfile', output, file_path])
+        if not np.array_equal(decode_pixels(file_path), decode_pixels(output)):
+            os.remove(output)
+            raise ValueError(f"Recompressed pixels differ from {file_path}")
+        extension = os.path.splitext(file_path)[1]
+    return file_path, output, extension, os.path.getsize(file_path), os.path.getsize(output)
+
+def load_log(cold_folder):
+    """Rows of the compression log of a cold folder."""
+    log_path = os.path.join(cold_folder, COMPRESSION_LOG_NAME)
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, 'r', newline='') as f:
+        return list(csv.DictReader(f))
+
+def append_log(cold_folder, rows):
+    log_path = os.path.join(cold_folder, COMPRESSION_LOG_NAME)
+    new_file = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+def store_result(result, method, module_index):
+    """
+    Replace the original with a verified, smaller output. Returns the log row.
+
+    A jxl output gets its own extension, so the catalog is pointed at it through the
+    module index redirect table before the original is deleted.
+    """
+    file_path, output, extension, original_bytes, output_bytes = result
+    stored_path = file_path
+    if output_bytes < original_bytes:
+        shutil.copystat(file_path, output)
+        stored_path = os.path.splitext(file_path)[0] + extension
+        os.replace(output, stored_path)
+        if stored_path != file_path:
+            module_index.add_redirect(file_path, stored_path, 'cold')
+            os.remove(file_path)
+    else:
+        # Already as small as it gets; logged so it is not tried again
+        os.remove(output)
+        output_bytes = original_bytes
+    return {
+        'path': file_path,
+        'stored_path': stored_path,
+        'shift': get_shift_name(datetime.fromtimestamp(os.path.getmtime(stored_path))),
+        'method': method,
+        'original_bytes': original_bytes,
+        'stored_bytes': output_bytes,
+        'compressed_at': datetime.now().isoformat(sep=' ', timespec='seconds'),
+    }
+
+def compress_folder(module_index, cold_folder, method=None, max_workers=None):
+    """
+    Losslessly recompress the JPEGs on the cold tier that were not compressed yet, in a
+    process pool.
+
+    Returns:
+        int: Number of images processed
+    """
+    method = get_method(method)
+    if method is None:
+        print(f"No lossless JPEG recompression tool found ({CJXL}/{DJXL} or {JPEGTRAN}); skipping")
+        return 0
+
+    done = {row['path'] for row in load_log(cold_folder)}
+    file_paths = [path for path in find_files(cold_folder, IMAGE_EXTENSIONS) if path not in done]
+    if not file_paths:
+        return 0
+
+    print(f"Recompressing {len(file_paths)} cold images with {method}...")
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(compress_file, path, method): path for path in file_paths}
+        for future in as_completed(futures):
+            try:
+                rows.append(store_result(future.result(), method, module_index))
+            except Exception as e:
+                print(f"Error recompressing {futures[future]}: {e}")
+                continue
+            if len(rows) % 100 == 0:
+                append_log(cold_folder, rows[-100:])
+    append_log(cold_folder, rows[len(rows) // 100 * 100:])
+    print_savings(cold_folder)
+    return len(rows)
+
+def get_savings(cold_folder):
+    """
+    Savings per shift from the compression log.
+
+    Returns:
+        dict: shift -> {'files', 'original_bytes', 'stored_bytes'}
+    """
+    savings = {}
+    for row in load_log(cold_folder):
+        shift = savings.setdefault(row['shift'], {'files': 0, 'original_bytes': 0, 'stored_bytes': 0})
+        shift['files'] += 1
+        shift['original_bytes'] += int(row['original_bytes'])
+        shift['stored_bytes'] += int(row['stored_bytes'])
+    return savings
+
+def print_savings(cold_folder):
+    for shift, totals in sorted(get_savings(cold_folder).items()):
+        saved = totals['original_bytes'] - totals['stored_bytes']
+        print(f"  Shift {shift}: {totals['files']} images, saved {saved / (1024 * 1024):.1f} MB "
+              f"({saved / max(totals['original_bytes'], 1):.1%})")
+
+# Parameters
+cold_folder = "E:\\ELimages_cold"
+
+if __name__ == "__main__":
+    index = ModuleIndex()
+    try:
+        compress_folder(index, cold_folder)
+    finally:
+        index.close()
@@ -2,11 +2,13 @@ import json
 import os
 import time
 import shutil
-import win32net
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from datetime import datetime, timedelta
 import hashlib
+import threading
+from share_access import get_share_backend
+from fs_walker import walk_files, JPEG_EXTENSIONS
 
 # PC credentials for accessing shared folders
 PC_CREDENTIALS = [
@@ -23,6 +25,12 @@ PC_CREDENTIALS = [
 # Shared folder and local save directory
 SHARED_FOLDER_NAME = 'ELimages'
 
+# Share access backend: 'netuse', 'cifs', 'local' or 'auto' for the platform default (see share_access.py)
+share_backend_name = 'auto'
+
+# Share access backend, created on first use
+share_backend = None
+
 # Centralized server folder path
 centralized_folder = "D:\\ELimages\\Data_recieved"
 
@@ -38,6 +46,10 @@ ip_to_alias = {pc['address']: pc['alias'] for pc in PC_CREDENTIALS}
 # File processing record
 processed_files = set()
 
+# Names of the files in the archive, listed once on first use and kept up to date by archive_files
+archived_names = None
+archived_names_lock = threading.Lock()
+
 def is_network_path_accessible(path, max_retries=3, retry_delay=2):
     """Check if a network path is accessible with retries."""
     for attempt in range(max_retries):
@@ -49,19 +61,20 @@ def is_network_path_accessible(path, max_retries=3, retry_delay=2):
             time.sleep(retry_delay)
     return False
 
+def get_backend():
+    """Get the share access backend, creating it on first use."""
+    global share_backend
+    if share_backend is None:
+        share_backend = get_share_backend(SHARED_FOLDER_NAME, share_backend_name)
+    return share_backend
+
 # Function to connect to a shared folder
-def connect_to_shared_folder(address, username, password, max_retries=3, retry_delay=2):
+def connect_to_shared_folder(line, max_retries=3, retry_delay=2):
     """Enhanced connection function with retry logic."""
-    unc = f"\\\\{address}\\{SHARED_FOLDER_NAME}"
+    unc = get_backend().get_path(line)
     for attempt in range(max_retries):
         try:
-            win32net.NetUseAdd(None, 2, {
-                'remote': unc,
-                'password': password,
-                'username': username,
-                'asg_type': 0,
-                'local': '',
-            })
+            get_backend().connect(line)
             print(f"Connected to {unc}")
             # Verify the connection by checking if the path exists
             if is_network_path_accessible(unc):
@@ -74,13 +87,17 @@ def connect_to_shared_folder(address, username, password, max_retries=3, retry_d
                 time.sleep(retry_delay)
     return False
 
+def get_archived_names():
+    """Get the names of the archived files, walking the archive on first use."""
+    global archived_names
+    with archived_names_lock:
+        if archived_names is None:
+            archived_names = {record.name for record in walk_files(archive_base_folder, stat=False)}
+        return archived_names
+
 # Function to check if file exists in archive
 def file_exists_in_archive(file_path):
-    file_name = os.path.basename(file_path)
-    for root, dirs, files in os.walk(archive_base_folder):
-        if file_name in files:
-            return True
-    return False
+    return os.path.basename(file_path) in get_archived_names()
 
 # Function to get file hash
 def get_file_hash(file_path):
@@ -111,19 +128,18 @@ class JPEGFileHandler(FileSystemEventHandler):
 
 def process_existing_files():
     for pc in PC_CREDENTIALS:
-        folder_to_watch = f"\\\\{pc['address']}\\{SHARED_FOLDER_NAME}"
+        folder_to_watch = get_backend().get_path(pc)
         alias = ip_to_alias[pc['address']]
         source_folder = os.path.join(centralized_folder, alias)
         os.makedirs(source_folder, exist_ok=True)
         if os.path.exists(folder_to_watch):
-            for file_name in os.listdir(folder_to_watch):
-                file_path = os.path.join(folder_to_watch, file_name)
-                if os.path.isfile(file_path) and file_name.lower().endswith(('.jpg', '.jpeg')):
-                    if file_path not in processed_files and not file_exists_in_archive(file_path):
-                        destination = os.path.join(source_folder, file_name)
-                        shutil.copy2(file_path, destination)
-                        processed_files.add(file_path)
-                        print(f"Existing JPEG file copied to centralized server: {destination}")
+            for record in walk_files(folder_to_watch, JPEG_EXTENSIONS, stat=False, recursive=False):
+                file_path = record.path
+                if file_path not in processed_files and not file_exists_in_archive(file_path):
+                    destination = os.path.join(source_folder, record.name)
+                    shutil.copy2(file_path, destination)
+                    processed_files.add(file_path)
+                    print(f"Existing JPEG file copied to centralized server: {destination}")
 
 def start_monitoring():
     observer = None
@@ -155,11 +171,11 @@ def start_monitoring():
             if not running:
                 break
                 
-            folder_to_watch = f"\\\\{pc['address']}\\{SHARED_FOLDER_NAME}"
+            folder_to_watch = get_backend().get_path(pc)
             print(f"\nAttempting to monitor: {folder_to_watch}")
             
             # Try to connect to the shared folder
-            if not connect_to_shared_folder(pc['address'], pc['username'], pc['password']):
+            if not connect_to_shared_folder(pc):
                 print(f"Failed to connect to {folder_to_watch}. Skipping...")
                 continue
             
@@ -233,8 +249,8 @@ def start_monitoring():
         # Clean up any network connections
         for pc in PC_CREDENTIALS:
             try:
-                unc = f"\\\\{pc['address']}\\{SHARED_FOLDER_NAME}"
-                win32net.NetUseDel(unc, 0)
+                unc = get_backend().get_path(pc)
+                get_backend().disconnect(pc)
                 print(f"Disconnected from {unc}")
             except Exception as e:
                 print(f"Error disconnecting from {pc['address']}: {e}")
@@ -269,13 +285,12 @@ def archive_files():
         # Move files to archive
         try:
             files_moved = 0
-            for file_name in os.listdir(source_folder):
-                source_file = os.path.join(source_folder, file_name)
-                if os.path.isfile(source_file) and file_name.lower().endswith(('.jpg', '.jpeg')):
-                    dest_file = os.path.join(archive_path, file_name)
-                    shutil.move(source_file, dest_file)
-                    files_moved += 1
-                    print(f"Archived: {file_name} to {archive_path}")
+            for record in walk_files(source_folder, JPEG_EXTENSIONS, stat=False, recursive=False):
+                dest_file = os.path.join(archive_path, record.name)
+                shutil.move(record.path, dest_file)
+                get_archived_names().add(record.name)
+                files_moved += 1
+                print(f"Archived: {record.name} to {archive_path}")
             
             archived_count += files_moved
             if files_moved > 0:
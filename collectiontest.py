@@ -2,13 +2,14 @@ import json
 import os
 import time
 import shutil
-import win32net
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from datetime import datetime, timedelta
 import hashlib
 import re
 import threading
+from share_access import get_share_backend
+from fs_walker import walk_files, JPEG_EXTENSIONS
 
 # Production line credentials
 PRODUCTION_LINES = [
@@ -47,6 +48,12 @@ PRODUCTION_LINES = [
 # Shared folder name
 SHARED_FOLDER_NAME = 'ELimagesnew'
 
+# Share access backend: 'netuse', 'cifs', 'local' or 'auto' for the platform default (see share_access.py)
+share_backend_name = 'auto'
+
+# Share access backend, created on first use
+share_backend = None
+
 # Centralized server folder path (where processed images will be stored)
 centralized_folder = "D:\\ELimagesnew\\Data_processed_new"
 
@@ -65,18 +72,19 @@ def is_network_path_accessible(path, max_retries=3, retry_delay=2):
             time.sleep(retry_delay)
     return False
 
-def connect_to_shared_folder(address, username, password, max_retries=3, retry_delay=2):
+def get_backend():
+    """Get the share access backend, creating it on first use."""
+    global share_backend
+    if share_backend is None:
+        share_backend = get_share_backend(SHARED_FOLDER_NAME, share_backend_name)
+    return share_backend
+
+def connect_to_shared_folder(line, max_retries=3, retry_delay=2):
     """Enhanced connection function with retry logic."""
-    unc = f"\\\\{address}\\{SHARED_FOLDER_NAME}"
+    unc = get_backend().get_path(line)
     for attempt in range(max_retries):
         try:
-            win32net.NetUseAdd(None, 2, {
-                'remote': unc,
-                'password': password,
-                'username': username,
-                'asg_type': 0,
-                'local': '',
-            })
+            get_backend().connect(line)
             print(f"Connected to {unc}")
             # Verify the connection by checking if the path exists
             if is_network_path_accessible(unc):
@@ -127,50 +135,43 @@ def replicate_folder_structure(source_root, dest_root, production_suffix, alias)
         return
     
     processed_count = 0
+    created_dirs = set()
     
-    # Walk through all directories and files in source
-    for root, dirs, files in os.walk(source_root):
-        # Calculate relative path from source root
-        rel_path = os.path.relpath(root, source_root)
+    # Walk through the JPEG files in source (folders are listed in parallel)
+    for record in walk_files(source_root, JPEG_EXTENSIONS, stat=False):
+        source_file = record.path
+        file_name = record.name
+        
+        # Skip if already processed (thread-safe)
+        with processed_files_lock:
+            if source_file in processed_files:
+                continue
         
         # Create corresponding directory in destination with alias first
-        if rel_path == '.':
-            dest_dir = os.path.join(dest_root, alias)
-        else:
-            dest_dir = os.path.join(dest_root, alias, rel_path)
+        dest_dir = os.path.join(dest_root, alias, record.rel_dir)
+        if dest_dir not in created_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            created_dirs.add(dest_dir)
         
-        os.makedirs(dest_dir, exist_ok=True)
+        # Generate new filename
+        new_filename = generate_new_filename(file_name, source_file, production_suffix)
+        dest_file = os.path.join(dest_dir, new_filename)
         
-        # Process each file
-        for file_name in files:
-            source_file = os.path.join(root, file_name)
+        try:
+            # Copy file with new name
+            shutil.copy2(source_file, dest_file)
+            with processed_files_lock:
+                processed_files.add(source_file)
+            processed_count += 1
             
-            # Only process JPEG files
-            if file_name.lower().endswith(('.jpg', '.jpeg')):
-                # Skip if already processed (thread-safe)
-                with processed_files_lock:
-                    if source_file in processed_files:
-                        continue
-                
-                # Generate new filename
-                new_filename = generate_new_filename(file_name, source_file, production_suffix)
-                dest_file = os.path.join(dest_dir, new_filename)
-                
-                try:
-                    # Copy file with new name
-                    shutil.copy2(source_file, dest_file)
-                    with processed_files_lock:
-                        processed_files.add(source_file)
-                    processed_count += 1
-                    
-                    print(f"[{alias}] Processed: {file_name} -> {new_filename}")
-                    print(f"  Source: {source_file}")
-                    print(f"  Destination: {dest_file}")
-                    print(f"  Quality: {'NG' if get_quality_suffix(source_file) == 'Z' else 'Normal'}")
-                    print("-" * 50)
-                    
-                except Exception as e:
-                    print(f"[{alias}] Error copying {source_file} to {dest_file}: {e}")
+            print(f"[{alias}] Processed: {file_name} -> {new_filename}")
+            print(f"  Source: {source_file}")
+            print(f"  Destination: {dest_file}")
+            print(f"  Quality: {'NG' if get_quality_suffix(source_file) == 'Z' else 'Normal'}")
+            print("-" * 50)
+            
+        except Exception as e:
+            print(f"[{alias}] Error copying {source_file} to {dest_file}: {e}")
     
     if processed_count > 0:
         print(f"[{alias}] Total files processed: {processed_count}")
@@ -208,7 +209,7 @@ class ProductionLineFileHandler(FileSystemEventHandler):
         """Process a single file that was detected by the file watcher."""
         try:
             # Get relative path from the shared folder root
-            shared_folder_root = f"\\\\{self.production_line['address']}\\{SHARED_FOLDER_NAME}"
+            shared_folder_root = get_backend().get_path(self.production_line)
             rel_path = os.path.relpath(os.path.dirname(source_file), shared_folder_root)
             
             # Create destination directory with alias first
@@ -244,7 +245,7 @@ def process_existing_files():
     
     for line in PRODUCTION_LINES:
         print(f"\n[{line['alias']}] Processing existing files...")
-        shared_folder_path = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
+        shared_folder_path = get_backend().get_path(line)
         
         if not os.path.exists(shared_folder_path):
             print(f"[{line['alias']}] Shared folder not accessible: {shared_folder_path}")
@@ -273,10 +274,10 @@ def start_monitoring():
     try:
         # Connect to all production line shared folders
         for line in PRODUCTION_LINES:
-            folder_to_watch = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
+            folder_to_watch = get_backend().get_path(line)
             print(f"\n[{line['alias']}] Attempting to connect: {folder_to_watch}")
             
-            if not connect_to_shared_folder(line['address'], line['username'], line['password']):
+            if not connect_to_shared_folder(line):
                 print(f"[{line['alias']}] Failed to connect to {folder_to_watch}. Skipping...")
                 continue
             
@@ -297,7 +298,7 @@ def start_monitoring():
 
         # Initialize observers for each connected production line
         for line in connected_lines:
-            folder_to_watch = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
+            folder_to_watch = get_backend().get_path(line)
             
             try:
                 observer = Observer()
@@ -367,8 +368,8 @@ def start_monitoring():
         # Clean up network connections
         for line in PRODUCTION_LINES:
             try:
-                unc = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
-                win32net.NetUseDel(unc, 0)
+                unc = get_backend().get_path(line)
+                get_backend().disconnect(line)
                 print(f"[{line['alias']}] Disconnected from {unc}")
             except Exception as e:
                 print(f"[{line['alias']}] Error disconnecting: {e}")
@@ -2,13 +2,25 @@ import json
 import os
 import time
 import shutil
-import win32net
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 from datetime import datetime, timedelta
 import hashlib
 import re
 import threading
+from module_index import ModuleIndex
+from fs_journal import FileJournal
+from fs_walker import walk_files, JPEG_EXTENSIONS
+from share_manifest import list_share_files
+from ingest_latency import LatencyTracker
+from share_access import get_share_backend
+from shift_schedule import ShiftScheduler, JobThrottle, shift_starts
+from transfer_control import TransferLimiter
+from jpeg_validation import validate_jpeg, InvalidJPEGError
+from ingest_queue import IngestQueue
+from ingest_workers import IngestWorkerPool
+import storage_tiers
 
 # Production line credentials
 PRODUCTION_LINES = [
@@ -45,19 +57,83 @@ PRODUCTION_LINES = [
 # Shared folder name
 SHARED_FOLDER_NAME = 'ELimagesnew'
 
+# Share access backend: 'netuse', 'cifs', 'local' or 'auto' for the platform default (see share_access.py)
+share_backend_name = 'auto'
+
+# Seconds between share rescans when the backend gets no native change events (cifs mounts)
+observer_poll_interval = 5
+
 # Centralized server folder path (where processed images will be stored)
 centralized_folder = "D:\\ELimagesnew\\Data_processed_new"
 
 # Archive base folder path
 archive_base_folder = "D:\\ELimagesnew\\Data_processed_new\\archive"
 
-# Shift duration in hours (configurable)
-shift_duration = 0.01  # 5 seconds for testing purposes
+# Files failing JPEG validation are retried, then moved here with a log of the reasons
+quarantine_folder = "D:\\ELimagesnew\\quarantine"
+validation_attempts = 3
+
+# Failures of an unchanged file closer together than this are duplicate events, not new attempts
+validation_retry_seconds = 2
+
+# A file failing validation that has not changed for this many seconds is no longer being written
+quarantine_after_seconds = 60
+
+# Module index database (serial -> EL images and flasher results)
+module_index_path = "D:\\ELimagesnew\\module_index.db"
+
+# Journal of the files in the centralized folder and archive (see fs_journal.py); lets startup,
+# archive lookups and heartbeats skip walking the trees
+journal_path = "D:\\ELimagesnew\\fs_journal.db"
+
+# Per-file latency from capture to central availability (thresholds in ingest_latency.py)
+latency_db_path = "D:\\ELimagesnew\\latency.db"
+
+# Durable queue for CPU-heavy follow-up work on copied images (see ingest_workers.py; None to
+# disable), the job kinds queued per image, and whether the collector starts the ingest worker
+# processes itself (set False when they run as a separate service on the same queue)
+ingest_queue_path = "D:\\ELimagesnew\\ingest_queue.db"
+ingest_job_kinds = ['hash', 'previews', 'perceptual_hash', 'el_pair']
+start_ingest_workers = True
+
+# After archiving, move aged and least recently used archive images to the cold volume
+# (tier locations and policy in storage_tiers.py)
+tiering_enabled = True
+
+# Read the backlog of a share from the manifest its station agent keeps in the share root
+# instead of listing the share (see share_manifest.py; shares without a fresh manifest are walked)
+use_share_manifests = True
+
+# Archive at every shift start (shift times in shift_schedule.py); the last handled shift
+# boundary is kept in the state file so boundaries missed while stopped are caught up
+archive_at_shift_end = True
+shift_state_path = "D:\\ELimagesnew\\shift_state.json"
 
 # File processing record (shared across all production lines)
 processed_files = set()
+# Station files being copied right now (claimed under processed_files_lock, copied outside it)
+in_flight_files = set()
 processed_files_lock = threading.Lock()
 
+# Module index, file journal and ingest queue, opened on first use
+module_index = None
+journal = None
+latency_tracker = None
+ingest_queue = None
+
+# Failed validation attempts (count, (size, mtime), time of last attempt) per source file, the
+# retry timers of those files (threaded core), and per-line corruption counters
+validation_failures = {}
+validation_timers = {}
+corruption_counts = {}
+corruption_lock = threading.Lock()
+
+# Share access backend, created on first use
+share_backend = None
+
+# Bandwidth/IOPS limits for copies from the shares (see transfer_control.py), created on first use
+transfer_limiter = None
+
 def is_network_path_accessible(path, max_retries=3, retry_delay=2):
     """Check if a network path is accessible with retries."""
     for attempt in range(max_retries):
@@ -69,18 +145,19 @@ def is_network_path_accessible(path, max_retries=3, retry_delay=2):
             time.sleep(retry_delay)
     return False
 
-def connect_to_shared_folder(address, username, password, max_retries=3, retry_delay=2):
+def get_backend():
+    """Get the share access backend, creating it on first use."""
+    global share_backend
+    if share_backend is None:
+        share_backend = get_share_backend(SHARED_FOLDER_NAME, share_backend_name)
+    return share_backend
+
+def connect_to_shared_folder(line, max_retries=3, retry_delay=2):
     """Enhanced connection function with retry logic."""
-    unc = f"\\\\{address}\\{SHARED_FOLDER_NAME}"
+    unc = get_share_path(line)
     for attempt in range(max_retries):
         try:
-            win32net.NetUseAdd(None, 2, {
-                'remote': unc,
-                'password': password,
-                'username': username,
-                'asg_type': 0,
-                'local': '',
-            })
+            get_backend().connect(line)
             print(f"Connected to {unc}")
             # Verify the connection by checking if the path exists
             if is_network_path_accessible(unc):
@@ -93,16 +170,166 @@ def connect_to_shared_folder(address, username, password, max_retries=3, retry_d
                 time.sleep(retry_delay)
     return False
 
+def create_observer():
+    """Create a watchdog observer suited to the share backend (polling when it needs it)."""
+    if get_backend().needs_polling:
+        return PollingObserver(timeout=observer_poll_interval)
+    return Observer()
+
+def get_transfer_limiter():
+    """Get the transfer limiter shared by all lines, creating it on first use."""
+    global transfer_limiter
+    if transfer_limiter is None:
+        transfer_limiter = TransferLimiter()
+    return transfer_limiter
+
+def get_share_path(line):
+    """Root folder of a production line's share, as seen through the share access backend."""
+    return get_backend().get_path(line)
+
+def get_journal():
+    """Get the file journal, opening it on first use."""
+    global journal
+    if journal is None:
+        journal = FileJournal(journal_path)
+    return journal
+
+def get_latency_tracker():
+    """Get the latency tracker, opening it on first use."""
+    global latency_tracker
+    if latency_tracker is None:
+        latency_tracker = LatencyTracker(latency_db_path)
+    return latency_tracker
+
+def close_latency_tracker():
+    """Commit the latest latency measurements and close the tracker (on shutdown)."""
+    global latency_tracker
+    if latency_tracker is not None:
+        try:
+            latency_tracker.close()
+        except Exception as e:
+            print(f"Error closing latency tracker: {e}")
+        latency_tracker = None
+
+def get_ingest_queue():
+    """Get the ingest queue, opening it on first use (None when ingest_queue_path is not set)."""
+    global ingest_queue
+    if ingest_queue is None and ingest_queue_path:
+        ingest_queue = IngestQueue(ingest_queue_path)
+    return ingest_queue
+
+def close_ingest_queue():
+    """Close the ingest queue (on shutdown)."""
+    global ingest_queue
+    if ingest_queue is not None:
+        try:
+            ingest_queue.close()
+        except Exception as e:
+            print(f"Error closing ingest queue: {e}")
+        ingest_queue = None
+
+def queue_ingest_jobs(dest_file, alias):
+    """Queue the ingest jobs (ingest_job_kinds) for a file copied into the centralized folder."""
+    queue = get_ingest_queue()
+    if queue is None:
+        return
+    try:
+        queue.put_many([(kind, dest_file, alias, None) for kind in ingest_job_kinds])
+    except Exception as e:
+        print(f"[{alias}] Error queueing ingest jobs for {dest_file}: {e}")
+
+def start_ingest_pool():
+    """
+    Start the ingest worker processes on the ingest queue, with this process's settings.
+
+    Returns:
+        IngestWorkerPool or None: The running pool (None if disabled or it could not start)
+    """
+    if not (ingest_queue_path and start_ingest_workers):
+        return None
+    try:
+        pool = IngestWorkerPool(ingest_queue_path, index_path=module_index_path)
+        pool.start()
+        return pool
+    except Exception as e:
+        print(f"Error starting ingest workers: {e}")
+        return None
+
+def print_ingest_counts(pool=None):
+    """Print the pending and failed ingest jobs and the number of live workers."""
+    queue = get_ingest_queue()
+    if queue is None:
+        return
+    counts = queue.counts()
+    queued = sum(n for (_, state), n in counts.items() if state in ('queued', 'running'))
+    failed = sum(n for (_, state), n in counts.items() if state == 'failed')
+    workers = pool.alive_count() if pool else 0
+    print(f"Ingest jobs pending: {queued}, failed: {failed}, workers alive: {workers}")
+
+def describe_stored_file(path):
+    """Alias, state ('central', 'archive' or 'cold') and station file name of a file in the store."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.jpg', '.jpeg', '.jxl'):
+        return None, None, None
+    # Cold first: tiered files keep their archive path under the cold root
+    for root, state in ((storage_tiers.cold_archive_folder, 'cold'), (archive_base_folder, 'archive'),
+                        (centralized_folder, 'central')):
+        try:
+            rel_path = os.path.relpath(path, root)
+        except ValueError:
+            # On another drive
+            continue
+        if not rel_path.startswith(os.pardir):
+            break
+    else:
+        return None, None, None
+    if extension == '.jxl' and state != 'cold':
+        return None, None, None
+    alias = rel_path.split(os.sep)[0]
+    line = next((line for line in PRODUCTION_LINES if line['alias'] == alias), None)
+    if line is None:
+        return None, None, None
+    original_filename = get_original_filename(os.path.basename(path), line['suffix'])
+    if extension == '.jxl':
+        # Recompressed on cold (see cold_compression.py); restored as .jpg
+        original_filename = os.path.splitext(original_filename)[0] + '.jpg'
+    return alias, state, original_filename
+
+def reconcile_journal():
+    """Pick up changes to the centralized folder, archive and cold tier made outside the collector."""
+    start = time.time()
+    stats = get_journal().reconcile([centralized_folder, archive_base_folder, storage_tiers.cold_archive_folder],
+                                    describe_stored_file)
+    print(f"Journal reconciled in {time.time() - start:.2f}s: {stats['dirs_checked']} folders checked, "
+          f"{stats['dirs_listed']} relisted, {stats['files_added']} files added, "
+          f"{stats['files_removed']} removed")
+    return stats
+
 def file_exists_in_archive(file_name, alias):
-    """Check if a file with the same name exists in the archive for a specific alias."""
-    alias_archive_path = os.path.join(archive_base_folder, alias)
-    if not os.path.exists(alias_archive_path):
-        return False
-    
-    for root, dirs, files in os.walk(alias_archive_path):
-        if file_name in files:
-            return True
-    return False
+    """Check if a station file (or a stored file of that name) is in the archive (warm or cold) for a specific alias."""
+    return any(get_journal().has_file(alias, file_name, state) for state in ('archive', 'cold'))
+
+def get_module_index():
+    """Get the module index, opening it on first use."""
+    global module_index
+    if module_index is None:
+        module_index = ModuleIndex(module_index_path)
+    return module_index
+
+def index_image(file_path, alias, original_filename):
+    """Add or update an image in the module index under its original station file name."""
+    try:
+        get_module_index().add_image(file_path, alias, original_filename)
+    except Exception as e:
+        print(f"[{alias}] Error indexing {file_path}: {e}")
+
+def move_indexed_image(old_path, new_path, alias, original_filename):
+    """Point the module index entries of a moved image (hashes, pairs...) at its new path."""
+    try:
+        get_module_index().move_path(old_path, new_path)
+    except Exception as e:
+        print(f"[{alias}] Error updating index paths of {old_path}: {e}")
+    index_image(new_path, alias, original_filename)
 
 def get_file_hash(file_path):
     """Get MD5 hash of a file."""
@@ -116,6 +343,149 @@ def get_file_hash(file_path):
         print(f"Error getting hash for {file_path}: {e}")
         return None
 
+def copy_validated(source_file, dest_file, line, live=True):
+    """
+    Copy a station file through the transfer limiter, validating the JPEG on the bytes read
+    before anything is written.
+
+    Raises:
+        InvalidJPEGError: The file is not a complete JPEG (nothing is written)
+    """
+    with get_transfer_limiter().transfer(line, os.path.getsize(source_file), live):
+        with open(source_file, 'rb') as f:
+            data = f.read()
+    validate_jpeg(data)
+    with open(dest_file, 'wb') as f:
+        f.write(data)
+    shutil.copystat(source_file, dest_file)
+
+def count_corruption(alias, counter):
+    with corruption_lock:
+        counts = corruption_counts.setdefault(alias, {'invalid': 0, 'quarantined': 0})
+        counts[counter] += 1
+
+def quarantine_file(source_file, line, reason, data=None):
+    """Store a file that failed validation under quarantine/<alias>/ and log why."""
+    alias = line['alias']
+    rel_path = os.path.relpath(source_file, get_share_path(line))
+    dest_file = os.path.join(quarantine_folder, alias, rel_path)
+    os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+    if data is not None:
+        with open(dest_file, 'wb') as f:
+            f.write(data)
+    else:
+        shutil.copyfile(source_file, dest_file)
+
+    with open(os.path.join(quarantine_folder, 'quarantine_log.csv'), 'a') as f:
+        f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')},{alias},{source_file},{reason}\n")
+    count_corruption(alias, 'quarantined')
+    print(f"[{alias}] Quarantined {source_file}: {reason}")
+
+def handle_invalid_image(source_file, line, error, final=False):
+    """
+    Record a failed validation. The file is quarantined (and counted as invalid) once it has
+    failed validation_attempts times without changing, has not been modified for
+    quarantine_after_seconds, or when final is set; until then it stays unprocessed so a
+    retry (see schedule_validation_retry) or a later event picks it up again.
+
+    Returns:
+        bool: True if the file was quarantined
+    """
+    alias = line['alias']
+    try:
+        stat = os.stat(source_file)
+        signature = (stat.st_size, stat.st_mtime)
+        settled = time.time() - stat.st_mtime >= quarantine_after_seconds
+    except OSError:
+        signature = None
+        settled = False
+    now = time.time()
+    with corruption_lock:
+        attempts, last_signature, last_attempt = validation_failures.get(source_file, (0, None, 0))
+        new_attempt = True
+        if signature != last_signature:
+            # Changed since the last failure, so still being written: start counting again
+            attempts, last_attempt = 1, now
+        elif now - last_attempt >= validation_retry_seconds:
+            attempts, last_attempt = attempts + 1, now
+        else:
+            new_attempt = False
+        validation_failures[source_file] = (attempts, signature, last_attempt)
+
+    if not (final or settled or attempts >= validation_attempts):
+        # The first failure is usually a station still writing the file; only log unchanged repeats
+        if new_attempt and attempts > 1:
+            print(f"[{alias}] {source_file} still fails validation ({error.reason}), attempt {attempts}")
+        return False
+
+    count_corruption(alias, 'invalid')
+    try:
+        quarantine_file(source_file, line, error.reason, error.data)
+    except Exception as e:
+        print(f"[{alias}] Error quarantining {source_file}: {e}")
+    with processed_files_lock:
+        processed_files.add(source_file)
+    clear_validation_failures(source_file)
+    return True
+
+def clear_validation_failures(source_file):
+    """Forget the failed validations of a file (once it was copied, quarantined or removed)."""
+    with corruption_lock:
+        validation_failures.pop(source_file, None)
+        timer = validation_timers.pop(source_file, None)
+    if timer is not None:
+        timer.cancel()
+
+def schedule_validation_retry(source_file, line):
+    """
+    Retry a file that failed validation after validation_retry_seconds, restarting the wait
+    if it is already scheduled (events of a file still being written push the retry back).
+    """
+    timer = threading.Timer(validation_retry_seconds, retry_invalid_image, (source_file, line))
+    timer.daemon = True
+    with corruption_lock:
+        previous = validation_timers.get(source_file)
+        validation_timers[source_file] = timer
+    if previous is not None:
+        previous.cancel()
+    timer.start()
+
+def retry_invalid_image(source_file, line):
+    """Copy a file that failed validation again (timer callback), rescheduling while it is incomplete."""
+    with corruption_lock:
+        if validation_timers.get(source_file) is not threading.current_thread():
+            # Rescheduled or cleared in the meantime
+            return
+        validation_timers.pop(source_file)
+    if not claim_file(source_file):
+        return
+    try:
+        if not os.path.exists(source_file):
+            # Removed or renamed by the station
+            clear_validation_failures(source_file)
+            return
+        copy_to_central(source_file, line)
+    except InvalidJPEGError as e:
+        if not handle_invalid_image(source_file, line, e):
+            schedule_validation_retry(source_file, line)
+    except Exception as e:
+        print(f"[{line['alias']}] Error retrying {source_file}: {e}")
+    finally:
+        release_file(source_file)
+
+def cancel_validation_retries():
+    """Cancel the scheduled validation retries (on shutdown)."""
+    with corruption_lock:
+        timers = list(validation_timers.values())
+        validation_timers.clear()
+    for timer in timers:
+        timer.cancel()
+
+def print_corruption_counts():
+    with corruption_lock:
+        for alias, counts in corruption_counts.items():
+            print(f"  {alias}: {counts['invalid']} invalid files, {counts['quarantined']} quarantined")
+
 def get_quality_suffix(file_path):
     """Determine quality suffix based on folder structure."""
     # Check if the file path contains 'NG' or 'Normal' folders
@@ -147,64 +517,109 @@ def generate_new_filename(original_filename, source_path, production_suffix):
     
     return new_filename
 
-def replicate_folder_structure(source_root, dest_root, production_suffix, alias):
-    """Replicate folder structure and process files."""
+def get_original_filename(new_filename, production_suffix):
+    """Recover the station file name from a name produced by generate_new_filename."""
+    name_without_ext, extension = os.path.splitext(new_filename)
+    match = re.match(rf"^(.*)_{re.escape(production_suffix)}_[AZ]_\d{{6}}_\d{{6}}$", name_without_ext)
+    if match:
+        return f"{match.group(1)}{extension}"
+    return new_filename
+
+def claim_file(source_file):
+    """
+    Claim a station file for copying.
+
+    Returns:
+        bool: False if the file was already copied or another thread is copying it
+    """
+    with processed_files_lock:
+        if source_file in processed_files or source_file in in_flight_files:
+            return False
+        in_flight_files.add(source_file)
+        return True
+
+def release_file(source_file):
+    """Release a claim from claim_file (the file stays in processed_files if it was copied)."""
+    with processed_files_lock:
+        in_flight_files.discard(source_file)
+
+def replicate_file(record, dest_root, production_suffix, alias, line, created_dirs):
+    """
+    Copy one backlog file found by replicate_folder_structure (claimed by the caller).
+
+    Returns:
+        bool: True if the file was copied
+    """
+    source_file = record.path
+    file_name = record.name
+
+    # Check if file already exists in archive
+    if file_exists_in_archive(file_name, alias):
+        print(f"[{alias}] File {file_name} already exists in archive. Skipping...")
+        with processed_files_lock:
+            processed_files.add(source_file)
+        return False
+    get_latency_tracker().mark_detected(alias, file_name)
+    
+    # Create corresponding directory in destination with alias first
+    dest_dir = os.path.join(dest_root, alias, record.rel_dir)
+    if dest_dir not in created_dirs:
+        os.makedirs(dest_dir, exist_ok=True)
+        created_dirs.add(dest_dir)
+    
+    # Generate new filename
+    new_filename = generate_new_filename(file_name, source_file, production_suffix)
+    dest_file = os.path.join(dest_dir, new_filename)
+    
+    try:
+        # Copy file with new name
+        copy_validated(source_file, dest_file, line or {'alias': alias}, live=False)
+        get_journal().record_create(dest_file, alias, 'central', file_name, source_file)
+        get_latency_tracker().record(alias, file_name, 'copied')
+        with processed_files_lock:
+            processed_files.add(source_file)
+        clear_validation_failures(source_file)
+        index_image(dest_file, alias, file_name)
+        get_latency_tracker().record(alias, file_name, 'indexed')
+        queue_ingest_jobs(dest_file, alias)
+        
+        print(f"[{alias}] Processed: {file_name} -> {new_filename}")
+        print(f"  Source: {source_file}")
+        print(f"  Destination: {dest_file}")
+        print(f"  Quality: {'NG' if get_quality_suffix(source_file) == 'Z' else 'Normal'}")
+        print("-" * 50)
+        return True
+        
+    except InvalidJPEGError as e:
+        if not handle_invalid_image(source_file, line or {'alias': alias}, e) and line is not None:
+            schedule_validation_retry(source_file, line)
+    except Exception as e:
+        print(f"[{alias}] Error copying {source_file} to {dest_file}: {e}")
+    return False
+
+def replicate_folder_structure(source_root, dest_root, production_suffix, alias, line=None):
+    """Replicate folder structure and process files (as backlog transfers, behind live files)."""
     if not os.path.exists(source_root):
         print(f"Source folder does not exist: {source_root}")
         return
     
     processed_count = 0
+    created_dirs = set()
     
-    # Walk through all directories and files in source
-    for root, dirs, files in os.walk(source_root):
-        # Calculate relative path from source root
-        rel_path = os.path.relpath(root, source_root)
-        
-        # Create corresponding directory in destination with alias first
-        if rel_path == '.':
-            dest_dir = os.path.join(dest_root, alias)
-        else:
-            dest_dir = os.path.join(dest_root, alias, rel_path)
-        
-        os.makedirs(dest_dir, exist_ok=True)
-        
-        # Process each file
-        for file_name in files:
-            source_file = os.path.join(root, file_name)
-            
-            # Only process JPEG files
-            if file_name.lower().endswith(('.jpg', '.jpeg')):
-                # Skip if already processed (thread-safe)
-                with processed_files_lock:
-                    if source_file in processed_files:
-                        continue
-                
-                # Check if file already exists in archive
-                if file_exists_in_archive(file_name, alias):
-                    print(f"[{alias}] File {file_name} already exists in archive. Skipping...")
-                    with processed_files_lock:
-                        processed_files.add(source_file)
-                    continue
-                
-                # Generate new filename
-                new_filename = generate_new_filename(file_name, source_file, production_suffix)
-                dest_file = os.path.join(dest_dir, new_filename)
-                
-                try:
-                    # Copy file with new name
-                    shutil.copy2(source_file, dest_file)
-                    with processed_files_lock:
-                        processed_files.add(source_file)
-                    processed_count += 1
-                    
-                    print(f"[{alias}] Processed: {file_name} -> {new_filename}")
-                    print(f"  Source: {source_file}")
-                    print(f"  Destination: {dest_file}")
-                    print(f"  Quality: {'NG' if get_quality_suffix(source_file) == 'Z' else 'Normal'}")
-                    print("-" * 50)
-                    
-                except Exception as e:
-                    print(f"[{alias}] Error copying {source_file} to {dest_file}: {e}")
+    # The JPEG files in source, from the share manifest or a walk (folders listed in parallel)
+    if use_share_manifests:
+        records = list_share_files(source_root, JPEG_EXTENSIONS)
+    else:
+        records = walk_files(source_root, JPEG_EXTENSIONS, stat=False)
+    for record in records:
+        # Skip if already processed or being copied by a watcher (thread-safe)
+        if not claim_file(record.path):
+            continue
+        try:
+            if replicate_file(record, dest_root, production_suffix, alias, line, created_dirs):
+                processed_count += 1
+        finally:
+            release_file(record.path)
     
     if processed_count > 0:
         print(f"[{alias}] Total files processed: {processed_count}")
@@ -219,79 +634,113 @@ class ProductionLineFileHandler(FileSystemEventHandler):
         self.alias = production_line['alias']
 
     def on_created(self, event):
-        if not event.is_directory:
-            source = event.src_path
-            _, file_extension = os.path.splitext(source)
-            if file_extension.lower() in ['.jpg', '.jpeg']:
-                with processed_files_lock:
-                    if source not in processed_files:
-                        original_filename = os.path.basename(source)
-                        if not file_exists_in_archive(original_filename, self.alias):
-                            print(f"[{self.alias}] New JPEG file detected: {source}")
-                            self.process_single_file(source)
+        self.handle_event(event, 'New')
 
     def on_modified(self, event):
+        self.handle_event(event, 'Modified')
+
+    def handle_event(self, event, change):
         if not event.is_directory:
             source = event.src_path
             _, file_extension = os.path.splitext(source)
             if file_extension.lower() in ['.jpg', '.jpeg']:
-                with processed_files_lock:
-                    if source not in processed_files:
-                        original_filename = os.path.basename(source)
-                        if not file_exists_in_archive(original_filename, self.alias):
-                            print(f"[{self.alias}] Modified JPEG file detected: {source}")
-                            self.process_single_file(source)
+                # A file that failed validation is still being written: push its retry back
+                # instead of reading it again on every event
+                if source in validation_timers:
+                    schedule_validation_retry(source, self.production_line)
+                    return
+                # Only the claim happens under the lock, so other lines are not held up by this copy
+                if not claim_file(source):
+                    return
+                try:
+                    original_filename = os.path.basename(source)
+                    if not file_exists_in_archive(original_filename, self.alias):
+                        print(f"[{self.alias}] {change} JPEG file detected: {source}")
+                        get_latency_tracker().mark_detected(self.alias, original_filename)
+                        self.process_single_file(source)
+                finally:
+                    release_file(source)
 
     def process_single_file(self, source_file):
         """Process a single file that was detected by the file watcher."""
         try:
-            # Get relative path from the shared folder root
-            shared_folder_root = f"\\\\{self.production_line['address']}\\{SHARED_FOLDER_NAME}"
-            rel_path = os.path.relpath(os.path.dirname(source_file), shared_folder_root)
-            
-            # Create destination directory with alias first
-            if rel_path == '.':
-                dest_dir = os.path.join(centralized_folder, self.alias)
-            else:
-                dest_dir = os.path.join(centralized_folder, self.alias, rel_path)
-            
-            os.makedirs(dest_dir, exist_ok=True)
-            
-            # Generate new filename
-            original_filename = os.path.basename(source_file)
-            new_filename = generate_new_filename(original_filename, source_file, self.production_suffix)
-            dest_file = os.path.join(dest_dir, new_filename)
-            
-            # Copy file with new name
-            shutil.copy2(source_file, dest_file)
-            with processed_files_lock:
-                processed_files.add(source_file)
-            
-            print(f"[{self.alias}] Processed: {original_filename} -> {new_filename}")
-            print(f"  Source: {source_file}")
-            print(f"  Destination: {dest_file}")
-            print(f"  Quality: {'NG' if get_quality_suffix(source_file) == 'Z' else 'Normal'}")
-            print("-" * 50)
-            
+            copy_to_central(source_file, self.production_line)
+        except InvalidJPEGError as e:
+            if not handle_invalid_image(source_file, self.production_line, e):
+                schedule_validation_retry(source_file, self.production_line)
         except Exception as e:
             print(f"[{self.alias}] Error processing {source_file}: {e}")
 
+def copy_to_central(source_file, line, live=True):
+    """
+    Copy a station file into the centralized folder under its new name, record it and index it.
+
+    The copy goes through the transfer limiter; live files have priority over backlog files.
+    Raises InvalidJPEGError (see copy_validated) for incomplete or corrupt images.
+
+    Returns:
+        str: Destination path
+    """
+    alias = line['alias']
+
+    # Get relative path from the shared folder root
+    shared_folder_root = get_share_path(line)
+    rel_path = os.path.relpath(os.path.dirname(source_file), shared_folder_root)
+    
+    # Create destination directory with alias first
+    if rel_path == '.':
+        dest_dir = os.path.join(centralized_folder, alias)
+    else:
+        dest_dir = os.path.join(centralized_folder, alias, rel_path)
+    
+    os.makedirs(dest_dir, exist_ok=True)
+    
+    # Generate new filename
+    original_filename = os.path.basename(source_file)
+    new_filename = generate_new_filename(original_filename, source_file, line['suffix'])
+    dest_file = os.path.join(dest_dir, new_filename)
+    
+    # Copy file with new name
+    copy_validated(source_file, dest_file, line, live)
+    get_journal().record_create(dest_file, alias, 'central', original_filename, source_file)
+    get_latency_tracker().record(alias, original_filename, 'copied')
+    with processed_files_lock:
+        processed_files.add(source_file)
+    clear_validation_failures(source_file)
+    index_image(dest_file, alias, original_filename)
+    get_latency_tracker().record(alias, original_filename, 'indexed')
+    queue_ingest_jobs(dest_file, alias)
+    
+    print(f"[{alias}] Processed: {original_filename} -> {new_filename}")
+    print(f"  Source: {source_file}")
+    print(f"  Destination: {dest_file}")
+    print(f"  Quality: {'NG' if get_quality_suffix(source_file) == 'Z' else 'Normal'}")
+    print("-" * 50)
+    return dest_file
+
 def process_existing_files():
     """Process all existing files in all production line shared folders."""
     print("Processing existing files from all production lines...")
     
     for line in PRODUCTION_LINES:
         print(f"\n[{line['alias']}] Processing existing files...")
-        shared_folder_path = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
+        shared_folder_path = get_share_path(line)
         
         if not os.path.exists(shared_folder_path):
             print(f"[{line['alias']}] Shared folder not accessible: {shared_folder_path}")
             continue
         
-        replicate_folder_structure(shared_folder_path, centralized_folder, line['suffix'], line['alias'])
+        replicate_folder_structure(shared_folder_path, centralized_folder, line['suffix'], line['alias'], line)
+
+def archive_files(throttle=None):
+    """
+    Archive files from the centralized folder to the archive location.
+
+    Queued ingest jobs of the moved files follow them to the archive.
 
-def archive_files():
-    """Archive files from the centralized folder to the archive location."""
+    Args:
+        throttle (JobThrottle): Paces the moves outside off-peak windows (None for no pacing)
+    """
     current_time = datetime.now()
     print(f"\n{'='*60}")
     print(f"STARTING ARCHIVAL PROCESS AT {current_time}")
@@ -304,6 +753,7 @@ def archive_files():
     
     archived_count = 0
     total_files = 0
+    reconcile_journal()
     
     # Process each production line alias folder
     for line in PRODUCTION_LINES:
@@ -318,12 +768,8 @@ def archive_files():
             print(f"[{alias}] Source folder not found: {source_folder}")
             continue
         
-        # Count files in source folder
-        files_in_source = []
-        for root, dirs, files in os.walk(source_folder):
-            for file_name in files:
-                if file_name.lower().endswith(('.jpg', '.jpeg')):
-                    files_in_source.append(os.path.join(root, file_name))
+        # Files in source folder, from the journal
+        files_in_source = get_journal().list_files(alias, 'central')
         
         if not files_in_source:
             print(f"[{alias}] No JPEG files found to archive")
@@ -346,9 +792,18 @@ def archive_files():
                 dest_dir = os.path.dirname(dest_file)
                 os.makedirs(dest_dir, exist_ok=True)
                 
+                if throttle is not None:
+                    throttle.wait()
+
                 # Move file to archive
                 shutil.move(source_file, dest_file)
+                get_journal().record_move(source_file, dest_file, 'archive')
+                if get_ingest_queue() is not None:
+                    get_ingest_queue().move_path(source_file, dest_file)
                 files_moved += 1
+                original_filename = get_original_filename(os.path.basename(dest_file), line['suffix'])
+                move_indexed_image(source_file, dest_file, alias, original_filename)
+                get_latency_tracker().record(alias, original_filename, 'archived')
                 print(f"[{alias}] Archived: {os.path.basename(source_file)} -> {archive_path}")
             
             archived_count += files_moved
@@ -365,15 +820,22 @@ def archive_files():
     print(f"Archive location: {archive_base_folder}")
     print(f"{'='*60}\n")
 
+def tier_archive(throttle=None):
+    """Move aged archive images from the warm archive to the cold volume (see storage_tiers.py)."""
+    try:
+        storage_tiers.run_tiering(get_module_index(), archive_base_folder, throttle=throttle, journal=get_journal())
+    except Exception as e:
+        print(f"Error tiering archive {archive_base_folder}: {e}")
+
 def start_monitoring():
     """Start monitoring all production line shared folders."""
     observers = []
     running = True
     last_heartbeat = time.time()
     heartbeat_interval = 60  # Print a heartbeat every 60 seconds
-    last_archive_check = time.time()
-    archive_check_interval = shift_duration * 3600  # Convert hours to seconds
+    scheduler = ShiftScheduler(shift_state_path)
     connected_lines = []
+    ingest_pool = None
 
     # Handle Ctrl+C
     import signal
@@ -388,10 +850,10 @@ def start_monitoring():
     try:
         # Connect to all production line shared folders
         for line in PRODUCTION_LINES:
-            folder_to_watch = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
+            folder_to_watch = get_share_path(line)
             print(f"\n[{line['alias']}] Attempting to connect: {folder_to_watch}")
             
-            if not connect_to_shared_folder(line['address'], line['username'], line['password']):
+            if not connect_to_shared_folder(line):
                 print(f"[{line['alias']}] Failed to connect to {folder_to_watch}. Skipping...")
                 continue
             
@@ -407,15 +869,19 @@ def start_monitoring():
             print("No production lines could be connected. Exiting...")
             return
         
-        # Process existing files before starting to monitor
-        process_existing_files()
+        ingest_pool = start_ingest_pool()
+
+        # Catch up on changes to the store since the last run
+        reconcile_journal()
+        with processed_files_lock:
+            processed_files.update(get_journal().get_sources())
 
         # Initialize observers for each connected production line
         for line in connected_lines:
-            folder_to_watch = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
+            folder_to_watch = get_share_path(line)
             
             try:
-                observer = Observer()
+                observer = create_observer()
                 event_handler = ProductionLineFileHandler(line)
                 observer.schedule(event_handler, folder_to_watch, recursive=True)
                 observers.append((observer, line))
@@ -432,12 +898,16 @@ def start_monitoring():
             observer.start()
             print(f"[{line['alias']}] Started monitoring")
 
+        # Then the files the stations wrote while the collector was stopped. The watchers
+        # already run, so new files are not missed and their copies go ahead of this backlog.
+        process_existing_files()
+
         print(f"\nMonitoring started for {len(observers)} production lines:")
         for _, line in observers:
-            print(f"- {line['alias']} ({line['address']}) - Suffix: {line['suffix']}")
+            print(f"- {line['alias']} ({get_share_path(line)}) - Suffix: {line['suffix']}")
         print(f"Output directory: {centralized_folder}")
         print(f"Archive directory: {archive_base_folder}")
-        print(f"Shift duration: {shift_duration} hours")
+        print(f"Shift starts: {', '.join(shift_starts)}")
         print("\nPress Ctrl+C to stop monitoring...")
 
         # Main monitoring loop
@@ -445,41 +915,39 @@ def start_monitoring():
             try:
                 current_time = time.time()
                 
-                # Debug: Show archive timing every 10 seconds
-                if int(current_time) % 10 == 0:
-                    time_until_archive = int((last_archive_check + archive_check_interval) - current_time)
-                    if time_until_archive <= 0:
-                        print(f"[DEBUG] Archive should trigger NOW! ({time_until_archive} seconds)")
-                    else:
-                        print(f"[DEBUG] Archive in {time_until_archive} seconds")
-                
                 # Print a heartbeat message periodically
                 if current_time - last_heartbeat >= heartbeat_interval:
                     active_lines = [line['alias'] for _, line in observers if _.is_alive()]
-                    next_archive = datetime.fromtimestamp(last_archive_check + archive_check_interval)
-                    time_until_archive = int((last_archive_check + archive_check_interval) - current_time)
+                    next_archive = scheduler.next_boundary()
+                    time_until_archive = int((next_archive - datetime.now()).total_seconds())
                     print(f"\n[Heartbeat] Monitoring active at {time.strftime('%Y-%m-%d %H:%M:%S')}")
                     print(f"Active lines: {', '.join(active_lines)}")
                     print(f"Next archive check: {next_archive.strftime('%Y-%m-%d %H:%M:%S')} (in {time_until_archive} seconds)")
                     
                     # Show current file counts in each folder
                     for line in PRODUCTION_LINES:
-                        alias_folder = os.path.join(centralized_folder, line['alias'])
-                        if os.path.exists(alias_folder):
-                            file_count = 0
-                            for root, dirs, files in os.walk(alias_folder):
-                                file_count += len([f for f in files if f.lower().endswith(('.jpg', '.jpeg'))])
+                        file_count = get_journal().count_files(line['alias'], 'central')
+                        if file_count:
                             print(f"  {line['alias']}: {file_count} JPEG files pending archive")
+                    get_transfer_limiter().print_stats()
+                    print_corruption_counts()
+                    get_latency_tracker().print_stats()
+                    print_ingest_counts(ingest_pool)
                     
                     last_heartbeat = current_time
                 
-                # Check if it's time to archive files
-                if current_time - last_archive_check >= archive_check_interval:
-                    print(f"\n*** ARCHIVE TRIGGER *** Shift ended at {datetime.now()}. Starting archival process...")
-                    print(f"Time since last archive: {(current_time - last_archive_check):.2f} seconds")
-                    print(f"Archive interval: {archive_check_interval} seconds")
-                    archive_files()
-                    last_archive_check = current_time
+                # Archive at each shift boundary, catching up boundaries missed while stopped
+                due_boundaries = scheduler.due_boundaries() if archive_at_shift_end else []
+                if due_boundaries:
+                    if len(due_boundaries) > 1:
+                        print(f"\nCatching up {len(due_boundaries)} missed shift boundaries "
+                              f"(since {due_boundaries[0]})")
+                    print(f"\n*** ARCHIVE TRIGGER *** Shift ended at {due_boundaries[-1]}. Starting archival process...")
+                    archive_files(JobThrottle())
+                    if tiering_enabled:
+                        tier_archive(JobThrottle())
+                        reconcile_journal()
+                    scheduler.mark_done(due_boundaries[-1])
                     print("*** ARCHIVE COMPLETED ***")
                 
                 # Check if any observers have died
@@ -510,13 +978,17 @@ def start_monitoring():
                 observer.join(timeout=5)
                 if observer.is_alive():
                     print(f"[{line['alias']}] Warning: Observer did not shut down cleanly")
+        cancel_validation_retries()
+        close_latency_tracker()
+        if ingest_pool is not None:
+            ingest_pool.stop()
+        close_ingest_queue()
         
         # Clean up network connections
         for line in PRODUCTION_LINES:
             try:
-                unc = f"\\\\{line['address']}\\{SHARED_FOLDER_NAME}"
-                win32net.NetUseDel(unc, 0)
-                print(f"[{line['alias']}] Disconnected from {unc}")
+                get_backend().disconnect(line)
+                print(f"[{line['alias']}] Disconnected from {get_share_path(line)}")
             except Exception as e:
                 print(f"[{line['alias']}] Error disconnecting: {e}")
         
@@ -536,7 +1008,7 @@ if __name__ == "__main__":
     print(f"Shared Folder: {SHARED_FOLDER_NAME}")
     print(f"Output Directory: {centralized_folder}")
     print(f"Archive Directory: {archive_base_folder}")
-    print(f"Shift Duration: {shift_duration} hours")
+    print(f"Shift Starts: {', '.join(shift_starts)}")
     print("=" * 70)
     
     # Start the monitoring
@@ -0,0 +1,385 @@
+import os
+import io
+import json
+import shutil
+import platform
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+import numpy as np
+from watchdog.events import FileCreatedEvent
+from corpus_builder import build_corpus
+from transfer_control import TransferLimiter
+from datalog_generator import format_serials
+import station_simulator
+from fs_walker import count_files, JPEG_EXTENSIONS
+import share_manifest
+
+# Benchmark working folder (stand-in shares, output, archive); archives for the lookup benchmark are kept between runs
+benchmark_root = "D:\\ELimagesnew\\benchmark"
+
+# Baseline results compared against, and the folder each run's results are saved to
+baseline_path = "D:\\ELimagesnew\\benchmark\\baseline.json"
+results_folder = "D:\\ELimagesnew\\benchmark\\results"
+
+# Lines simulated in the collector benchmarks
+benchmark_lines = station_simulator.SIMULATED_LINES
+
+# Station images per line on the shares at cold start
+cold_sync_files_per_line = 500
+
+# New files per line delivered through the event handler
+steady_state_files_per_line = 200
+
+# Archive sizes for the file_exists_in_archive benchmark, and lookups timed per size
+archive_sizes = [10000, 100000, 1000000]
+archive_lookups = 50
+
+# Archived files per day folder in the generated archives
+archive_files_per_folder = 1000
+
+# A metric more than this fraction worse than the baseline is reported as a regression
+regression_threshold = 0.2
+
+# Keep the collector's per-file output off the console while timing
+quiet_collector = True
+
+# Measure the code paths without the transfer limits of transfer_control.py
+unlimited_transfers = True
+
+# Metrics compared against the baseline: 1 = higher is better, -1 = lower is better
+METRIC_DIRECTIONS = {
+    'files_per_second': 1,
+    'latency_p50': -1,
+    'latency_p99': -1,
+    'peak_memory_mb': -1,
+}
+
+ARCHIVE_COMPLETE_MARKER = '.complete'
+
+def measure(func, *args, **kwargs):
+    """
+    Run a function under tracemalloc.
+
+    Returns:
+        tuple: (result, elapsed seconds, peak traced memory in MB)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        if quiet_collector:
+            with redirect_stdout(io.StringIO()):
+                result = func(*args, **kwargs)
+        else:
+            result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+def summarize(files, elapsed, peak_memory_mb, latencies=None):
+    """Benchmark result: files, seconds, files/s, p50/p99 latency (seconds) and peak memory."""
+    return {
+        'files': files,
+        'seconds': round(elapsed, 4),
+        'files_per_second': round(files / elapsed, 2) if elapsed else None,
+        'latency_p50': float(np.percentile(latencies, 50)) if latencies else None,
+        'latency_p99': float(np.percentile(latencies, 99)) if latencies else None,
+        'peak_memory_mb': round(peak_memory_mb, 2),
+    }
+
+def place_station_images(share_root, lines, files_per_line, start_serial, captured_at):
+    """
+    Hardlink sample images onto the stand-in shares under station file names.
+
+    Returns:
+        list: Paths of the placed images
+    """
+    sample_files = {key: sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                                if f.lower().endswith(('.jpg', '.jpeg')))
+                    for key, folder in station_simulator.SAMPLE_IMAGE_FOLDERS.items()}
+    keys = list(sample_files)
+
+    jobs = []
+    for line_number, line in enumerate(lines):
+        share_folder = os.path.join(share_root, line['alias'])
+        first = start_serial + line_number * station_simulator.serials_per_line
+        serials = format_serials(np.arange(first, first + files_per_line))
+        for i, serial in enumerate(serials):
+            stage, bad = keys[i % len(keys)]
+            source = sample_files[(stage, bad)][i % len(sample_files[(stage, bad)])]
+            target = station_simulator.get_station_path(share_folder, line['alias'], serial, stage, bad,
+                                                        captured_at + timedelta(seconds=i))
+            jobs.append((source, target))
+
+    with redirect_stdout(io.StringIO()):
+        build_corpus(jobs, mode='hardlink')
+    return [target for _, target in jobs]
+
+def bench_cold_sync(collector, share_root, lines):
+    """Time process_existing_files over shares already holding station images."""
+    files = place_station_images(share_root, lines, cold_sync_files_per_line,
+                                 station_simulator.simulator_start_serial, datetime.now())
+    collector.processed_files.clear()
+    _, elapsed, peak = measure(collector.process_existing_files)
+    return summarize(len(files), elapsed, peak)
+
+def bench_share_listing(collector, use_manifest):
+    """Time listing the JPEG files on every share, by walking or from fresh manifests."""
+    share_paths = [collector.get_share_path(line) for line in collector.PRODUCTION_LINES]
+    if use_manifest:
+        for share_path in share_paths:
+            share_manifest.update_manifest(share_path)
+
+    def list_all():
+        if use_manifest:
+            return sum(len(share_manifest.list_share_files(path, JPEG_EXTENSIONS)) for path in share_paths)
+        return sum(count_files(path, JPEG_EXTENSIONS) for path in share_paths)
+
+    files, elapsed, peak = measure(list_all)
+    return summarize(files, elapsed, peak)
+
+def bench_steady_state(collector, share_root, lines):
+    """Time the event handler on newly created files, one event per file."""
+    files = place_station_images(share_root, lines, steady_state_files_per_line,
+                                 station_simulator.simulator_start_serial + cold_sync_files_per_line,
+                                 datetime.now())
+    handlers = {line['alias']: collector.ProductionLineFileHandler(line) for line in collector.PRODUCTION_LINES}
+    share_prefixes = [(os.path.join(collector.get_share_path(line), ''), line['alias'])
+                      for line in collector.PRODUCTION_LINES]
+
+    def deliver_events():
+        latencies = []
+        for file_path in files:
+            alias = next(alias for prefix, alias in share_prefixes if file_path.startswith(prefix))
+            start = time.perf_counter()
+            handlers[alias].on_created(FileCreatedEvent(file_path))
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    latencies, elapsed, peak = measure(deliver_events)
+    return summarize(len(files), elapsed, peak, latencies)
+
+def bench_archive_files(collector):
+    """Time archive_files moving everything in the centralized folder to the archive."""
+    pending = count_files(collector.centralized_folder)
+    _, elapsed, peak = measure(collector.archive_files)
+    return summarize(pending, elapsed, peak)
+
+def build_archive(archive_folder, alias, suffix, size):
+    """
+    Fill an archive folder with 'size' empty files named like archived collector output.
+
+    The archive is reused by later runs once it is complete.
+
+    Returns:
+        list: Archived file names
+    """
+    first_serial = 0xA00000
+    base_time = datetime(2024, 1, 1, 6, 0, 0)
+    serials = format_serials(np.arange(first_serial, first_serial + size))
+    names = []
+    jobs = []
+    empty_file = os.path.join(archive_folder, '.empty')
+    for i, serial in enumerate(serials):
+        day = base_time + timedelta(days=i // archive_files_per_folder)
+        captured_at = day + timedelta(seconds=i % archive_files_per_folder)
+        stamp = captured_at.strftime('%y%m%d_%H%M%S')
+        name = f"{serial}_{station_simulator.STATION_CODE}_A_{stamp}_{suffix}_A_{stamp}.jpg"
+        names.append(name)
+        jobs.append((empty_file, os.path.join(archive_folder, alias, day.strftime('%Y'), day.strftime('%m'),
+                                              day.strftime('%d'), f"Jinchen_{alias}_PostEL", name)))
+
+    marker = os.path.join(archive_folder, ARCHIVE_COMPLETE_MARKER)
+    if not os.path.exists(marker):
+        print(f"Building archive of {size} files in {archive_folder}...")
+        shutil.rmtree(archive_folder, ignore_errors=True)
+        os.makedirs(archive_folder)
+        open(empty_file, 'wb').close()
+        with redirect_stdout(io.StringIO()):
+            counts = build_corpus(jobs, mode='copy')
+        if counts['failed']:
+            raise RuntimeError(f"Could not build archive in {archive_folder}")
+        open(marker, 'w').close()
+    return names
+
+def bench_archive_lookup(collector, size, lines):
+    """Time file_exists_in_archive against an archive of 'size' files, half hits and half misses."""
+    alias = lines[0]['alias']
+    archive_folder = os.path.join(benchmark_root, 'archives', str(size))
+    names = build_archive(archive_folder, alias, lines[0]['suffix'], size)
+
+    rng = np.random.default_rng(size)
+    hits = [names[i] for i in rng.choice(size, archive_lookups // 2, replace=False)]
+    misses = [f"A{i:06X}_{station_simulator.STATION_CODE}_A_240101_060000.jpg"
+              for i in range(archive_lookups - len(hits))]
+
+    saved_archive = collector.archive_base_folder
+    collector.archive_base_folder = archive_folder
+    with redirect_stdout(io.StringIO()):
+        collector.reconcile_journal()
+
+    def lookup_all():
+        latencies = []
+        for file_name in hits + misses:
+            start = time.perf_counter()
+            found = collector.file_exists_in_archive(file_name, alias)
+            latencies.append(time.perf_counter() - start)
+            if found != (file_name in hits):
+                raise RuntimeError(f"Wrong archive lookup result for {file_name}")
+        return latencies
+
+    try:
+        latencies, elapsed, peak = measure(lookup_all)
+    finally:
+        collector.archive_base_folder = saved_archive
+    return summarize(len(latencies), elapsed, peak, latencies)
+
+def bench_journal_reconcile(collector, size, lines):
+    """Time a restart's journal reconciliation against an unchanged archive of 'size' files."""
+    archive_folder = os.path.join(benchmark_root, 'archives', str(size))
+    build_archive(archive_folder, lines[0]['alias'], lines[0]['suffix'], size)
+
+    saved_archive = collector.archive_base_folder
+    collector.archive_base_folder = archive_folder
+    try:
+        with redirect_stdout(io.StringIO()):
+            collector.reconcile_journal()
+        _, elapsed, peak = measure(collector.reconcile_journal)
+    finally:
+        collector.archive_base_folder = saved_archive
+    return summarize(size, elapsed, peak)
+
+def run_benchmarks(sizes=None, lines=None):
+    """
+    Run all collector benchmarks against fresh stand-in shares under benchmark_root.
+
+    Returns:
+        dict: Benchmark name -> result from summarize
+    """
+    sizes = archive_sizes if sizes is None else sizes
+    lines = lines or benchmark_lines
+    work_root = os.path.join(benchmark_root, 'collector')
+    shutil.rmtree(work_root, ignore_errors=True)
+    collector, share_root, _ = station_simulator.configure_collector(work_root, lines)
+    if unlimited_transfers:
+        collector.transfer_limiter = TransferLimiter(unlimited=True)
+
+    results = {}
+    print("Benchmark: cold sync (process_existing_files)...")
+    results['cold_sync'] = bench_cold_sync(collector, share_root, lines)
+    print("Benchmark: share listing (walk vs manifest)...")
+    results['share_listing_walk'] = bench_share_listing(collector, use_manifest=False)
+    results['share_listing_manifest'] = bench_share_listing(collector, use_manifest=True)
+    print("Benchmark: steady-state event handling...")
+    results['steady_state'] = bench_steady_state(collector, share_root, lines)
+    print("Benchmark: shift-end archival (archive_files)...")
+    results['archive_files'] = bench_archive_files(collector)
+    for size in sizes:
+        print(f"Benchmark: file_exists_in_archive with {size} archived files...")
+        results[f'archive_lookup_{size}'] = bench_archive_lookup(collector, size, lines)
+        print(f"Benchmark: startup journal reconciliation with {size} archived files...")
+        results[f'journal_reconcile_{size}'] = bench_journal_reconcile(collector, size, lines)
+
+    if collector.module_index is not None:
+        collector.module_index.close()
+        collector.module_index = None
+    if collector.journal is not None:
+        collector.journal.close()
+        collector.journal = None
+    collector.close_latency_tracker()
+    return results
+
+def compare_to_baseline(results, baseline, threshold=None):
+    """
+    List metrics that got worse than the baseline by more than the threshold.
+
+    Benchmarks whose file counts differ from the baseline are not compared.
+
+    Returns:
+        list: Regression descriptions
+    """
+    threshold = regression_threshold if threshold is None else threshold
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base or base.get('files') != result.get('files'):
+            continue
+        for metric, direction in METRIC_DIRECTIONS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * direction
+            if change < -threshold:
+                regressions.append(f"{name}.{metric}: {old:.4g} -> {new:.4g} ({abs(change):.0%} worse)")
+    return regressions
+
+def print_results(results, baseline=None):
+    """Print the benchmark table, with the baseline value of each metric when there is one."""
+    base_results = baseline.get('results', {}) if baseline else {}
+
+    def cell(name, metric, scale=1, unit=''):
+        value = results[name][metric]
+        text = f"{value * scale:.3f}{unit}" if value is not None else '-'
+        old = base_results.get(name, {}).get(metric)
+        if old is not None and value is not None:
+            text += f" (was {old * scale:.3f}{unit})"
+        return text
+
+    print(f"\n{'='*60}")
+    print("COLLECTOR BENCHMARK RESULTS")
+    print(f"{'='*60}")
+    for name in results:
+        print(f"{name}: {results[name]['files']} files in {results[name]['seconds']:.3f}s")
+        print(f"  files/s: {cell(name, 'files_per_second')}")
+        print(f"  latency p50: {cell(name, 'latency_p50', 1000, 'ms')}, p99: {cell(name, 'latency_p99', 1000, 'ms')}")
+        print(f"  peak memory: {cell(name, 'peak_memory_mb', 1, 'MB')}")
+    print(f"{'='*60}\n")
+
+def save_results(results, path):
+    """Save benchmark results with the machine they ran on."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(sep=' ', timespec='seconds'),
+            'machine': platform.node(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'results': results,
+        }, f, indent=2)
+
+def load_baseline(path=None):
+    """Load the saved baseline, or None."""
+    path = path or baseline_path
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+# Parameters
+save_as_baseline = False
+
+if __name__ == "__main__":
+    results = run_benchmarks()
+    baseline = load_baseline()
+    print_results(results, baseline)
+
+    results_path = os.path.join(results_folder, f"benchmark_{datetime.now().strftime('%y%m%d_%H%M%S')}.json")
+    save_results(results, results_path)
+    print(f"Results saved to {results_path}")
+
+    if baseline:
+        regressions = compare_to_baseline(results, baseline)
+        if regressions:
+            print("REGRESSIONS against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+        else:
+            print("No regressions against baseline.")
+    if save_as_baseline or baseline is None:
+        save_results(results, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
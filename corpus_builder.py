@@ -0,0 +1,189 @@
+import os
+import csv
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# How fixture files are placed: 'hardlink', 'reflink' or 'copy'
+# (hardlink and reflink fall back to copy when the filesystem does not support them)
+corpus_link_mode = 'hardlink'
+
+# Worker threads placing files
+corpus_workers = 16
+
+# Files placed per worker task
+corpus_chunk_size = 500
+
+# Linux FICLONE ioctl (copy-on-write clone on btrfs/XFS)
+FICLONE = 0x40049409
+
+def reflink_file(source_path, target_path):
+    """Create a copy-on-write clone of a file. Raises OSError where reflinks are not supported."""
+    if not sys.platform.startswith('linux'):
+        raise OSError(f"Reflinks are not supported on {sys.platform}")
+    import fcntl
+
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(target_path)
+            raise
+
+def place_file(source_path, target_path, mode):
+    """
+    Place one file with the requested mode, falling back to a copy.
+
+    Returns:
+        str: The mode actually used
+    """
+    # Replacing the target would delete the source (an existing hardlink elsewhere is fine)
+    if os.path.normcase(os.path.realpath(source_path)) == os.path.normcase(os.path.realpath(target_path)):
+        raise shutil.SameFileError(f"{source_path!r} and {target_path!r} are the same file")
+    if os.path.lexists(target_path):
+        os.remove(target_path)
+    if mode == 'hardlink':
+        try:
+            os.link(source_path, target_path)
+            return 'hardlink'
+        except OSError:
+            pass
+    elif mode == 'reflink':
+        try:
+            reflink_file(source_path, target_path)
+            return 'reflink'
+        except OSError:
+            pass
+    shutil.copyfile(source_path, target_path)
+    return 'copy'
+
+def write_manifest(manifest_path, records):
+    """Write the corpus manifest as CSV: target, source, mode, size."""
+    manifest_folder = os.path.dirname(manifest_path)
+    if manifest_folder:
+        os.makedirs(manifest_folder, exist_ok=True)
+    with open(manifest_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['target', 'source', 'mode', 'size'])
+        writer.writerows(records)
+
+def build_corpus(jobs, mode=None, max_workers=None, manifest_path=None):
+    """
+    Place fixture files in parallel.
+
+    Args:
+        jobs (list): (source_path, target_path) pairs
+        mode (str): 'hardlink', 'reflink' or 'copy' (default: corpus_link_mode)
+        max_workers (int): Worker threads (default: corpus_workers)
+        manifest_path (str): Optional CSV manifest of everything placed
+
+    Returns:
+        dict: Number of files placed per mode actually used, plus 'failed'
+    """
+    mode = mode or corpus_link_mode
+    max_workers = max_workers or corpus_workers
+    counts = {'hardlink': 0, 'reflink': 0, 'copy': 0, 'failed': 0}
+    counts_lock = threading.Lock()
+    records = []
+
+    # Create every target folder once instead of once per file
+    for folder in {os.path.dirname(target_path) for _, target_path in jobs}:
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def place_chunk(chunk):
+        chunk_counts = {key: 0 for key in counts}
+        chunk_records = []
+        for source_path, target_path in chunk:
+            try:
+                used_mode = place_file(source_path, target_path, mode)
+                chunk_counts[used_mode] += 1
+                if manifest_path:
+                    chunk_records.append((target_path, source_path, used_mode, os.path.getsize(source_path)))
+            except Exception as e:
+                chunk_counts['failed'] += 1
+                print(f"Error placing {source_path} -> {target_path}: {e}")
+        with counts_lock:
+            for key, value in chunk_counts.items():
+                counts[key] += value
+            records.extend(chunk_records)
+        return len(chunk)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(place_chunk, jobs[start:start + corpus_chunk_size])
+                   for start in range(0, len(jobs), corpus_chunk_size)]
+        for future in as_completed(futures):
+            done += future.result()
+            if len(futures) > 1:
+                print(f"Progress: {done}/{len(jobs)} files placed...")
+
+    if manifest_path:
+        records.sort()
+        write_manifest(manifest_path, records)
+        print(f"Manifest written to {manifest_path}")
+
+    placed = counts['hardlink'] + counts['reflink'] + counts['copy']
+    print(f"Placed {placed} files ({counts['hardlink']} hardlinked, {counts['reflink']} reflinked, "
+          f"{counts['copy']} copied, {counts['failed']} failed)")
+    return counts
+
+def list_source_files(source_folder, extensions):
+    """List the files in a folder whose names end with one of the extensions (case-insensitive)."""
+    with os.scandir(source_folder) as entries:
+        return sorted(entry.name for entry in entries
+                      if entry.is_file() and entry.name.lower().endswith(tuple(extensions)))
+
+def plan_duplicates(source_folder, target_folder, extensions, target_count, new_name, include_originals=True):
+    """
+    Plan the jobs that fill a target folder up to target_count files by cycling through the sources.
+
+    Args:
+        new_name (callable): new_name(i, original_file) -> file name of the i-th duplicate
+        include_originals (bool): Place the original files under their own names first
+
+    Returns:
+        tuple: (jobs, number of source files)
+    """
+    source_files = list_source_files(source_folder, extensions)
+    if not source_files:
+        return [], 0
+
+    jobs = []
+    if include_originals:
+        jobs.extend((os.path.join(source_folder, f), os.path.join(target_folder, f)) for f in source_files)
+    for i in range(max(target_count - len(source_files), 0)):
+        original_file = source_files[i % len(source_files)]
+        jobs.append((os.path.join(source_folder, original_file),
+                     os.path.join(target_folder, new_name(i, original_file))))
+    return jobs, len(source_files)
+
+def default_manifest_path(target_folder):
+    """
+    Manifest path next to a target folder (not inside it, so folder scans never pick it up).
+
+    The name carries a microsecond timestamp, plus a counter if that name is already taken.
+    """
+    target_folder = target_folder.rstrip('\\/')
+    base_path = f"{target_folder}_manifest_{datetime.now().strftime('%y%m%d_%H%M%S_%f')}"
+    manifest_path = f"{base_path}.csv"
+    counter = 1
+    while os.path.exists(manifest_path):
+        manifest_path = f"{base_path}_{counter}.csv"
+        counter += 1
+    return manifest_path
+
+# Parameters
+source_folder = 'D:\\new_data'
+target_folder = 'D:\\new_data1'
+prefix = 'A50339B_JIN_A_'
+target_count = 50
+
+if __name__ == "__main__":
+    datetime_suffix = datetime.now().strftime('%y%m%d_%H%M%S')
+    jobs, _ = plan_duplicates(source_folder, target_folder, ['.jpg', '.jpeg'], target_count,
+                              lambda i, original_file: f"{prefix}{datetime_suffix}_{i}.jpg")
+    build_corpus(jobs, manifest_path=default_manifest_path(target_folder))
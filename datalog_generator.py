@@ -0,0 +1,200 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Headers taken from DataLog2025-01.csv
+DATALOG_COLUMNS = [
+    'Cell(title)', 'Comment(EFF)', 'User', 'Ref', 'ID', 'Date', 'Time',
+    'Module type', 'Pmax', 'FF', 'Voc', 'Isc', 'Vpmax', 'Ipmax', 'Irr',
+    'CIrr', 'TMod', 'CTMod', 'Rs', 'Rsh', 'CellEff', 'ModEff', 'LTI',
+    'PN', 'ClassBin', 'MeasStat', 'MachStat'
+]
+
+# Distributions fitted on DataLog2025-01.csv (mean, standard deviation)
+VOC_DISTRIBUTION = (50.30, 0.14)
+ISC_DISTRIBUTION = (13.423, 0.022)
+FF_DISTRIBUTION = (81.0, 0.3)            # Percent, healthy modules
+VPM_RATIO_DISTRIBUTION = (0.848, 0.003)  # Vpmax / Voc
+IRR_DISTRIBUTION = (999.78, 0.085)
+TMOD_DISTRIBUTION = (23.8, 0.44)
+RS_DISTRIBUTION = (0.2546, 0.0074)
+RSH_MEDIAN = 300.0
+RSH_LOG_SIGMA = 0.25
+LTI_DISTRIBUTION = (0.00129, 0.00019)
+
+# Share of modules with a degraded fill factor, and the FF loss range in percent points
+DEFECT_RATE = 0.02
+DEFECT_FF_LOSS = (3.0, 8.0)
+
+# Seconds between measurements (exponential, plus the minimum flasher cycle time)
+MIN_CYCLE_SECONDS = 20
+MEAN_EXTRA_SECONDS = 35
+
+# Module area in dm^2 (ModEff = Pmax / MODULE_AREA)
+MODULE_AREA = 25.77
+
+# Power classes: (minimum Pmax, module type, class bin), checked from the highest class down
+POWER_CLASSES = [
+    (550.0, 'TP550HG10-8000011180', 3),
+    (545.0, 'TP545HG10-8000011181', 2),
+    (540.0, 'TP540HG10-8000011182', 1),
+    (535.0, 'TP535HG10-8000011183', 4),
+]
+UNCLASSIFIED = ('Unclassified', 5)
+
+MACH_STATUS_AT_RISK_RATE = 0.98
+
+# Constant columns as they appear in the real DataLog
+CELL_TITLE = 'AKS10D1'
+COMMENT = 'EFF-23.10%'
+USER = ' - ENGINEER'
+REF_PREFIX = 'I9'
+
+# First serial handed out when no start serial is given (A8C0000)
+DEFAULT_START_SERIAL = 0x8C0000
+
+# Time before the first measurement when no start time is given (fixed, so seeded files repeat)
+DEFAULT_START_TIME = datetime(2025, 1, 1)
+
+HEX_DIGITS = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)
+
+def format_serials(numbers):
+    """Format integers as 7 character serials 'A' + 6 uppercase hex digits, without a Python loop."""
+    numbers = np.asarray(numbers, dtype=np.int64)
+    chars = np.empty((len(numbers), 7), dtype=np.uint8)
+    chars[:, 0] = ord('A')
+    for position in range(6):
+        shift = 4 * (5 - position)
+        chars[:, position + 1] = HEX_DIGITS[(numbers >> shift) & 0xF]
+    return chars.view('S7')[:, 0].astype(str)
+
+def format_timestamps(timestamps):
+    """
+    Format datetime64 values as DataLog date (DD-MM-YYYY), time (HH:MM:SS) and Ref date (YYMMDD) strings.
+    """
+    iso = np.datetime_as_string(timestamps.astype('datetime64[s]'), unit='s').astype('S19')
+    chars = iso.view(np.uint8).reshape(-1, 19)
+
+    # ISO layout: YYYY-MM-DDTHH:MM:SS
+    date_chars = np.concatenate([chars[:, 8:10], chars[:, 4:5], chars[:, 5:7], chars[:, 4:5], chars[:, 0:4]], axis=1)
+    time_chars = np.ascontiguousarray(chars[:, 11:19])
+    ref_chars = np.concatenate([chars[:, 2:4], chars[:, 5:7], chars[:, 8:10]], axis=1)
+
+    return (np.ascontiguousarray(date_chars).view('S10')[:, 0].astype(str),
+            time_chars.view('S8')[:, 0].astype(str),
+            np.ascontiguousarray(ref_chars).view('S6')[:, 0].astype(str))
+
+def generate_datalog_chunk(rng, num_rows, start_serial, start_time):
+    """
+    Generate one chunk of DataLog rows with whole-column NumPy operations.
+
+    Args:
+        rng (numpy.random.Generator): Seeded generator, advanced by this call
+        num_rows (int): Rows in the chunk
+        start_serial (int): Serial number of the first row
+        start_time (numpy.datetime64): Measurement time of the previous row
+
+    Returns:
+        tuple: (DataFrame, next serial number, last measurement time)
+    """
+    voc = rng.normal(*VOC_DISTRIBUTION, num_rows)
+    isc = rng.normal(*ISC_DISTRIBUTION, num_rows)
+    ff = rng.normal(*FF_DISTRIBUTION, num_rows)
+    defective = rng.random(num_rows) < DEFECT_RATE
+    ff[defective] -= rng.uniform(*DEFECT_FF_LOSS, np.count_nonzero(defective))
+
+    pmax = voc * isc * ff / 100
+    vpmax = voc * rng.normal(*VPM_RATIO_DISTRIBUTION, num_rows)
+    ipmax = pmax / vpmax
+
+    # Power class from the highest class whose minimum Pmax is reached
+    module_type = np.full(num_rows, UNCLASSIFIED[0], dtype=object)
+    class_bin = np.full(num_rows, UNCLASSIFIED[1])
+    for minimum, name, bin_number in reversed(POWER_CLASSES):
+        reached = pmax >= minimum
+        module_type[reached] = name
+        class_bin[reached] = bin_number
+
+    intervals = MIN_CYCLE_SECONDS + rng.exponential(MEAN_EXTRA_SECONDS, num_rows)
+    timestamps = start_time + np.cumsum(intervals).astype('timedelta64[s]')
+    dates, times, ref_dates = format_timestamps(timestamps)
+
+    serials = format_serials(np.arange(start_serial, start_serial + num_rows))
+    refs = np.char.add(np.char.add(REF_PREFIX, ref_dates), serials)
+
+    df = pd.DataFrame({
+        'Cell(title)': CELL_TITLE,
+        'Comment(EFF)': COMMENT,
+        'User': USER,
+        'Ref': refs,
+        'ID': serials,
+        'Date': dates,
+        'Time': times,
+        'Module type': module_type,
+        'Pmax': pmax.round(3),
+        'FF': ff.round(4),
+        'Voc': voc.round(3),
+        'Isc': isc.round(3),
+        'Vpmax': vpmax.round(3),
+        'Ipmax': ipmax.round(3),
+        'Irr': rng.normal(*IRR_DISTRIBUTION, num_rows).round(1),
+        'CIrr': 1000,
+        'TMod': rng.normal(*TMOD_DISTRIBUTION, num_rows).round(1),
+        'CTMod': 25,
+        'Rs': rng.normal(*RS_DISTRIBUTION, num_rows).round(4),
+        'Rsh': rng.lognormal(np.log(RSH_MEDIAN), RSH_LOG_SIGMA, num_rows).round(4),
+        'CellEff': 'NA',
+        'ModEff': (pmax / MODULE_AREA).round(4),
+        'LTI': np.clip(rng.normal(*LTI_DISTRIBUTION, num_rows), 0.0001, None).round(4),
+        'PN': module_type,
+        'ClassBin': class_bin,
+        'MeasStat': 'Ok',
+        'MachStat': np.where(rng.random(num_rows) < MACH_STATUS_AT_RISK_RATE, 'At Risk', 'Ok'),
+    }, columns=DATALOG_COLUMNS)
+
+    return df, start_serial + num_rows, timestamps[-1]
+
+def write_datalog(output_path, num_rows, seed=None, chunk_size=100000, start_time=None, start_serial=None):
+    """
+    Write a synthetic DataLog CSV in chunks, so memory use does not grow with num_rows.
+
+    The same seed, chunk_size and start_time always produce the same file.
+
+    Args:
+        output_path (str): CSV file to write
+        num_rows (int): Total number of rows
+        seed (int): Seed for numpy.random.default_rng (None for a random file)
+        chunk_size (int): Rows generated and written per chunk
+        start_time (datetime): Time before the first measurement (default: DEFAULT_START_TIME)
+        start_serial (int): Serial number of the first module (default: A8C0000)
+    """
+    output_folder = os.path.dirname(output_path)
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    current_time = np.datetime64(start_time or DEFAULT_START_TIME, 's')
+    next_serial = DEFAULT_START_SERIAL if start_serial is None else start_serial
+
+    rows_written = 0
+    with open(output_path, 'w', newline='') as f:
+        while rows_written < num_rows:
+            rows = min(chunk_size, num_rows - rows_written)
+            df, next_serial, current_time = generate_datalog_chunk(rng, rows, next_serial, current_time)
+            df.to_csv(f, index=False, header=rows_written == 0)
+            rows_written += rows
+
+            if rows_written % (chunk_size * 10) == 0:
+                print(f"Progress: {rows_written}/{num_rows} rows written...")
+
+    print(f"Data Log CSV file '{output_path}' created successfully with {rows_written} rows.")
+    return rows_written
+
+# Parameters
+output_path = "D:\\csv\\DataLog.csv"
+num_rows = 100
+seed = None
+
+if __name__ == "__main__":
+    write_datalog(output_path, num_rows, seed=seed)
@@ -0,0 +1,263 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+
+from module_index import parse_el_filename, get_el_stage, get_el_quality, IMAGE_EXTENSIONS
+from fs_walker import find_files
+import storage_tiers
+
+# Columnar feature table: a folder of Parquet part files, one row per image, keyed by the stored
+# file name (paths change when images are archived or tiered); each update adds one part file
+features_table_path = "D:\\ELimagesnew\\el_features"
+
+# Parts are merged into one file once the table has more than this many
+max_table_parts = 50
+
+# Cell grid of the modules as seen in the images: (rows, columns); 144 half-cell modules
+cell_grid = (6, 24)
+
+# Images are decoded in draft mode to about this size; features do not need full resolution
+decode_max_size = 1400
+
+# Rows/columns of the image darker than this fraction of the median are background around the module
+module_edge_threshold = 0.5
+
+# The module is cropped out and resampled to this size (width, height), a whole number of
+# pixels per cell of cell_grid, so the grid lies on the actual cells
+module_size = (1392, 696)
+
+# A cell is dark when its mean luminance is below this fraction of the image's median cell
+dark_cell_threshold = 0.6
+
+# A pixel is an edge when its gradient exceeds this multiple of the image's mean luminance
+# (cracks show up as thin sharp dark lines inside otherwise smooth cells)
+edge_threshold = 0.25
+
+# Images per work unit handed to a worker process
+chunk_size = 32
+
+FEATURE_COLUMNS = ['mean_luminance', 'luminance_variance', 'dark_cell_fraction',
+                   'edge_density', 'max_cell_edge_density']
+
+def crop_to_module(pixels, threshold=None):
+    """Crop a luminance image to the module: the rows and columns brighter than threshold x median."""
+    threshold = module_edge_threshold if threshold is None else threshold
+    level = threshold * max(float(np.median(pixels)), 1.0)
+    rows = np.flatnonzero(pixels.mean(axis=1) > level)
+    columns = np.flatnonzero(pixels.mean(axis=0) > level)
+    if len(rows) > 1 and len(columns) > 1:
+        pixels = pixels[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+    return pixels
+
+def load_luminance(file_path):
+    """
+    Decode an EL image as a float32 luminance array, scaled down in the JPEG decoder, cropped
+    to the module and resampled to module_size.
+    """
+    with Image.open(file_path) as image:
+        # draft() keeps both sides at least the requested size, so request the scaled shape
+        scale = decode_max_size / max(image.size)
+        image.draft('L', (int(image.width * scale), int(image.height * scale)))
+        pixels = np.asarray(image.convert('L'), dtype=np.float32)
+    pixels = crop_to_module(pixels)
+    return np.asarray(Image.fromarray(pixels, 'F').resize(module_size, Image.BILINEAR))
+
+def split_cells(images, grid=None):
+    """
+    View a stack of images as cells.
+
+    Args:
+        images (ndarray): (N, H, W) stack; edge pixels not filling a whole cell are dropped
+
+    Returns:
+        ndarray: (N, rows, cell_height, columns, cell_width)
+    """
+    rows, columns = grid or cell_grid
+    count, height, width = images.shape
+    cell_height, cell_width = height // rows, width // columns
+    cropped = images[:, :cell_height * rows, :cell_width * columns]
+    return cropped.reshape(count, rows, cell_height, columns, cell_width)
+
+def compute_features(images, grid=None):
+    """
+    Compute features for a stack of same-sized luminance images.
+
+    Returns:
+        dict: feature name -> (N,) array, plus 'cell_means' and 'cell_edge_density' as
+              (N, rows * columns) arrays
+    """
+    count = images.shape[0]
+    flat = images.reshape(count, -1)
+    mean = flat.mean(axis=1)
+    variance = flat.var(axis=1)
+
+    cells = split_cells(images, grid)
+    cell_means = cells.mean(axis=(2, 4))
+    median_cell = np.median(cell_means.reshape(count, -1), axis=1)
+    dark = cell_means < dark_cell_threshold * median_cell[:, None, None]
+
+    # Gradient magnitude from forward differences, padded back to the image size
+    gradient_y = np.abs(np.diff(images, axis=1, append=images[:, -1:, :]))
+    gradient_x = np.abs(np.diff(images, axis=2, append=images[:, :, -1:]))
+    edges = np.maximum(gradient_x, gradient_y) > edge_threshold * np.maximum(mean, 1.0)[:, None, None]
+    cell_edges = split_cells(edges, grid).mean(axis=(2, 4))
+
+    return {
+        'mean_luminance': mean,
+        'luminance_variance': variance,
+        'dark_cell_fraction': dark.reshape(count, -1).mean(axis=1),
+        'edge_density': edges.reshape(count, -1).mean(axis=1),
+        'max_cell_edge_density': cell_edges.reshape(count, -1).max(axis=1),
+        'cell_means': cell_means.reshape(count, -1),
+        'cell_edge_density': cell_edges.reshape(count, -1),
+    }
+
+def extract_chunk(file_paths):
+    """
+    Decode a chunk of images and compute their features (runs in a worker process).
+
+    Images are grouped by decoded size so each group is computed as one stacked array.
+
+    Returns:
+        list: one row dict per image that could be decoded
+    """
+    groups = {}
+    for file_path in file_paths:
+        try:
+            image = load_luminance(file_path)
+        except Exception as e:
+            print(f"Error decoding {file_path}: {e}")
+            continue
+        groups.setdefault(image.shape, []).append((file_path, image))
+
+    rows = []
+    for group in groups.values():
+        features = compute_features(np.stack([image for _, image in group]))
+        for i, (file_path, _) in enumerate(group):
+            file_name = os.path.basename(file_path)
+            info = parse_el_filename(file_name) or {}
+            row = {
+                'serial': info.get('serial'),
+                'file_name': file_name,
+                'path': file_path,
+                'stage': get_el_stage(file_path),
+                'quality': get_el_quality(file_path),
+                'captured_at': info.get('captured_at'),
+                'height': group[0][1].shape[0],
+                'width': group[0][1].shape[1],
+            }
+            for name in FEATURE_COLUMNS:
+                row[name] = float(features[name][i])
+            row['cell_means'] = features['cell_means'][i].round(2).tolist()
+            row['cell_edge_density'] = features['cell_edge_density'][i].round(4).tolist()
+            rows.append(row)
+    return rows
+
+def find_images(folder):
+    """List the EL images under a folder."""
+    return find_files(folder, IMAGE_EXTENSIONS)
+
+def extract_features(file_paths, max_workers=None):
+    """
+    Compute features for images in a process pool, chunk_size images per work unit.
+
+    Returns:
+        DataFrame: one row per image
+    """
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(extract_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                print(f"Error extracting features: {e}")
+                continue
+            print(f"Progress: {len(rows)}/{len(file_paths)} images...")
+    return pd.DataFrame(rows)
+
+def list_table_parts(table_path=None):
+    """List the Parquet part files of the feature table."""
+    table_path = table_path or features_table_path
+    if not os.path.isdir(table_path):
+        return []
+    return sorted(os.path.join(table_path, name) for name in os.listdir(table_path)
+                  if name.endswith('.parquet'))
+
+def load_features(table_path=None):
+    """Load the feature table (all part files), or None if it does not exist yet."""
+    table_path = table_path or features_table_path
+    if os.path.isfile(table_path):
+        # Single-file table from before the part files
+        return pd.read_parquet(table_path)
+    parts = list_table_parts(table_path)
+    if not parts:
+        return None
+    features = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+    # A later part wins if an image was extracted twice
+    return features.drop_duplicates('file_name', keep='last').reset_index(drop=True)
+
+def write_table_part(features, table_path, part_name):
+    """Write one part file of the table, atomically so readers never see a partial file."""
+    temp_path = os.path.join(table_path, f".{part_name}.{os.getpid()}.tmp")
+    features.sort_values(['serial', 'captured_at'], na_position='last').to_parquet(temp_path, index=False)
+    os.replace(temp_path, os.path.join(table_path, f"{part_name}.parquet"))
+
+def save_features(features, table_path=None):
+    """Add rows to the feature table as a new part file, merging the parts once there are too many."""
+    table_path = table_path or features_table_path
+    if os.path.isfile(table_path):
+        # Move a single-file table into the folder as its first part
+        legacy_path = f"{table_path}.legacy"
+        os.replace(table_path, legacy_path)
+        os.makedirs(table_path, exist_ok=True)
+        os.replace(legacy_path, os.path.join(table_path, 'part-00000000.parquet'))
+    os.makedirs(table_path, exist_ok=True)
+    write_table_part(features, table_path, f"part-{datetime.now().strftime('%y%m%d_%H%M%S_%f')}")
+    if len(list_table_parts(table_path)) > max_table_parts:
+        compact_features(table_path)
+
+def compact_features(table_path=None):
+    """Merge the part files of the feature table into one."""
+    table_path = table_path or features_table_path
+    parts = list_table_parts(table_path)
+    features = load_features(table_path)
+    if features is None:
+        return
+    # Named to sort after the parts it replaces
+    write_table_part(features, table_path, f"part-{datetime.now().strftime('%y%m%d_%H%M%S_%f')}-merged")
+    for part in parts:
+        os.remove(part)
+
+def update_features(folder, table_path=None, max_workers=None):
+    """
+    Add features for the images under a folder that are not in the table yet (by stored file
+    name, so images moved to the archive or cold tier since are not extracted again).
+
+    Returns:
+        int: Number of images added
+    """
+    existing = load_features(table_path)
+    known_names = set(existing['file_name']) if existing is not None else set()
+    new_files = [path for path in find_images(folder) if os.path.basename(path) not in known_names]
+    if not new_files:
+        print(f"No new images under {folder}")
+        return 0
+
+    print(f"Extracting features for {len(new_files)} images under {folder}...")
+    features = extract_features(new_files, max_workers)
+    if features.empty:
+        return 0
+    save_features(features, table_path)
+    print(f"Added features for {len(features)} images to {table_path or features_table_path}")
+    return len(features)
+
+# Parameters
+archive_folder = storage_tiers.warm_archive_folder
+
+if __name__ == "__main__":
+    update_features(archive_folder)
@@ -0,0 +1,238 @@
+import os
+import numpy as np
+from datetime import datetime
+from PIL import Image
+
+from module_index import ModuleIndex, parse_el_filename, get_el_stage
+from el_features import split_cells, crop_to_module, cell_grid
+
+# Difference maps of paired images (8-bit PNG, brighter = darker after lamination)
+pair_diff_folder = "D:\\ELimagesnew\\el_pairs"
+
+# Both images are cropped to the module and resampled to this size (width, height) before
+# alignment and comparison
+analysis_size = (1360, 696)
+
+# Rows/columns of the image darker than this fraction of the median are background around the module
+module_edge_threshold = 0.5
+
+# Largest misplacement between the PreEL and PostEL captures, as a fraction of the image size
+max_shift_fraction = 0.05
+
+# Largest extra shift of a single cell after the global alignment (lamination and the different
+# framing of the two stations move cells by a few pixels relative to each other)
+max_cell_shift = 8
+
+# Side of the pixel blocks the difference is averaged over (suppresses sensor noise)
+diff_block_size = 4
+
+# A block is a new defect when it got darker than the rest of its cell by more than this
+# fraction of the cell's median brightness (cracks, dark spots)
+defect_threshold = 0.25
+
+# A cell is flagged when more than this fraction of it is new defect area, or when the whole cell
+# is more than dark_cell_drop below the module's median cell while it was not before (inactive cell)
+cell_defect_fraction = 0.01
+dark_cell_drop = 0.4
+
+def load_normalized(file_path):
+    """
+    Decode an image (draft mode), scale it to median brightness 1, crop it to the module and
+    resample it to analysis_size.
+
+    Cropping to the module removes the different framing and scale of the PreEL and PostEL
+    stations, and puts the cell grid on the actual cells.
+    """
+    with Image.open(file_path) as image:
+        image.draft('L', analysis_size)
+        pixels = np.asarray(image.convert('L'), dtype=np.float32)
+    pixels = crop_to_module(pixels / max(float(np.median(pixels)), 1.0), module_edge_threshold)
+    return np.asarray(Image.fromarray(pixels, 'F').resize(analysis_size, Image.BILINEAR))
+
+def find_shifts(reference, moved):
+    """
+    Translation of 'moved' relative to 'reference' by phase correlation, for a stack of images.
+
+    Args:
+        reference, moved (ndarray): (..., H, W) arrays
+
+    Returns:
+        tuple: (dy, dx) integer arrays of shape (...) to roll 'moved' by to align it
+    """
+    reference = reference - reference.mean(axis=(-2, -1), keepdims=True)
+    moved = moved - moved.mean(axis=(-2, -1), keepdims=True)
+    height, width = reference.shape[-2:]
+    spectrum = np.fft.rfft2(reference) * np.conj(np.fft.rfft2(moved))
+    correlation = np.fft.irfft2(spectrum / np.maximum(np.abs(spectrum), 1e-9), s=(height, width))
+    peak = np.argmax(correlation.reshape(*correlation.shape[:-2], -1), axis=-1)
+    dy, dx = np.divmod(peak, width)
+    dy = np.where(dy > height // 2, dy - height, dy)
+    dx = np.where(dx > width // 2, dx - width, dx)
+    return dy, dx
+
+def to_cells(image, grid=None):
+    """(H, W) image -> (cells, cell_height, cell_width) stack, row by row."""
+    cells = split_cells(image[None], grid)[0]
+    rows, cell_height, columns, cell_width = cells.shape
+    return cells.transpose(0, 2, 1, 3).reshape(rows * columns, cell_height, cell_width)
+
+def roll_cells(cells, dy, dx):
+    """
+    Roll every cell of a stack by its own (dy, dx).
+
+    Returns:
+        tuple: (rolled cells, boolean mask of the pixels that did not wrap around)
+    """
+    count, height, width = cells.shape
+    rows = np.arange(height)[None, :] - dy[:, None]
+    columns = np.arange(width)[None, :] - dx[:, None]
+    valid = ((rows >= 0) & (rows < height))[:, :, None] & ((columns >= 0) & (columns < width))[:, None, :]
+    rolled = cells[np.arange(count)[:, None, None], (rows % height)[:, :, None], (columns % width)[:, None, :]]
+    return rolled, valid
+
+def compare_images(pre, post, grid=None):
+    """
+    Align a PostEL image to its PreEL image and compute the new darkening.
+
+    The image is aligned as a whole, then every cell is aligned on its own. Each cell is
+    compared at its own brightness, so cells that only changed in overall current (common
+    after lamination) do not count as defects; a cell going dark as a whole is checked
+    separately against the rest of the module.
+
+    Args:
+        pre, post (ndarray): Normalized images from load_normalized
+
+    Returns:
+        dict: 'shift', 'diff' (block-averaged darkening map), 'score' (new defect area
+              fraction), 'cell_defects' and 'dark_cells' (per cell) and 'new_defect_cells'
+    """
+    rows, columns = grid or cell_grid
+    height, width = pre.shape
+    dy, dx = (int(value) for value in find_shifts(pre, post))
+    if abs(dy) > height * max_shift_fraction or abs(dx) > width * max_shift_fraction:
+        # A peak this far out is noise, not a misplaced module
+        dy, dx = 0, 0
+    aligned, valid = roll_cells(post[None], np.array([dy]), np.array([dx]))
+
+    pre_cells = to_cells(pre, grid)
+    post_cells = to_cells(aligned[0], grid)
+    valid = to_cells(valid[0], grid)
+    cell_dy, cell_dx = find_shifts(pre_cells, post_cells)
+    too_far = (np.abs(cell_dy) > max_cell_shift) | (np.abs(cell_dx) > max_cell_shift)
+    cell_dy[too_far] = 0
+    cell_dx[too_far] = 0
+    post_cells, cell_valid = roll_cells(post_cells, cell_dy, cell_dx)
+    valid = roll_cells(valid, cell_dy, cell_dx)[0] & cell_valid
+
+    # Newly inactive cells: whole-cell brightness against the module's median cell in the same
+    # image (the two stations light the module differently, so levels are not compared directly)
+    pre_level = np.median(pre_cells, axis=(1, 2))
+    post_level = np.median(post_cells, axis=(1, 2))
+    dark_cells = (post_level < (1 - dark_cell_drop) * np.median(post_level)) & \
+        (pre_level >= (1 - dark_cell_drop) * np.median(pre_level))
+
+    # Local darkening within each cell, except where the rolls wrapped around
+    darkening = pre_cells / np.maximum(pre_level, 1e-3)[:, None, None] - \
+        post_cells / np.maximum(post_level, 1e-3)[:, None, None]
+    darkening[~valid] = 0
+
+    block = diff_block_size
+    count, cell_height, cell_width = darkening.shape
+    blocks = darkening[:, :cell_height // block * block, :cell_width // block * block]
+    diff = blocks.reshape(count, cell_height // block, block, cell_width // block, block).mean(axis=(2, 4))
+    defects = diff > defect_threshold
+    cell_defects = defects.mean(axis=(1, 2))
+
+    # Back to one map in module layout
+    diff_map = diff.reshape(rows, columns, *diff.shape[1:]).transpose(0, 2, 1, 3)
+    diff_map = diff_map.reshape(rows * diff.shape[1], columns * diff.shape[2])
+    flagged = (cell_defects > cell_defect_fraction) | dark_cells
+    return {
+        'shift': (dy, dx),
+        'diff': diff_map,
+        'score': float(defects.mean()),
+        'cell_defects': cell_defects.reshape(rows, columns),
+        'dark_cells': dark_cells.reshape(rows, columns),
+        'new_defect_cells': int(flagged.sum()),
+    }
+
+def save_diff_map(diff, serial, post_file_name):
+    """Write a difference map as an 8-bit PNG. Returns its path."""
+    os.makedirs(pair_diff_folder, exist_ok=True)
+    path = os.path.join(pair_diff_folder, f"{serial}_{os.path.splitext(post_file_name)[0]}_diff.png")
+    scaled = np.clip(diff / (2 * defect_threshold), 0, 1) * 255
+    Image.fromarray(scaled.astype(np.uint8)).save(path)
+    return path
+
+def pair_images(module_index, pre_row, post_row):
+    """
+    Compare the PreEL and PostEL images of a module and store the result in the module index.
+
+    Returns:
+        dict: The stored pair row
+    """
+    result = compare_images(load_normalized(pre_row['path']), load_normalized(post_row['path']))
+    serial = post_row['serial']
+    row = {
+        'post_file_name': post_row['file_name'],
+        'serial': serial,
+        'pre_path': pre_row['path'],
+        'post_path': post_row['path'],
+        'shift_y': result['shift'][0],
+        'shift_x': result['shift'][1],
+        'score': result['score'],
+        'new_defect_cells': result['new_defect_cells'],
+        'flagged': int(result['new_defect_cells'] > 0),
+        'diff_path': save_diff_map(result['diff'], serial, post_row['file_name']),
+        'computed_at': datetime.now().isoformat(sep=' ', timespec='seconds'),
+    }
+    module_index.add_el_pair(row)
+    if row['flagged']:
+        rows, columns = cell_grid
+        cells = np.argwhere((result['cell_defects'] > cell_defect_fraction) | result['dark_cells'])
+        cell_names = ', '.join(f"r{r + 1}c{c + 1}" for r, c in cells[:10])
+        print(f"NEW DEFECTS on {serial}: {row['new_defect_cells']} of {rows * columns} cells "
+              f"({cell_names}), score {row['score']:.4f}, diff map {row['diff_path']}")
+    return row
+
+def pair_new_image(module_index, file_path):
+    """
+    Pair an image that just arrived with the other stage of the same module, if indexed.
+
+    A PostEL image is paired with the module's latest PreEL image and vice versa (for a
+    PreEL image that arrives late). The image must already be in the module index.
+
+    Returns:
+        dict or None: The stored pair row, or None if there is nothing to pair with
+    """
+    info = parse_el_filename(os.path.basename(file_path))
+    stage = get_el_stage(file_path)
+    if info is None or stage not in ('PreEL', 'PostEL'):
+        return None
+
+    other = module_index.find_image(info['serial'], 'PostEL' if stage == 'PreEL' else 'PreEL')
+    this = module_index.find_image(info['serial'], stage)
+    if other is None or this is None:
+        return None
+    pre_row, post_row = (this, other) if stage == 'PreEL' else (other, this)
+    return pair_images(module_index, pre_row, post_row)
+
+def pair_all(module_index):
+    """Pair every module in the index that has both a PreEL and a PostEL image. Returns the count."""
+    paired = 0
+    for serial in module_index.get_serials_with_stages('PreEL', 'PostEL'):
+        try:
+            pair_images(module_index, module_index.find_image(serial, 'PreEL'),
+                        module_index.find_image(serial, 'PostEL'))
+            paired += 1
+        except Exception as e:
+            print(f"Error pairing {serial}: {e}")
+    print(f"Paired {paired} modules")
+    return paired
+
+if __name__ == "__main__":
+    index = ModuleIndex()
+    try:
+        pair_all(index)
+    finally:
+        index.close()
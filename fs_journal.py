@@ -0,0 +1,223 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Persistent journal of the files in the central store and archive
+journal_db_path = "D:\\ELimagesnew\\fs_journal.db"
+
+# Directories modified this recently are not checkpointed: a change within the same timestamp
+# tick as the listing would otherwise go unnoticed (coarse mtimes on some file systems)
+mtime_settle_seconds = 2.0
+
+class FileJournal:
+    """
+    Persistent record of the files the collector keeps (centralized folder and archive).
+
+    The collector journals every file it creates or moves, so lookups and counts never walk
+    the trees. Changes made by others are picked up by reconcile(), which stats the known
+    directories and lists only those whose modification time changed since the last
+    checkpoint; a directory's mtime changes whenever an entry is added, removed or renamed
+    in it. Restart cost follows the activity since the last checkpoint, not the archive size.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or journal_db_path
+        db_folder = os.path.dirname(self.db_path)
+        if db_folder:
+            os.makedirs(db_folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                dir TEXT NOT NULL,
+                name TEXT NOT NULL,
+                alias TEXT,
+                state TEXT,
+                original_name TEXT,
+                source TEXT,
+                size INTEGER,
+                mtime REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_files_dir ON files(dir);
+            CREATE INDEX IF NOT EXISTS idx_files_alias_state ON files(alias, state);
+            CREATE INDEX IF NOT EXISTS idx_files_original ON files(alias, original_name);
+            CREATE INDEX IF NOT EXISTS idx_files_name ON files(alias, name);
+
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs(parent);
+        """)
+        self.conn.commit()
+
+    def close(self):
+        """Close the journal database."""
+        with self.lock:
+            self.conn.close()
+
+    def record_create(self, path, alias, state, original_name=None, source=None):
+        """Journal a file the collector wrote."""
+        try:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            size, mtime = None, None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, dir, name, alias, state, original_name, source, size, mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, os.path.dirname(path), os.path.basename(path), alias, state,
+                 original_name or os.path.basename(path), source, size, mtime)
+            )
+            self.conn.commit()
+
+    def record_move(self, old_path, new_path, state):
+        """Journal a file the collector moved (keeps its alias, original name and source)."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE files SET path = ?, dir = ?, name = ?, state = ? WHERE path = ?",
+                (new_path, os.path.dirname(new_path), os.path.basename(new_path), state, old_path)
+            )
+            self.conn.commit()
+
+    def record_remove(self, path):
+        """Journal a file that is gone."""
+        with self.lock:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self.conn.commit()
+
+    def has_file(self, alias, file_name, state=None):
+        """Check for a file of a line by its station (original) or stored name."""
+        state_filter = "" if state is None else " AND state = ?"
+        params = [alias, file_name] + ([] if state is None else [state])
+        with self.lock:
+            # One indexed lookup per column (an OR across them would scan the line's files)
+            for column in ('original_name', 'name'):
+                query = f"SELECT 1 FROM files WHERE alias = ? AND {column} = ?{state_filter} LIMIT 1"
+                if self.conn.execute(query, params).fetchone() is not None:
+                    return True
+        return False
+
+    def count_files(self, alias, state):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM files WHERE alias = ? AND state = ?",
+                                     (alias, state)).fetchone()[0]
+
+    def list_files(self, alias, state):
+        """Paths of the journaled files of a line in a state, sorted."""
+        with self.lock:
+            rows = self.conn.execute("SELECT path FROM files WHERE alias = ? AND state = ? ORDER BY path",
+                                     (alias, state)).fetchall()
+        return [row['path'] for row in rows]
+
+    def get_sources(self):
+        """Station paths of the journaled files (the files already collected)."""
+        with self.lock:
+            rows = self.conn.execute("SELECT source FROM files WHERE source IS NOT NULL").fetchall()
+        return {row['source'] for row in rows}
+
+    def forget_tree(self, path):
+        """Drop a directory that no longer exists, with everything below it."""
+        prefix = os.path.join(path, '')
+        like = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        self.conn.execute("DELETE FROM files WHERE dir = ? OR dir LIKE ? ESCAPE '\\'", (path, like))
+        self.conn.execute("DELETE FROM dirs WHERE path = ? OR path LIKE ? ESCAPE '\\'", (path, like))
+
+    def reconcile_dir(self, path, describe, stats):
+        """Relist one changed directory. Returns its subdirectories."""
+        entries = {}
+        subdirs = []
+        with os.scandir(path) as scan:
+            for entry in scan:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    entries[entry.path] = entry
+
+        known = {row['path']: row for row in
+                 self.conn.execute("SELECT path, size, mtime FROM files WHERE dir = ?", (path,))}
+        for file_path in known.keys() - entries.keys():
+            self.conn.execute("DELETE FROM files WHERE path = ?", (file_path,))
+            stats['files_removed'] += 1
+        for file_path, entry in entries.items():
+            stat = entry.stat()
+            row = known.get(file_path)
+            if row is not None and row['size'] == stat.st_size and row['mtime'] == stat.st_mtime:
+                continue
+            alias, state, original_name = describe(file_path)
+            if alias is None:
+                continue
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO files (path, dir, name, alias, state, original_name, size, mtime) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (file_path, path, entry.name, alias, state, original_name, stat.st_size, stat.st_mtime)
+                )
+                stats['files_added'] += 1
+            else:
+                self.conn.execute("UPDATE files SET size = ?, mtime = ? WHERE path = ?",
+                                  (stat.st_size, stat.st_mtime, file_path))
+
+        known_subdirs = {row['path'] for row in self.conn.execute("SELECT path FROM dirs WHERE parent = ?", (path,))}
+        for gone in known_subdirs - set(subdirs):
+            self.forget_tree(gone)
+        return subdirs
+
+    def reconcile(self, roots, describe):
+        """
+        Bring the journal in line with the folders under the given roots, listing only the
+        directories that changed since the last checkpoint, and checkpoint them. Folders of
+        roots from earlier calls that are not among the roots any more are dropped.
+
+        Args:
+            roots (list): Top folders (a root inside another root is visited once)
+            describe (callable): path -> (alias, state, original name); alias None to ignore the file
+
+        Returns:
+            dict: 'dirs_checked', 'dirs_listed', 'files_added', 'files_removed'
+        """
+        stats = {'dirs_checked': 0, 'dirs_listed': 0, 'files_added': 0, 'files_removed': 0}
+        with self.lock:
+            checkpoints = {row['path']: row['mtime'] for row in self.conn.execute("SELECT path, mtime FROM dirs")}
+            children = {}
+            for row in self.conn.execute("SELECT path, parent FROM dirs"):
+                children.setdefault(row['parent'], []).append(row['path'])
+
+            visited = set()
+            stack = [(root, None) for root in roots]
+            while stack:
+                path, parent = stack.pop()
+                if path in visited:
+                    continue
+                visited.add(path)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    if path in checkpoints:
+                        self.forget_tree(path)
+                    continue
+                stats['dirs_checked'] += 1
+
+                if checkpoints.get(path) == mtime:
+                    subdirs = children.get(path, [])
+                else:
+                    subdirs = self.reconcile_dir(path, describe, stats)
+                    stats['dirs_listed'] += 1
+                    settled = time.time() - mtime >= mtime_settle_seconds
+                    self.conn.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime) VALUES (?, ?, ?)",
+                                      (path, parent, mtime if settled else None))
+                stack.extend((subdir, path) for subdir in subdirs)
+
+            # Trees of roots that are no longer reconciled
+            for path in children.get(None, []):
+                if path not in visited:
+                    self.forget_tree(path)
+            self.conn.commit()
+        return stats
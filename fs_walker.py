@@ -0,0 +1,99 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Threads listing directories in parallel; on a share every listing is a network round-trip,
+# so sibling folders are listed at the same time instead of one after another
+walk_workers = 8
+
+# Folders never descended into
+skip_dir_names = {'$RECYCLE.BIN', 'System Volume Information'}
+
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+# One file found by walk_files. rel_dir is the folder relative to the walk root ('' at the
+# root); size and mtime come from the directory listing and are None when stat=False.
+FileRecord = namedtuple('FileRecord', ['path', 'name', 'rel_dir', 'size', 'mtime'])
+
+def list_dir(path, rel_dir, extensions, skip_dirs, prune, stat):
+    """
+    List one folder (runs on a walker thread).
+
+    Returns:
+        tuple: (file records, [(subfolder path, relative subfolder)])
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.is_symlink() or entry.name in skip_dirs or (prune is not None and prune(entry)):
+                        continue
+                    subdirs.append((entry.path, os.path.join(rel_dir, entry.name)))
+                    continue
+                if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                    continue
+                if stat:
+                    # Comes with the listing on Windows; one stat call elsewhere
+                    entry_stat = entry.stat()
+                    files.append(FileRecord(entry.path, entry.name, rel_dir, entry_stat.st_size, entry_stat.st_mtime))
+                else:
+                    files.append(FileRecord(entry.path, entry.name, rel_dir, None, None))
+    except FileNotFoundError:
+        # Removed while walking
+        pass
+    except OSError as e:
+        print(f"Error listing {path}: {e}")
+    return files, subdirs
+
+def walk_files(root, extensions=None, skip_dirs=None, prune=None, stat=True, recursive=True, max_workers=None,
+               folders=None):
+    """
+    Yield the files under a folder, listing subfolders in parallel.
+
+    Every folder is listed once with os.scandir, and the type and stat data of the listing
+    are reused, so there are no per-file exists/isfile/getmtime calls. Files come in no
+    particular order.
+
+    Args:
+        root (str): Folder to walk
+        extensions (iterable): Lowercase extensions to keep, e.g. ('.jpg', '.jpeg'); None for all files
+        skip_dirs (set): Folder names not to descend into (default skip_dir_names)
+        prune (callable): DirEntry -> True to skip that folder
+        stat (bool): Fill in size and mtime (free on Windows, one stat per file elsewhere)
+        recursive (bool): Descend into subfolders
+        max_workers (int): Listing threads (default walk_workers)
+        folders (list): If given, the relative path of every folder listed is appended ('' for root)
+
+    Yields:
+        FileRecord: One per file
+    """
+    extensions = None if extensions is None else {extension.lower() for extension in extensions}
+    skip_dirs = skip_dir_names if skip_dirs is None else skip_dirs
+    executor = ThreadPoolExecutor(max_workers=max_workers or walk_workers)
+    try:
+        pending = {executor.submit(list_dir, root, '', extensions, skip_dirs, prune, stat)}
+        if folders is not None:
+            folders.append('')
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                if recursive:
+                    for path, rel_dir in subdirs:
+                        if folders is not None:
+                            folders.append(rel_dir)
+                        pending.add(executor.submit(list_dir, path, rel_dir, extensions, skip_dirs, prune, stat))
+                yield from files
+    finally:
+        # Also reached when the caller stops early
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def find_files(root, extensions=None, **kwargs):
+    """Sorted paths of the files under a folder (see walk_files)."""
+    return sorted(record.path for record in walk_files(root, extensions, stat=False, **kwargs))
+
+def count_files(root, extensions=None, **kwargs):
+    """Number of files under a folder (see walk_files)."""
+    return sum(1 for _ in walk_files(root, extensions, stat=False, **kwargs))
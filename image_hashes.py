@@ -0,0 +1,281 @@
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+from module_index import ModuleIndex, IMAGE_EXTENSIONS
+from fs_walker import walk_files
+import storage_tiers
+
+# Two images are near-duplicates when both hashes are within these Hamming distances.
+# On the sample data re-shots of a module differ by 0-2 dHash bits and up to 8 pHash bits,
+# while different modules of the same stage differ by 7+ dHash bits and 14+ pHash bits.
+max_dhash_distance = 4
+max_phash_distance = 10
+
+# The dHash search splits the 64-bit hash into this many blocks (multi-index hashing)
+hash_blocks = 4
+
+# Hashes added after the last rebuild are scanned linearly until there are this many
+rebuild_threshold = 10000
+
+# Images per work unit when hashing a folder
+chunk_size = 64
+
+# pHash DCT size and the low-frequency corner kept
+PHASH_SIZE = 32
+PHASH_BITS = 8
+
+def to_signed(value):
+    """Store a 64-bit hash in an SQLite INTEGER (signed)."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+def bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def get_dct_matrix(size):
+    """Orthonormal DCT-II matrix."""
+    k = np.arange(size)
+    matrix = np.sqrt(2.0 / size) * np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * size))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+DCT_MATRIX = get_dct_matrix(PHASH_SIZE)
+
+def compute_hashes(file_path):
+    """
+    Compute the dHash and pHash of an image.
+
+    The image is decoded at 1/8 scale in the JPEG decoder (draft mode); both hashes only
+    need a few dozen pixels per side.
+
+    Returns:
+        tuple: (dhash, phash) as unsigned 64-bit ints
+    """
+    with Image.open(file_path) as image:
+        image.draft('L', (image.width // 8, image.height // 8))
+        image = image.convert('L')
+
+    # dHash: brightness gradient between horizontal neighbours on a 9x8 grid
+    small = np.asarray(image.resize((9, 8), Image.BOX), dtype=np.float32)
+    dhash = bits_to_int(small[:, 1:] > small[:, :-1])
+
+    # pHash: sign of the low-frequency DCT coefficients against their median (DC excluded)
+    pixels = np.asarray(image.resize((PHASH_SIZE, PHASH_SIZE), Image.BOX), dtype=np.float64)
+    low = (DCT_MATRIX @ pixels @ DCT_MATRIX.T)[:PHASH_BITS, :PHASH_BITS].ravel()
+    phash = bits_to_int(low > np.median(low[1:]))
+    return dhash, phash
+
+def hash_chunk(file_paths):
+    """Hash a chunk of images (runs in a worker process). Returns (path, dhash, phash) tuples."""
+    rows = []
+    for file_path in file_paths:
+        try:
+            dhash, phash = compute_hashes(file_path)
+        except Exception as e:
+            print(f"Error hashing {file_path}: {e}")
+            continue
+        rows.append((file_path, to_signed(dhash), to_signed(phash)))
+    return rows
+
+class HammingIndex:
+    """
+    Multi-index hashing over 64-bit hashes.
+
+    The hash is split into hash_blocks blocks. Two hashes within distance r share at least
+    one block within distance r // blocks, so a search only probes the block values near the
+    query's and checks those candidates exactly. Each block is kept as a sorted array, so
+    millions of hashes take a few bytes each and a probe is a binary search.
+    """
+
+    def __init__(self, blocks=None):
+        self.blocks = blocks or hash_blocks
+        self.block_bits = 64 // self.blocks
+        self.values = np.zeros(0, dtype=np.uint64)
+        self.sorted_keys = []
+        self.orders = []
+        self.pending = []
+
+    def __len__(self):
+        return len(self.values) + len(self.pending)
+
+    def get_block(self, values, block):
+        shift = np.uint64(block * self.block_bits)
+        mask = np.uint64((1 << self.block_bits) - 1)
+        return (values >> shift) & mask
+
+    def add(self, value):
+        """Add a hash; its id is its position in insertion order."""
+        self.pending.append(value)
+        if len(self.pending) >= rebuild_threshold:
+            self.rebuild()
+        return len(self) - 1
+
+    def rebuild(self):
+        """Merge the pending hashes into the sorted block arrays."""
+        if self.pending:
+            self.values = np.concatenate([self.values, np.array(self.pending, dtype=np.uint64)])
+            self.pending = []
+        self.sorted_keys, self.orders = [], []
+        for block in range(self.blocks):
+            keys = self.get_block(self.values, block)
+            order = np.argsort(keys, kind='stable')
+            self.sorted_keys.append(keys[order])
+            self.orders.append(order)
+
+    def get_probes(self, key, radius):
+        """Block values within 'radius' bits of key."""
+        probes = [key]
+        for flips in range(1, radius + 1):
+            for bits in itertools.combinations(range(self.block_bits), flips):
+                probe = key
+                for bit in bits:
+                    probe ^= 1 << bit
+                probes.append(probe)
+        return probes
+
+    def search(self, value, max_distance):
+        """
+        Find the hashes within max_distance bits of value.
+
+        Returns:
+            list: (id, distance) tuples, nearest first
+        """
+        query = np.uint64(value)
+        radius = max_distance // self.blocks
+        candidates = []
+        if len(self.values) and not self.sorted_keys:
+            self.rebuild()
+        for block in range(len(self.sorted_keys)):
+            key = int(self.get_block(query, block))
+            probes = np.array(self.get_probes(key, radius), dtype=np.uint64)
+            starts = np.searchsorted(self.sorted_keys[block], probes, side='left')
+            ends = np.searchsorted(self.sorted_keys[block], probes, side='right')
+            candidates.extend(self.orders[block][start:end] for start, end in zip(starts, ends) if end > start)
+
+        matches = []
+        if candidates:
+            ids = np.unique(np.concatenate(candidates))
+            distances = np.bitwise_count(self.values[ids] ^ query)
+            keep = distances <= max_distance
+            matches.extend(zip(ids[keep].tolist(), distances[keep].tolist()))
+
+        # Hashes added since the last rebuild
+        offset = len(self.values)
+        for i, pending in enumerate(self.pending):
+            distance = bin(pending ^ value).count('1')
+            if distance <= max_distance:
+                matches.append((offset + i, distance))
+        return sorted(matches, key=lambda match: match[1])
+
+class NearDuplicateIndex:
+    """
+    Near-duplicate image search: dHash candidates from a HammingIndex, confirmed by pHash.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.dhash_index = HammingIndex()
+
+    @classmethod
+    def from_module_index(cls, module_index):
+        """Load all hashes stored in a ModuleIndex."""
+        index = cls()
+        for row in module_index.get_image_hashes():
+            index.add(row)
+        index.dhash_index.rebuild()
+        return index
+
+    def add(self, record):
+        """Add a record with 'file_name', 'serial', 'path', 'dhash' and 'phash' (signed)."""
+        record = dict(record, dhash=to_unsigned(record['dhash']), phash=to_unsigned(record['phash']))
+        self.records.append(record)
+        self.dhash_index.add(record['dhash'])
+
+    def find(self, dhash, phash, dhash_distance=None, phash_distance=None):
+        """
+        Find near-duplicates of an image by its (unsigned) hashes.
+
+        Returns:
+            list: record dicts with 'dhash_distance' and 'phash_distance', nearest first
+        """
+        dhash_distance = max_dhash_distance if dhash_distance is None else dhash_distance
+        phash_distance = max_phash_distance if phash_distance is None else phash_distance
+        matches = []
+        for record_id, distance in self.dhash_index.search(dhash, dhash_distance):
+            record = self.records[record_id]
+            record_phash_distance = bin(record['phash'] ^ phash).count('1')
+            if record_phash_distance <= phash_distance:
+                matches.append(dict(record, dhash_distance=distance, phash_distance=record_phash_distance))
+        return matches
+
+    def find_file(self, file_path):
+        """Find near-duplicates of an image file (the file itself is included if indexed)."""
+        return self.find(*compute_hashes(file_path))
+
+    def find_groups(self):
+        """
+        Group all indexed images into sets of near-duplicates.
+
+        Returns:
+            list: lists of records with more than one member
+        """
+        parents = list(range(len(self.records)))
+
+        def find_root(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        for i, record in enumerate(self.records):
+            for record_id, _ in self.dhash_index.search(record['dhash'], max_dhash_distance):
+                if record_id != i and \
+                        bin(self.records[record_id]['phash'] ^ record['phash']).count('1') <= max_phash_distance:
+                    parents[find_root(record_id)] = find_root(i)
+
+        groups = {}
+        for i in range(len(self.records)):
+            groups.setdefault(find_root(i), []).append(self.records[i])
+        return [group for group in groups.values() if len(group) > 1]
+
+def hash_folder(folder, module_index, max_workers=None):
+    """
+    Hash the images under a folder that are not in the module index yet, in a process pool.
+
+    Returns:
+        int: Number of images hashed
+    """
+    known = {row['path'] for row in module_index.get_image_hashes()}
+    file_paths = [record.path for record in walk_files(folder, IMAGE_EXTENSIONS, stat=False)
+                  if record.path not in known]
+
+    print(f"Hashing {len(file_paths)} images under {folder}...")
+    hashed = 0
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for rows in executor.map(hash_chunk, chunks):
+            hashed += module_index.add_image_hashes(rows)
+    print(f"Hashed {hashed} images")
+    return hashed
+
+def print_groups(groups):
+    for group in groups:
+        serials = sorted({record['serial'] or '?' for record in group})
+        print(f"{len(group)} near-duplicate images of {', '.join(serials)}:")
+        for record in group:
+            print(f"  {record['path']}")
+
+# Parameters
+source_folder = storage_tiers.warm_archive_folder
+
+if __name__ == "__main__":
+    index = ModuleIndex()
+    try:
+        hash_folder(source_folder, index)
+        print_groups(NearDuplicateIndex.from_module_index(index).find_groups())
+    finally:
+        index.close()
@@ -0,0 +1,125 @@
+import os
+import glob
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+
+# Cache tree for downscaled copies, keyed by the content hash of the original
+preview_cache_folder = "D:\\ELimagesnew\\preview_cache"
+
+# Pyramid levels: name -> longest side in pixels, largest first
+PREVIEW_LEVELS = {
+    'preview': 1600,
+    'thumb': 256,
+}
+
+# JPEG quality of the cached images
+preview_quality = 85
+
+def get_content_hash(file_path):
+    """Get MD5 hash of a file."""
+    hasher = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def get_cache_path(content_hash, level, cache_folder=None):
+    """Path of a pyramid level in the cache tree: <cache>/<ab>/<hash>_<level>.jpg"""
+    return os.path.join(cache_folder or preview_cache_folder, content_hash[:2], f"{content_hash}_{level}.jpg")
+
+def save_level(image, path):
+    """Write one cached image atomically, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(temp_path, 'JPEG', quality=preview_quality, optimize=True)
+    os.replace(temp_path, path)
+
+def make_previews(file_path, cache_folder=None, content_hash=None):
+    """
+    Build the preview pyramid of a JPEG in the cache tree.
+
+    The original is decoded once in draft mode, which lets the JPEG decoder scale by 1/2, 1/4
+    or 1/8 in the DCT domain instead of decoding full size. Each smaller level is resized
+    from the level above it. Levels already in the cache are not rebuilt.
+
+    Args:
+        file_path (str): Original image
+        cache_folder (str): Cache tree (default: preview_cache_folder)
+        content_hash (str): MD5 of the original, if already known
+
+    Returns:
+        dict: 'hash' and one path per level
+    """
+    content_hash = content_hash or get_content_hash(file_path)
+    paths = {level: get_cache_path(content_hash, level, cache_folder) for level in PREVIEW_LEVELS}
+    result = {'hash': content_hash, **paths}
+    if all(os.path.exists(path) for path in paths.values()):
+        return result
+
+    largest = max(PREVIEW_LEVELS.values())
+    with Image.open(file_path) as original:
+        # EL images are greyscale; keep grey as grey and anything else as RGB
+        mode = 'L' if original.mode in ('L', '1') else 'RGB'
+        # draft() keeps both sides at least the requested size, so request the scaled shape
+        scale = largest / max(original.size)
+        original.draft(mode, (int(original.width * scale), int(original.height * scale)))
+        image = original.convert(mode)
+
+    for level, size in sorted(PREVIEW_LEVELS.items(), key=lambda item: -item[1]):
+        image.thumbnail((size, size), Image.LANCZOS)
+        if not os.path.exists(paths[level]):
+            save_level(image, paths[level])
+    return result
+
+def get_preview(file_path, level='thumb', cache_folder=None, index=None):
+    """
+    Cached pyramid level of an image, building the pyramid if it is missing.
+
+    With a module index, the content hash is looked up by path (checked against the file's
+    size and mtime), so browsing does not read the original; it is hashed only when unknown.
+    """
+    content_hash = None
+    if index is not None:
+        stat = os.stat(file_path)
+        content_hash = index.get_content_hash(file_path, stat.st_size, stat.st_mtime)
+    if content_hash is None:
+        content_hash = get_content_hash(file_path)
+        if index is not None:
+            index.add_content_hash(file_path, content_hash, stat.st_size, stat.st_mtime)
+    path = get_cache_path(content_hash, level, cache_folder)
+    if not os.path.exists(path):
+        make_previews(file_path, cache_folder, content_hash)
+    return path
+
+def build_previews(folder, pattern='*.jpg', cache_folder=None, max_workers=None):
+    """
+    Build previews for the images under a folder in a process pool (for backfilling the store).
+
+    Returns:
+        int: Number of images processed
+    """
+    files = glob.glob(os.path.join(folder, '**', pattern), recursive=True)
+    print(f"Building previews for {len(files)} images under {folder}...")
+    done = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(make_previews, path, cache_folder): path for path in files}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                print(f"Error building previews for {futures[future]}: {e}")
+                continue
+            if done % 100 == 0:
+                print(f"Progress: {done}/{len(files)} images...")
+    print(f"Built previews for {done} images in {cache_folder or preview_cache_folder}")
+    return done
+
+# Parameters
+source_folder = "D:\\ELimagesnew\\Data_processed_new"
+# NG images, which reviewers browse most
+source_pattern = '*_Z_*.jpg'
+
+if __name__ == "__main__":
+    build_previews(source_folder, source_pattern)
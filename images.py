@@ -1,14 +1,10 @@
-import os
-import shutil
 from datetime import datetime
+from corpus_builder import build_corpus, default_manifest_path, plan_duplicates
+from fs_walker import walk_files
 
-def duplicate_images(source_folder, target_folder, prefix, target_count):
-    # Create the target folder if it doesn't exist
-    if not os.path.exists(target_folder):
-        os.makedirs(target_folder)
-
+def duplicate_images(source_folder, target_folder, prefix, target_count, mode=None):
     # Get the list of images in the source folder
-    image_files = [f for f in os.listdir(source_folder) if os.path.isfile(os.path.join(source_folder, f))]
+    image_files = [record.name for record in walk_files(source_folder, stat=False, recursive=False)]
 
     # Calculate how many times to duplicate each image
     num_images = len(image_files)
@@ -22,19 +18,14 @@ def duplicate_images(source_folder, target_folder, prefix, target_count):
         print("The folder already contains enough images.")
         return
 
-    # Loop to duplicate images
-    for i in range(images_needed):
-        # Select an image to duplicate
-        original_image = image_files[i % num_images]
-        original_path = os.path.join(source_folder, original_image)
-
-        # Generate a new filename with datetime and index to ensure uniqueness
-        datetime_suffix = datetime.now().strftime('%y%m%d_%H%M%S')
-        new_filename = f"{prefix}{datetime_suffix}_{i}.jpg"  # Assuming images are in jpg format
-        new_path = os.path.join(target_folder, new_filename)
+    # Generate new filenames with datetime and index to ensure uniqueness
+    datetime_suffix = datetime.now().strftime('%y%m%d_%H%M%S')
+    jobs, _ = plan_duplicates(source_folder, target_folder, [''], target_count,
+                              lambda i, original_image: f"{prefix}{datetime_suffix}_{i}.jpg",  # Assuming images are in jpg format
+                              include_originals=False)
 
-        # Copy the image to the new filename
-        shutil.copyfile(original_path, new_path)
+    # Link (or copy) the duplicates in parallel
+    build_corpus(jobs, mode, manifest_path=default_manifest_path(target_folder))
 
     print(f"Duplicated images to reach a total of {target_count} images.")
 
@@ -43,6 +34,7 @@ source_folder = 'D:\\Amruth\\new_data'
 target_folder = 'D:\\Amruth\\new_data1'
 prefix = 'A50339B_JIN_A_'
 target_count = 50
+mode = 'hardlink'  # 'hardlink', 'reflink' or 'copy' (falls back to copy when unsupported)
 
 # Call the function
-duplicate_images(source_folder, target_folder, prefix, target_count)
\ No newline at end of file
+duplicate_images(source_folder, target_folder, prefix, target_count, mode)
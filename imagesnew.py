@@ -5,24 +5,37 @@ def get_next_sequence_number(base_target_folder):
     max_number = 50339  # Starting number (A50339B.jpg -> 50339)
     
     # Walk through all subdirectories to find existing files
-    for root, dirs, files in os.walk(base_target_folder):
-        for file in files:
-            # Check if filename matches pattern A[NUMBER]B.jpg
-            if file.startswith('A') and file.endswith('B.jpg') and len(file) >= 11:
-                try:
-                    # Extract number from filename (e.g., A50339B.jpg -> 50339)
-                    number_part = file[1:-5]  # Remove 'A' and 'B.jpg'
-                    if number_part.isdigit():
-                        current_number = int(number_part)
-                        max_number = max(max_number, current_number)
-                except ValueError:
-                    continue
+    for record in walk_files(base_target_folder, ('.jpg',), stat=False):
+        file = record.name
+        # Check if filename matches pattern A[NUMBER]B.jpg
+        if file.startswith('A') and file.endswith('B.jpg') and len(file) >= 11:
+            try:
+                # Extract number from filename (e.g., A50339B.jpg -> 50339)
+                number_part = file[1:-5]  # Remove 'A' and 'B.jpg'
+                if number_part.isdigit():
+                    current_number = int(number_part)
+                    max_number = max(max_number, current_number)
+            except ValueError:
+                continue
     
     return max_number + 1
 
 import os
-import shutil
 from datetime import datetime
+from corpus_builder import build_corpus, default_manifest_path
+from sequence_allocator import SequenceAllocator
+from fs_walker import walk_files
+
+# Counter file (inside the base target folder) holding the next free A[NUMBER]B.jpg number
+SEQUENCE_COUNTER_FILE = '.sequence_counter'
+
+def get_sequence_allocator(base_target_folder, block_size=None):
+    """Get the allocator for a base target folder, seeded from the existing files on first use."""
+    return SequenceAllocator(
+        os.path.join(base_target_folder, SEQUENCE_COUNTER_FILE),
+        initial_number=lambda: get_next_sequence_number(base_target_folder),
+        block_size=block_size
+    )
 
 def create_date_folder_structure(base_folder):
     """Create folder structure: base_folder/YYYY/MM/DD/"""
@@ -39,7 +52,7 @@ def create_date_folder_structure(base_folder):
     
     return date_path
 
-def duplicate_images(source_folder, base_target_folder, category, start_number, target_count):
+def duplicate_images(source_folder, base_target_folder, category, allocator, target_count, mode=None):
     """
     Duplicate images from source to target folder with date-based structure
     
@@ -47,8 +60,9 @@ def duplicate_images(source_folder, base_target_folder, category, start_number,
         source_folder (str): Path to source images
         base_target_folder (str): Base path for target (e.g., 'D:\\Amruth\\processed_data')
         category (str): Either 'NG' or 'NORMAL'
-        start_number (int): Starting sequence number for this category
+        allocator (SequenceAllocator): Shared allocator handing out A[NUMBER]B.jpg sequence numbers
         target_count (int): Total number of images needed
+        mode (str): 'hardlink', 'reflink' or 'copy' (default: corpus_builder.corpus_link_mode)
     
     Returns:
         int: Next available sequence number
@@ -64,9 +78,8 @@ def duplicate_images(source_folder, base_target_folder, category, start_number,
 
     # Get the list of images in the source folder
     image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif']
-    image_files = [f for f in os.listdir(source_folder) 
-                   if os.path.isfile(os.path.join(source_folder, f)) 
-                   and any(f.lower().endswith(ext) for ext in image_extensions)]
+    image_files = [record.name for record in
+                   walk_files(source_folder, image_extensions, stat=False, recursive=False)]
 
     # Calculate how many times to duplicate each image
     num_images = len(image_files)
@@ -77,9 +90,9 @@ def duplicate_images(source_folder, base_target_folder, category, start_number,
     print(f"Found {num_images} images in source folder")
     
     # Check if we already have enough images in the target folder
-    existing_images = [f for f in os.listdir(category_folder) 
-                      if os.path.isfile(os.path.join(category_folder, f)) 
-                      and f.startswith('A') and f.endswith('B.jpg')]
+    existing_images = [record.name for record in
+                       walk_files(category_folder, ('.jpg',), stat=False, recursive=False)
+                       if record.name.startswith('A') and record.name.endswith('B.jpg')]
     
     current_count = len(existing_images)
     print(f"Current images in {category} folder: {current_count}")
@@ -88,46 +101,33 @@ def duplicate_images(source_folder, base_target_folder, category, start_number,
     images_needed = target_count - current_count
     if images_needed <= 0:
         print(f"The {category} folder already contains enough images ({current_count}/{target_count}).")
-        return start_number
+        return allocator.peek()
 
     print(f"Need to add {images_needed} more images to reach target of {target_count}")
 
-    # Loop to duplicate images
-    duplicated_count = 0
-    current_sequence = start_number
+    # Reserve the sequence numbers in one step; the allocator guarantees they are unused
+    sequence_numbers = allocator.take(images_needed)
     
-    for i in range(images_needed):
+    # Plan the duplicates, then link (or copy) them in parallel
+    jobs = []
+    for i, sequence_number in enumerate(sequence_numbers):
         # Select an image to duplicate (cycle through available images)
         original_image = image_files[i % num_images]
         original_path = os.path.join(source_folder, original_image)
         
         # Generate sequential filename: A[NUMBER]B.jpg
-        new_filename = f"A{current_sequence}B.jpg"
-        new_path = os.path.join(category_folder, new_filename)
+        new_filename = f"A{sequence_number}B.jpg"
+        jobs.append((original_path, os.path.join(category_folder, new_filename)))
+        print(f"{new_filename}")  # Just show the new filename
 
-        # Ensure the filename is unique (skip if exists)
-        while os.path.exists(new_path):
-            current_sequence += 1
-            new_filename = f"A{current_sequence}B.jpg"
-            new_path = os.path.join(category_folder, new_filename)
-
-        # Copy the actual image content and save as .jpg
-        try:
-            # Copy the image file content to the new path as .jpg
-            shutil.copy2(original_path, new_path)
-            print(f"{new_filename}")  # Just show the new filename
-            duplicated_count += 1
-            current_sequence += 1
-        except Exception as e:
-            print(f"Error copying {original_image}: {e}")
-            # Skip to next sequence number even if copy failed
-            current_sequence += 1
+    counts = build_corpus(jobs, mode, manifest_path=default_manifest_path(category_folder))
+    duplicated_count = len(jobs) - counts['failed']
 
     print(f"Successfully duplicated {duplicated_count} images to {category_folder}")
     print(f"Total images in {category} folder: {current_count + duplicated_count}")
-    print(f"Next sequence number: A{current_sequence}B.jpg")
+    print(f"Next sequence number: A{allocator.peek()}B.jpg")
     
-    return current_sequence
+    return allocator.peek()
 
 def process_both_categories(ng_source, normal_source, base_target_folder, target_count):
     """
@@ -146,27 +146,32 @@ def process_both_categories(ng_source, normal_source, base_target_folder, target
     print(f"Target folder structure: {base_target_folder}/YYYY/MM/DD/[NG|NORMAL]")
     print("="*60)
     
-    # Get the next available sequence number
-    next_number = get_next_sequence_number(base_target_folder)
-    print(f"Starting sequence number: A{next_number}B.jpg")
+    # Sequence numbers come from a persistent counter; the folder tree is only walked
+    # once, to seed the counter when it does not exist yet
+    allocator = get_sequence_allocator(base_target_folder)
+    next_number = allocator.peek()
+    if next_number is None:
+        print("No sequence counter found, it will be seeded from the existing files")
+    else:
+        print(f"Starting sequence number: A{next_number}B.jpg")
     
     # Process NG images
     if os.path.exists(ng_source):
         print("\nProcessing NG (Not Good) images...")
-        next_number = duplicate_images(ng_source, base_target_folder, 'NG', next_number, target_count)
+        duplicate_images(ng_source, base_target_folder, 'NG', allocator, target_count)
     else:
         print(f"\nWarning: NG source folder not found: {ng_source}")
     
     # Process NORMAL images  
     if os.path.exists(normal_source):
         print("\nProcessing NORMAL (Good) images...")
-        next_number = duplicate_images(normal_source, base_target_folder, 'NORMAL', next_number, target_count)
+        duplicate_images(normal_source, base_target_folder, 'NORMAL', allocator, target_count)
     else:
         print(f"\nWarning: NORMAL source folder not found: {normal_source}")
     
     print("\n" + "="*60)
     print("Image duplication process completed!")
-    print(f"Next available sequence number: A{next_number}B.jpg")
+    print(f"Next available sequence number: A{allocator.peek()}B.jpg")
     print("="*60)
 
 # Parameters - Update these paths according to your setup
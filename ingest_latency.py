@@ -0,0 +1,236 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import deque
+import numpy as np
+
+from module_index import parse_el_filename
+
+# Per-file stage times (one row per station file)
+latency_db_path = "D:\\ELimagesnew\\latency.db"
+
+# Stages of a file, in order. 'captured' comes from the capture time in the station file name
+# (station clock), the others from the collector's clock.
+STAGES = ['captured', 'detected', 'copied', 'indexed', 'archived']
+
+# Rolling percentiles cover the files of the last this many seconds
+latency_window_seconds = 15 * 60
+
+# Alert when a line's p95 lag from capture to this stage exceeds lag_alert_seconds
+sla_stage = 'copied'
+lag_alert_seconds = 300
+
+# Seconds between two alerts for the same line, and between two checks
+alert_repeat_seconds = 600
+alert_check_seconds = 5
+
+# Stage times are committed at most this often (a crash loses only the last few seconds of
+# measurements, and copies do not wait for a commit each)
+commit_interval_seconds = 5
+
+# Percentiles reported
+PERCENTILES = (50, 95, 99)
+
+def get_capture_time(file_name):
+    """Capture time (epoch seconds) from a station file name, or None."""
+    info = parse_el_filename(file_name)
+    if info is None or info['captured_at'] is None:
+        return None
+    return info['captured_at'].timestamp()
+
+def get_percentiles(values):
+    """{percentile: seconds} of a list of latencies, None values when empty."""
+    if not values:
+        return {p: None for p in PERCENTILES}
+    return dict(zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist()))
+
+def summarize_samples(samples):
+    """Stats of (step, lag) pairs (either may be None): {'files', 'step', 'lag'}."""
+    return {
+        'files': len(samples),
+        'step': get_percentiles([step for step, _ in samples if step is not None]),
+        'lag': get_percentiles([lag for _, lag in samples if lag is not None]),
+    }
+
+def get_step_and_lag(row, stage):
+    """Seconds from the previous stage a file reached, and from its capture, to a stage."""
+    previous = [row[name] for name in STAGES[:STAGES.index(stage)] if row[name] is not None]
+    step = row[stage] - previous[-1] if previous else None
+    lag = row[stage] - row['captured'] if row['captured'] is not None else None
+    return step, lag
+
+def print_latency_stats(stats):
+    """Print stats from LatencyTracker.get_stats or get_report, by line and stage."""
+    def seconds(value):
+        return f"{value:.1f}s" if value is not None else '-'
+
+    for (alias, stage), line_stats in sorted(stats.items(), key=lambda item: (item[0][0], STAGES.index(item[0][1]))):
+        if not line_stats['files']:
+            continue
+        step, lag = line_stats['step'], line_stats['lag']
+        print(f"  {alias} {stage}: {line_stats['files']} files, step p50 {seconds(step[50])} p95 {seconds(step[95])}, "
+              f"lag p50 {seconds(lag[50])} p95 {seconds(lag[95])} p99 {seconds(lag[99])}")
+
+class LatencyTracker:
+    """
+    Per-file latency from capture to central availability and archival, per line.
+
+    Every stage a file reaches is stored with its time, so slow files can be looked up
+    afterwards. Two latencies are kept per line and stage for the rolling percentiles: the
+    step from the previous stage the file reached, and the lag from capture. A line whose
+    p95 lag to sla_stage exceeds lag_alert_seconds is reported as LAG ALERT.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or latency_db_path
+        db_folder = os.path.dirname(self.db_path)
+        if db_folder:
+            os.makedirs(db_folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS file_latency (
+                alias TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                captured REAL,
+                detected REAL,
+                copied REAL,
+                indexed REAL,
+                archived REAL,
+                PRIMARY KEY (alias, file_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_file_latency_copied ON file_latency(copied);
+        """)
+        self.conn.commit()
+        # Detection times of files not copied yet (kept in memory: detection is on the event path)
+        self.detected = {}
+        # (alias, stage) -> deque of (time, step seconds, lag seconds)
+        self.windows = {}
+        self.last_alerts = {}
+        self.last_checks = {}
+        self.last_commit = time.time()
+
+    def close(self):
+        """Close the latency database."""
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def mark_detected(self, alias, file_name, at=None):
+        """Note when the collector first saw a station file (stored with its next stage)."""
+        with self.lock:
+            self.detected.setdefault((alias, file_name), at or time.time())
+
+    def record(self, alias, file_name, stage, at=None):
+        """
+        Record that a station file reached a stage ('copied', 'indexed' or 'archived').
+
+        The first time of each stage is kept; a file copied again after a restart keeps
+        its original times.
+        """
+        now = at or time.time()
+        key = (alias, file_name)
+        with self.lock:
+            detected = self.detected.pop(key, None) if stage == 'copied' else self.detected.get(key)
+            row = self.conn.execute(
+                f"INSERT INTO file_latency (alias, file_name, captured, detected, {stage}) VALUES (?, ?, ?, ?, ?) "
+                f"ON CONFLICT (alias, file_name) DO UPDATE SET "
+                f"detected = COALESCE(detected, excluded.detected), {stage} = COALESCE({stage}, excluded.{stage}) "
+                f"RETURNING *",
+                (alias, file_name, get_capture_time(file_name), detected, now)
+            ).fetchone()
+            if now - self.last_commit >= commit_interval_seconds:
+                self.conn.commit()
+                self.last_commit = now
+            if row[stage] != now:
+                # Already recorded earlier
+                return
+            if stage == 'copied' and row['detected'] is not None:
+                self.add_sample(alias, 'detected', row)
+            self.add_sample(alias, stage, row)
+        if stage == sla_stage and now - self.last_checks.get(alias, 0) >= alert_check_seconds:
+            self.last_checks[alias] = now
+            self.check_alert(alias)
+
+    def add_sample(self, alias, stage, row):
+        """Add a file's step and lag to the rolling window of its line and stage (lock held)."""
+        window = self.windows.setdefault((alias, stage), deque())
+        window.append((row[stage], *get_step_and_lag(row, stage)))
+        self.prune(window)
+
+    def prune(self, window):
+        cutoff = time.time() - latency_window_seconds
+        while window and window[0][0] < cutoff:
+            window.popleft()
+
+    def get_window_stats(self, alias, stage):
+        """Rolling percentiles of one line and stage."""
+        with self.lock:
+            window = self.windows.get((alias, stage), deque())
+            self.prune(window)
+            return summarize_samples([(step, lag) for _, step, lag in window])
+
+    def get_stats(self):
+        """
+        Rolling percentiles per line and stage.
+
+        Returns:
+            dict: (alias, stage) -> {'files', 'step': {percentile: s}, 'lag': {percentile: s}}
+        """
+        stats = {key: self.get_window_stats(*key) for key in list(self.windows)}
+        with self.lock:
+            # Files detected long ago and never copied (quarantined or removed)
+            cutoff = time.time() - latency_window_seconds
+            for key, detected in list(self.detected.items()):
+                if detected < cutoff:
+                    del self.detected[key]
+        return stats
+
+    def check_alert(self, alias):
+        """Print a LAG ALERT when a line's p95 lag to sla_stage is above lag_alert_seconds."""
+        stats = self.get_window_stats(alias, sla_stage)
+        lag = stats['lag'][95]
+        if lag is None or lag <= lag_alert_seconds:
+            return False
+        now = time.time()
+        if now - self.last_alerts.get(alias, 0) < alert_repeat_seconds:
+            return True
+        self.last_alerts[alias] = now
+        print(f"[{alias}] LAG ALERT: p95 capture-to-{sla_stage} lag {lag:.0f}s over the last "
+              f"{latency_window_seconds // 60} minutes ({stats['files']} files), limit {lag_alert_seconds}s")
+        return True
+
+    def print_stats(self):
+        print_latency_stats(self.get_stats())
+
+    def get_report(self, since):
+        """
+        Percentiles per line and stage of the files copied since a time, from the database.
+
+        Returns:
+            dict: (alias, stage) -> {'files', 'step': {percentile: s}, 'lag': {percentile: s}}
+        """
+        with self.lock:
+            self.conn.commit()
+            rows = self.conn.execute("SELECT * FROM file_latency WHERE copied >= ?", (since,)).fetchall()
+        samples = {}
+        for row in rows:
+            for stage in STAGES[1:]:
+                if row[stage] is not None:
+                    samples.setdefault((row['alias'], stage), []).append(get_step_and_lag(row, stage))
+        return {key: summarize_samples(stage_samples) for key, stage_samples in samples.items()}
+
+# Parameters
+report_hours = 24
+
+if __name__ == "__main__":
+    tracker = LatencyTracker()
+    try:
+        print(f"Latency per line and stage, files copied in the last {report_hours} hours:")
+        print_latency_stats(tracker.get_report(time.time() - report_hours * 3600))
+    finally:
+        tracker.close()
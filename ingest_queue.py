@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Durable ingest queue shared by the collector and the ingest worker processes
+ingest_queue_path = "D:\\ELimagesnew\\ingest_queue.db"
+
+# Seconds a claimed job stays leased; jobs of a worker that died are handed out again after this
+lease_seconds = 300
+
+# Attempts before a job is marked failed
+max_attempts = 3
+
+class IngestQueue:
+    """
+    Job queue in a local SQLite database, safe to share between processes.
+
+    A job is (kind, path) plus an optional JSON payload. Workers claim jobs under a lease,
+    so jobs survive collector restarts and worker crashes.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or ingest_queue_path
+        db_folder = os.path.dirname(self.db_path)
+        if db_folder:
+            os.makedirs(db_folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                path TEXT NOT NULL,
+                line TEXT,
+                payload TEXT,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                leased_until REAL,
+                created_at REAL,
+                updated_at REAL,
+                result TEXT,
+                error TEXT,
+                UNIQUE (kind, path)
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id);
+            CREATE INDEX IF NOT EXISTS idx_jobs_path ON jobs(path);
+        """)
+
+    def close(self):
+        """Close the queue database."""
+        with self.lock:
+            self.conn.close()
+
+    def put_many(self, jobs, replace=False):
+        """
+        Queue jobs given as (kind, path, line, payload) tuples.
+
+        A job that already exists for (kind, path) is left alone, unless replace is set and it
+        has finished; then it is queued again (e.g. the file changed).
+
+        Returns:
+            int: Number of jobs queued
+        """
+        now = time.time()
+        rows = [(kind, path, line, json.dumps(payload) if payload is not None else None, now, now)
+                for kind, path, line, payload in jobs]
+        conflict = ("DO UPDATE SET state = 'queued', attempts = 0, payload = excluded.payload, "
+                    "updated_at = excluded.updated_at, result = NULL, error = NULL "
+                    "WHERE jobs.state IN ('done', 'failed')") if replace else "DO NOTHING"
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO jobs (kind, path, line, payload, created_at, updated_at) "
+                    f"VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (kind, path) {conflict}",
+                    rows
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return self.conn.total_changes - before
+
+    def put(self, kind, path, line=None, payload=None, replace=False):
+        """Queue one job. Returns True if it was queued."""
+        return self.put_many([(kind, path, line, payload)], replace) > 0
+
+    def claim(self, worker, kinds=None, limit=1):
+        """
+        Lease up to 'limit' queued jobs (or jobs whose lease ran out) to a worker.
+
+        Returns:
+            list: Job dicts (id, kind, path, line, payload, attempts)
+        """
+        now = time.time()
+        kind_filter = ''
+        params = [now]
+        if kinds:
+            kind_filter = f"AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        params.append(limit)
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id, kind, path, line, payload, attempts FROM jobs "
+                    "WHERE (state = 'queued' OR (state = 'running' AND leased_until < ?)) "
+                    f"{kind_filter} ORDER BY id LIMIT ?",
+                    params
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE jobs SET state = 'running', worker = ?, leased_until = ?, updated_at = ? WHERE id = ?",
+                    [(worker, now + lease_seconds, now, row['id']) for row in rows]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['payload'] = json.loads(job['payload']) if job['payload'] else None
+            jobs.append(job)
+        return jobs
+
+    def complete(self, job_id, result=None):
+        """Mark a job done, storing its JSON result."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, error = NULL, leased_until = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (json.dumps(result) if result is not None else None, time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        """Record a failed attempt; the job is queued again until max_attempts is reached."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, error = ?, leased_until = NULL, updated_at = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'queued' END WHERE id = ?",
+                (str(error), time.time(), max_attempts, job_id)
+            )
+
+    def move_path(self, old_path, new_path):
+        """
+        Point the jobs of a file at its new location after it was moved (e.g. archived).
+
+        A job already running on the old path fails to open it and is retried on the new one.
+
+        Returns:
+            int: Number of jobs updated
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE OR IGNORE jobs SET path = ?, updated_at = ? WHERE path = ?",
+                (new_path, time.time(), old_path)
+            )
+            return cursor.rowcount
+
+    def get_result(self, kind, path):
+        """Get the result of a finished job, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT result FROM jobs WHERE kind = ? AND path = ? AND state = 'done'", (kind, path)
+            ).fetchone()
+        return json.loads(row['result']) if row and row['result'] else None
+
+    def counts(self):
+        """Count jobs per (kind, state)."""
+        with self.lock:
+            rows = self.conn.execute("SELECT kind, state, COUNT(*) AS n FROM jobs GROUP BY kind, state").fetchall()
+        return {(row['kind'], row['state']): row['n'] for row in rows}
+
+    def purge_done(self, older_than_seconds):
+        """Delete finished jobs older than the given age. Returns the number deleted."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE state = 'done' AND updated_at < ?", (time.time() - older_than_seconds,)
+            )
+            return cursor.rowcount
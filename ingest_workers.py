@@ -0,0 +1,237 @@
+import os
+import time
+import hashlib
+import importlib
+import multiprocessing
+import ingest_queue
+import iv_parser
+import image_previews
+import image_hashes
+import el_pairing
+from jpeg_validation import validate_jpeg_file
+from ingest_queue import IngestQueue
+from module_index import ModuleIndex
+
+# Worker processes (None for one per CPU core)
+ingest_worker_count = None
+
+# Jobs claimed per queue access
+claim_batch_size = 16
+
+# Seconds an idle worker waits before polling the queue again
+idle_poll_interval = 0.5
+
+# Module index the workers write to, opened once per process
+worker_index_path = None
+worker_index = None
+
+# Module settings the jobs depend on, copied from the parent process into each worker
+# (spawned workers import the modules afresh and would otherwise run with their defaults)
+WORKER_SETTINGS = {
+    'ingest_queue': ['lease_seconds', 'max_attempts'],
+    'image_previews': ['preview_cache_folder', 'preview_quality'],
+    'el_pairing': ['pair_diff_folder', 'analysis_size', 'module_edge_threshold', 'max_shift_fraction',
+                   'max_cell_shift', 'diff_block_size', 'defect_threshold', 'cell_defect_fraction',
+                   'dark_cell_drop'],
+}
+
+def get_worker_config(index_path=None):
+    """
+    Snapshot of the settings the worker processes need, taken in the parent process.
+
+    Args:
+        index_path (str): Module index the workers write to (None for the module_index default)
+
+    Returns:
+        dict: {'index_path': str, 'settings': {module name: {setting: value}}}
+    """
+    settings = {}
+    for module_name, names in WORKER_SETTINGS.items():
+        module = importlib.import_module(module_name)
+        settings[module_name] = {name: getattr(module, name) for name in names}
+    return {'index_path': index_path, 'settings': settings}
+
+def apply_worker_config(config):
+    """Apply a get_worker_config snapshot in a worker process."""
+    global worker_index_path
+    worker_index_path = config.get('index_path')
+    for module_name, values in config.get('settings', {}).items():
+        module = importlib.import_module(module_name)
+        for name, value in values.items():
+            setattr(module, name, value)
+
+def get_worker_index():
+    """Get this process's module index connection, opening it on first use."""
+    global worker_index
+    if worker_index is None:
+        worker_index = ModuleIndex(worker_index_path)
+    return worker_index
+
+def hash_file(job):
+    """MD5 and size of a file, read in 1 MB chunks, recorded in the module index by path."""
+    mtime = os.path.getmtime(job['path'])
+    hasher = hashlib.md5()
+    size = 0
+    with open(job['path'], 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+            size += len(chunk)
+    get_worker_index().add_content_hash(job['path'], hasher.hexdigest(), size, mtime)
+    return {'md5': hasher.hexdigest(), 'size': size}
+
+def parse_iv(job):
+    """Parse an .ivc or SmartSweep .txt file and add its reported results to the module index."""
+    parsed = iv_parser.parse_iv_file(job['path'])
+    results = iv_parser.get_flasher_results(parsed)
+    results['source'] = job['path']
+    results['serial'] = iv_parser.get_serial(parsed)
+    get_worker_index().add_flasher_results([results])
+    return {'serial': results['serial'], 'points': len(parsed['voltage'])}
+
+def validate_image(job):
+    """Check the JPEG structure of a stored image (raises InvalidJPEGError if it is damaged)."""
+    width, height = validate_jpeg_file(job['path'])
+    return {'width': width, 'height': height}
+
+def make_previews(job):
+    """Build the preview pyramid of a stored image in the preview cache (keyed by its MD5)."""
+    stat = os.stat(job['path'])
+    content_hash = get_worker_index().get_content_hash(job['path'], stat.st_size, stat.st_mtime)
+    result = image_previews.make_previews(job['path'], content_hash=content_hash)
+    if content_hash is None:
+        get_worker_index().add_content_hash(job['path'], result['hash'], stat.st_size, stat.st_mtime)
+    return result
+
+def perceptual_hash(job):
+    """Add the dHash/pHash of a stored image to the module index."""
+    rows = image_hashes.hash_chunk([job['path']])
+    if not rows:
+        raise ValueError(f"Could not hash {job['path']}")
+    get_worker_index().add_image_hashes(rows)
+    return {'dhash': rows[0][1], 'phash': rows[0][2]}
+
+def pair_el_image(job):
+    """Compare a new PreEL/PostEL image with the other stage of the same module, if indexed."""
+    row = el_pairing.pair_new_image(get_worker_index(), job['path'])
+    if row is None:
+        return {'paired': False}
+    return {'paired': True, 'score': row['score'], 'flagged': row['flagged']}
+
+# Job kind -> handler(job) returning a JSON-serializable result
+JOB_HANDLERS = {
+    'hash': hash_file,
+    'validate_jpeg': validate_image,
+    'previews': make_previews,
+    'perceptual_hash': perceptual_hash,
+    'el_pair': pair_el_image,
+    'parse_iv': parse_iv,
+}
+
+def run_job(job):
+    """Run one job with its handler."""
+    handler = JOB_HANDLERS.get(job['kind'])
+    if handler is None:
+        raise ValueError(f"No handler for job kind '{job['kind']}'")
+    return handler(job)
+
+def worker_loop(queue_path, worker_name, stop_event, kinds=None, config=None):
+    """Claim and run jobs until stop_event is set (entry point of a worker process)."""
+    if config is not None:
+        apply_worker_config(config)
+    queue = IngestQueue(queue_path)
+    done = 0
+    try:
+        while not stop_event.is_set():
+            jobs = queue.claim(worker_name, kinds, claim_batch_size)
+            if not jobs:
+                stop_event.wait(idle_poll_interval)
+                continue
+            for job in jobs:
+                try:
+                    queue.complete(job['id'], run_job(job))
+                    done += 1
+                except Exception as e:
+                    print(f"[{worker_name}] Error in {job['kind']} job for {job['path']}: {e}")
+                    queue.fail(job['id'], e)
+    finally:
+        queue.close()
+        print(f"[{worker_name}] Stopped after {done} jobs")
+
+class IngestWorkerPool:
+    """Ingest worker processes sharing one durable queue."""
+
+    def __init__(self, queue_path=None, workers=None, kinds=None, index_path=None, config=None):
+        """
+        Args:
+            index_path (str): Module index the workers write to (ignored when config is given)
+            config (dict): Worker settings from get_worker_config (default: taken now from this process)
+        """
+        self.queue_path = queue_path or ingest_queue.ingest_queue_path
+        self.workers = workers or ingest_worker_count or os.cpu_count() or 1
+        self.kinds = kinds
+        self.config = config or get_worker_config(index_path)
+        # Spawn on every platform: the collector forks from a process with watcher threads running
+        self.context = multiprocessing.get_context('spawn')
+        self.stop_event = self.context.Event()
+        self.processes = []
+
+    def start(self):
+        """Start the worker processes."""
+        # Create the database before the workers race to
+        IngestQueue(self.queue_path).close()
+        for i in range(self.workers):
+            process = self.context.Process(
+                target=worker_loop,
+                args=(self.queue_path, f"ingest-{i + 1}", self.stop_event, self.kinds, self.config),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        print(f"Started {self.workers} ingest workers on {self.queue_path}")
+
+    def stop(self, timeout=30):
+        """Ask the workers to stop after their current batch, and wait for them."""
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                print(f"Ingest worker {process.pid} did not stop, terminating")
+                process.terminate()
+        self.processes = []
+
+    def alive_count(self):
+        return sum(1 for process in self.processes if process.is_alive())
+
+def queue_iv_files(folder, queue_path=None):
+    """Queue parse_iv jobs for the IV files under a folder. Returns the number queued."""
+    queue = IngestQueue(queue_path)
+    try:
+        return queue.put_many([('parse_iv', os.path.abspath(path), None, None)
+                               for path in iv_parser.find_iv_files(folder)], replace=True)
+    finally:
+        queue.close()
+
+def print_queue_counts(queue_path=None):
+    """Print the number of jobs per kind and state."""
+    queue = IngestQueue(queue_path)
+    try:
+        for (kind, state), count in sorted(queue.counts().items()):
+            print(f"  {kind}: {count} {state}")
+    finally:
+        queue.close()
+
+# Parameters
+iv_source_folder = 'source ivc'
+
+if __name__ == "__main__":
+    print(f"Queued {queue_iv_files(iv_source_folder)} IV files")
+    pool = IngestWorkerPool()
+    pool.start()
+    try:
+        while pool.alive_count():
+            time.sleep(5)
+            print_queue_counts()
+    except KeyboardInterrupt:
+        print("\nStopping ingest workers...")
+    finally:
+        pool.stop()
@@ -0,0 +1,307 @@
+import os
+import numpy as np
+import pandas as pd
+
+import iv_parser
+
+# Temperature coefficients used for correction to the target conditions (relative, per degC)
+ALPHA_ISC = 0.00046   # Isc temperature coefficient (+0.046 %/degC)
+BETA_VOC = -0.0025    # Voc temperature coefficient (-0.25 %/degC)
+KAPPA = 0.0           # Curve correction factor (ohm/degC)
+
+# Voc line fit through the points with |I| below this fraction of Isc
+VOC_FIT_CURRENT = 0.05
+
+# Fit windows as a fraction of Voc
+MPP_FIT_WINDOW = 0.03   # Quadratic fit of P(V) within +/-3% of Voc around the MPP
+RS_FIT_WINDOW = 0.02    # Slope fit for Rs within +/-2% of Voc around Voc
+RSH_FIT_WINDOW = 0.10   # Slope fit for Rsh from 0 V to 10% of Voc
+
+# Allowed relative difference between tester-reported and recomputed values
+# (None = reported only, never flagged; Rs/Rsh depend on the tester's fitting method)
+AUDIT_TOLERANCES = {
+    'Pmax': 0.01,
+    'Voc': 0.005,
+    'Isc': 0.01,
+    'Vpm': 0.02,
+    'Ipm': 0.02,
+    'FF': 0.01,
+    'Rs': None,
+    'Rsh': None,
+}
+
+# Curves processed per vectorized batch
+CHUNK_SIZE = 2000
+
+PARAMETER_NAMES = ['Isc', 'Voc', 'Pmax', 'Vpm', 'Ipm', 'FF', 'Rs', 'Rsh']
+
+def stack_curves(voltages, currents):
+    """
+    Stack curves of different lengths into 2-D arrays padded with NaN, each row sorted by voltage.
+
+    Returns:
+        tuple: (voltage, current) arrays of shape (n_curves, max_points)
+    """
+    n_curves = len(voltages)
+    max_points = max((len(v) for v in voltages), default=0)
+    voltage = np.full((n_curves, max_points), np.nan)
+    current = np.full((n_curves, max_points), np.nan)
+    for row, (v, i) in enumerate(zip(voltages, currents)):
+        voltage[row, :len(v)] = v
+        current[row, :len(i)] = i
+
+    # NaN padding sorts to the end of each row
+    order = np.argsort(voltage, axis=1)
+    return np.take_along_axis(voltage, order, axis=1), np.take_along_axis(current, order, axis=1)
+
+def _take(array, index):
+    """Take one element per row."""
+    return np.take_along_axis(array, index[:, None], axis=1)[:, 0]
+
+def _interpolate_crossing(x, y, crossing):
+    """Interpolate x where y crosses zero, at the first True in each row of 'crossing'."""
+    n_valid = np.count_nonzero(~np.isnan(x), axis=1)
+    has_crossing = crossing.any(axis=1)
+
+    upper = np.argmax(crossing, axis=1)
+    # Without a crossing, extrapolate from the last two points
+    upper = np.where(has_crossing, upper, np.maximum(n_valid - 1, 0))
+    lower = np.maximum(upper - 1, 0)
+
+    x0, x1 = _take(x, lower), _take(x, upper)
+    y0, y1 = _take(y, lower), _take(y, upper)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = x0 - y0 * (x1 - x0) / (y1 - y0)
+    return np.where((y1 == y0) | (upper == lower), x1, result)
+
+def _masked_line(x, y, mask):
+    """Least-squares line y = slope * x + intercept per row over the masked points."""
+    xm = np.where(mask, x, 0.0)
+    ym = np.where(mask, y, 0.0)
+    n = mask.sum(axis=1)
+    sx, sy = xm.sum(axis=1), ym.sum(axis=1)
+    sxx, sxy = (xm * xm).sum(axis=1), (xm * ym).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
+    enough = n >= 2
+    return np.where(enough, slope, np.nan), np.where(enough, intercept, np.nan)
+
+def _fit_mpp(voltage, power, vpm_raw, voc):
+    """Refine the MPP with a quadratic fit of P(V) around the highest measured point."""
+    mask = np.abs(voltage - vpm_raw[:, None]) <= MPP_FIT_WINDOW * voc[:, None]
+    mask &= ~np.isnan(power)
+
+    # Centre the voltage to keep the normal equations well conditioned
+    x = np.where(mask, voltage - vpm_raw[:, None], 0.0)
+    p = np.where(mask, power, 0.0)
+    x_powers = [mask.astype(float)]
+    for _ in range(4):
+        x_powers.append(x_powers[-1] * x)
+    s = [x_power.sum(axis=1) for x_power in x_powers]
+    t = [(x_power * p).sum(axis=1) for x_power in x_powers[:3]]
+
+    a_matrix = np.stack([
+        np.stack([s[4], s[3], s[2]], axis=1),
+        np.stack([s[3], s[2], s[1]], axis=1),
+        np.stack([s[2], s[1], s[0]], axis=1),
+    ], axis=1)
+    b_vector = np.stack([t[2], t[1], t[0]], axis=1)
+
+    # Rows that cannot be fitted fall back to the measured maximum
+    fittable = mask.sum(axis=1) >= 5
+    a_matrix[~fittable] = np.eye(3)
+    b_vector[~fittable] = 0.0
+    a, b, c = np.linalg.solve(a_matrix, b_vector[:, :, None])[:, :, 0].T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = -b / (2 * a)
+        pmax = c - b * b / (4 * a)
+    window = MPP_FIT_WINDOW * voc
+    valid = fittable & (a < 0) & (np.abs(offset) <= window)
+    return np.where(valid, vpm_raw + offset, vpm_raw), valid, np.where(valid, pmax, np.nan)
+
+def extract_parameters(voltage, current):
+    """
+    Recompute IV parameters for many curves at once.
+
+    Args:
+        voltage (ndarray): (n_curves, n_points) voltages sorted ascending, NaN padded
+        current (ndarray): (n_curves, n_points) currents matching 'voltage'
+
+    Returns:
+        dict: parameter name -> ndarray of shape (n_curves,)
+    """
+    valid = ~np.isnan(voltage) & ~np.isnan(current)
+
+    isc = _interpolate_crossing(current, voltage, valid & (voltage >= 0))
+    # Voc from a line fit of V(I) through the points near zero current, which is robust
+    # against the noisy tail of the sweep; fall back to the first zero crossing
+    voc_crossing = _interpolate_crossing(voltage, current, valid & (voltage >= 0) & (current <= 0))
+    voc_mask = valid & (voltage >= 0) & (np.abs(current) <= VOC_FIT_CURRENT * isc[:, None])
+    voc_fit = _masked_line(current, voltage, voc_mask)[1]
+    voc = np.where(np.isnan(voc_fit), voc_crossing, voc_fit)
+
+    power = np.where(valid & (voltage >= 0) & (current >= 0), voltage * current, np.nan)
+    has_power = ~np.isnan(power).all(axis=1)
+    best = np.argmax(np.where(np.isnan(power), -np.inf, power), axis=1)
+    vpm_raw = _take(voltage, best)
+    pmax_raw = _take(power, best)
+
+    vpm, fitted, pmax_fit = _fit_mpp(voltage, power, vpm_raw, voc)
+    pmax = np.where(fitted, pmax_fit, pmax_raw)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ipm = pmax / vpm
+        ff = pmax / (isc * voc)
+
+        # Rs from -dV/dI around Voc, Rsh from -dV/dI around Isc
+        rs_mask = valid & (np.abs(voltage - voc[:, None]) <= RS_FIT_WINDOW * voc[:, None])
+        rs = -1.0 / _masked_line(voltage, current, rs_mask)[0]
+        rsh_mask = valid & (voltage >= 0) & (voltage <= RSH_FIT_WINDOW * voc[:, None])
+        rsh = -1.0 / _masked_line(voltage, current, rsh_mask)[0]
+
+    results = {
+        'Isc': isc,
+        'Voc': voc,
+        'Pmax': pmax,
+        'Vpm': vpm,
+        'Ipm': ipm,
+        'FF': ff,
+        'Rs': rs,
+        'Rsh': rsh,
+    }
+    return {name: np.where(has_power, values, np.nan) for name, values in results.items()}
+
+def extract_parameters_chunked(voltage, current, chunk_size=None):
+    """Run extract_parameters over row chunks to bound the size of the temporary arrays."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    chunks = [extract_parameters(voltage[start:start + chunk_size], current[start:start + chunk_size])
+              for start in range(0, len(voltage), chunk_size)]
+    if not chunks:
+        return {name: np.empty(0) for name in PARAMETER_NAMES}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in PARAMETER_NAMES}
+
+def correct_to_target(voltage, current, irradiance, temperature, target_irradiance, target_temperature,
+                      alpha=ALPHA_ISC, beta=BETA_VOC, kappa=KAPPA):
+    """
+    Correct measured curves to target irradiance/temperature (IEC 60891 procedure 1).
+
+    Irradiance, temperature and targets are per-curve arrays (or scalars) that broadcast
+    against the (n_curves,) axis; Isc, Voc and Rs come from the uncorrected curves.
+
+    Returns:
+        tuple: (voltage, current) corrected arrays, re-sorted by voltage
+    """
+    measured = extract_parameters(voltage, current)
+    isc, voc = measured['Isc'][:, None], measured['Voc'][:, None]
+    rs = np.nan_to_num(measured['Rs'], nan=0.0)[:, None]
+
+    g1 = np.broadcast_to(irradiance, isc.shape[:1])[:, None]
+    g2 = np.broadcast_to(target_irradiance, isc.shape[:1])[:, None]
+    delta_t = (np.broadcast_to(target_temperature, isc.shape[:1])
+               - np.broadcast_to(temperature, isc.shape[:1]))[:, None]
+
+    corrected_current = current + isc * (g2 / g1 - 1) + alpha * isc * delta_t
+    corrected_voltage = (voltage - rs * (corrected_current - current)
+                         - kappa * corrected_current * delta_t + beta * voc * delta_t)
+
+    order = np.argsort(corrected_voltage, axis=1)
+    return (np.take_along_axis(corrected_voltage, order, axis=1),
+            np.take_along_axis(corrected_current, order, axis=1))
+
+def load_curves(file_paths):
+    """
+    Parse IV files into stacked arrays plus the tester-reported results.
+
+    The tester-corrected points are used for every format, so the audit compares curves
+    already at the Corrected To/CTMod targets and does not correct them again.
+
+    Returns:
+        tuple: (voltage, current, reported DataFrame)
+    """
+    voltages, currents, rows = [], [], []
+    for file_path in file_paths:
+        try:
+            parsed = iv_parser.parse_iv_file(file_path)
+        except Exception as e:
+            print(f"Error parsing {file_path}: {e}")
+            continue
+        if not parsed['voltage']:
+            print(f"No IV points found in {file_path}")
+            continue
+
+        row = iv_parser.get_flasher_results(parsed)
+        row['file'] = file_path
+        row['serial'] = iv_parser.get_serial(parsed)
+        voltages.append(parsed['voltage'])
+        currents.append(parsed['current'])
+        rows.append(row)
+
+    voltage, current = stack_curves(voltages, currents)
+    return voltage, current, pd.DataFrame(rows)
+
+def audit_iv_files(file_paths, tolerances=None):
+    """
+    Recompute IV parameters from the curve points and compare them with the tester-reported values.
+
+    Returns:
+        DataFrame: one row per file with reported_*, computed_* and diff_* columns,
+                   plus 'flagged' listing the parameters outside tolerance
+    """
+    voltage, current, reported = load_curves(file_paths)
+    return audit_curves(voltage, current, reported, tolerances)
+
+def audit_curves(voltage, current, reported, tolerances=None):
+    """
+    Compare recomputed parameters of stacked curves with the tester-reported values.
+
+    'reported' has one row per curve with 'file', 'serial', 'measured_at' and the
+    reported parameters.
+    """
+    tolerances = tolerances or AUDIT_TOLERANCES
+    if reported.empty:
+        return reported
+
+    computed = extract_parameters_chunked(voltage, current)
+
+    audit = reported[['file', 'serial', 'measured_at']].copy()
+    flagged = [[] for _ in range(len(audit))]
+    for name in PARAMETER_NAMES:
+        reported_values = reported[name].to_numpy(dtype=float)
+        audit[f'reported_{name}'] = reported_values
+        audit[f'computed_{name}'] = computed[name]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diff = (computed[name] - reported_values) / np.abs(reported_values)
+        audit[f'diff_{name}'] = diff
+
+        tolerance = tolerances.get(name)
+        if tolerance is not None:
+            for row in np.flatnonzero(np.abs(diff) > tolerance):
+                flagged[row].append(name)
+
+    audit['flagged'] = [', '.join(names) for names in flagged]
+    return audit
+
+def print_audit_summary(audit):
+    """Print the flagged modules of an audit."""
+    flagged = audit[audit['flagged'] != '']
+    print(f"Audited {len(audit)} curves, {len(flagged)} disagree with the tester-reported values")
+    for _, row in flagged.iterrows():
+        details = ', '.join(
+            f"{name} {row[f'reported_{name}']:.4g} vs {row[f'computed_{name}']:.4g}"
+            for name in row['flagged'].split(', ')
+        )
+        print(f"  {row['serial']} ({os.path.basename(row['file'])}): {details}")
+
+# Parameters
+iv_source_folder = 'source ivc'
+audit_output_path = 'D:\\ELimagesnew\\iv_audit.csv'
+
+if __name__ == "__main__":
+    iv_files = iv_parser.find_iv_files(iv_source_folder)
+    print(f"Found {len(iv_files)} IV files in {iv_source_folder}")
+    audit = audit_iv_files(iv_files)
+    print_audit_summary(audit)
+    os.makedirs(os.path.dirname(audit_output_path), exist_ok=True)
+    audit.to_csv(audit_output_path, index=False)
+    print(f"Audit written to {audit_output_path}")
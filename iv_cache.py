@@ -0,0 +1,241 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+import iv_parser
+
+# Cache folder for parsed IV curves (points file + JSON index)
+iv_cache_folder = "D:\\ELimagesnew\\iv_cache"
+
+# Compare source content hashes when mtime/size changed, so touched-but-identical files are not reparsed
+verify_hash = True
+
+# Rewrite the points file when more than this fraction of it belongs to replaced curves
+compaction_threshold = 0.5
+
+INDEX_FILE_NAME = 'index.json'
+INDEX_VERSION = 1
+
+# Each point is stored as two float32 values: voltage, current
+POINT_DTYPE = np.float32
+POINT_SIZE = 2 * np.dtype(POINT_DTYPE).itemsize
+
+def get_file_hash(file_path):
+    """Get MD5 hash of a file."""
+    hasher = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def load_index(cache_folder):
+    """Load the cache index, or an empty index if none exists yet."""
+    index_path = os.path.join(cache_folder, INDEX_FILE_NAME)
+    if os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION:
+            return index
+        print(f"Ignoring IV cache index with unknown version: {index_path}")
+    return {'version': INDEX_VERSION, 'generation': 0, 'total_points': 0, 'entries': {}}
+
+def save_index(cache_folder, index):
+    """Write the cache index atomically so readers never see a partial file."""
+    index_path = os.path.join(cache_folder, INDEX_FILE_NAME)
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(temp_path, index_path)
+
+def get_points_path(cache_folder, generation):
+    """Path of the points file for an index generation."""
+    return os.path.join(cache_folder, f"points_{generation}.f32")
+
+def compact_cache(cache_folder, index):
+    """Rewrite the live curves into a new points file generation and drop the old one."""
+    old_path = get_points_path(cache_folder, index['generation'])
+    new_generation = index['generation'] + 1
+    new_path = get_points_path(cache_folder, new_generation)
+
+    old_points = np.memmap(old_path, dtype=POINT_DTYPE, mode='r').reshape(-1, 2) if index['total_points'] else None
+    offset = 0
+    with open(new_path, 'wb') as f:
+        for entry in index['entries'].values():
+            f.write(old_points[entry['offset']:entry['offset'] + entry['length']].tobytes())
+            entry['offset'] = offset
+            offset += entry['length']
+    del old_points
+
+    index['generation'] = new_generation
+    index['total_points'] = offset
+    save_index(cache_folder, index)
+
+    # Readers that still map the old generation keep their view (removal may fail on Windows)
+    try:
+        os.remove(old_path)
+    except OSError as e:
+        print(f"Could not remove old IV cache file {old_path}: {e}")
+    print(f"Compacted IV cache to {offset} points")
+
+def update_cache(source_folder, cache_folder=None):
+    """
+    Parse new or changed IV files under a folder into the cache.
+
+    Curves are appended to the points file, so offsets of cached curves never move and
+    processes holding a read-only map stay valid. Replaced curves are reclaimed by compaction.
+
+    Returns:
+        int: Number of files (re)parsed
+    """
+    cache_folder = cache_folder or iv_cache_folder
+    os.makedirs(cache_folder, exist_ok=True)
+    index = load_index(cache_folder)
+    entries = index['entries']
+
+    source_files = set(iv_parser.find_iv_files(source_folder))
+    root_prefix = os.path.join(os.path.abspath(source_folder), '')
+    source_paths = {os.path.abspath(path) for path in source_files}
+
+    # Forget entries for files deleted from this source folder
+    removed = [path for path in entries if path.startswith(root_prefix) and path not in source_paths]
+    stale_points = sum(entries[path]['length'] for path in removed)
+    for path in removed:
+        del entries[path]
+
+    parsed_count = 0
+    points_path = get_points_path(cache_folder, index['generation'])
+    with open(points_path, 'ab') as points_file:
+        # Drop points written after the last saved index (a run that failed part way), so
+        # the file ends exactly at total_points
+        points_file.truncate(index['total_points'] * POINT_SIZE)
+        for path in sorted(source_paths):
+            try:
+                stat = os.stat(path)
+                entry = entries.get(path)
+                if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                    continue
+
+                file_hash = get_file_hash(path) if verify_hash else None
+                if entry and file_hash and entry.get('hash') == file_hash:
+                    entry['mtime'] = stat.st_mtime
+                    entry['size'] = stat.st_size
+                    continue
+
+                # Everything that can fail comes before the write, so a bad file leaves no points behind
+                parsed = iv_parser.parse_iv_file(path)
+                points = np.column_stack([parsed['voltage'], parsed['current']]).astype(POINT_DTYPE)
+                new_entry = {
+                    'serial': iv_parser.get_serial(parsed),
+                    'offset': index['total_points'],
+                    'length': len(points),
+                    'mtime': stat.st_mtime,
+                    'size': stat.st_size,
+                    'hash': file_hash,
+                    'results': iv_parser.get_flasher_results(parsed),
+                }
+                try:
+                    points_file.write(points.tobytes())
+                    points_file.flush()
+                except OSError:
+                    points_file.truncate(index['total_points'] * POINT_SIZE)
+                    raise
+
+                if entry:
+                    stale_points += entry['length']
+                entries[path] = new_entry
+                index['total_points'] += len(points)
+                parsed_count += 1
+            except Exception as e:
+                print(f"Error caching {path}: {e}")
+
+    index['stale_points'] = index.get('stale_points', 0) + stale_points
+    save_index(cache_folder, index)
+    print(f"IV cache updated: {parsed_count} files parsed, {len(entries)} curves cached")
+
+    if index['total_points'] and index['stale_points'] / index['total_points'] > compaction_threshold:
+        index['stale_points'] = 0
+        compact_cache(cache_folder, index)
+    return parsed_count
+
+class IVCache:
+    """Read-only, memory-mapped view of the IV curve cache, safe to open in many worker processes."""
+
+    def __init__(self, cache_folder=None):
+        self.cache_folder = cache_folder or iv_cache_folder
+        self.index = load_index(self.cache_folder)
+        total_points = self.index['total_points']
+        if total_points:
+            points_path = get_points_path(self.cache_folder, self.index['generation'])
+            # Only the indexed prefix is mapped; curves appended later need a new IVCache
+            self.points = np.memmap(points_path, dtype=POINT_DTYPE, mode='r', shape=(total_points, 2))
+        else:
+            self.points = np.empty((0, 2), dtype=POINT_DTYPE)
+
+        # Latest measurement per serial (files without a serial cannot be looked up)
+        self.by_serial = {}
+        for path, entry in self.index['entries'].items():
+            if not entry['serial']:
+                continue
+            current = self.by_serial.get(entry['serial'])
+            if current is None or (entry['results'].get('measured_at') or '') >= \
+                    (self.index['entries'][current]['results'].get('measured_at') or ''):
+                self.by_serial[entry['serial']] = path
+
+    def serials(self):
+        """List the cached module serials."""
+        return list(self.by_serial)
+
+    def get_entry(self, serial):
+        """Get the index entry of the latest curve of a serial, or None."""
+        path = self.by_serial.get(serial.strip().upper())
+        return self.index['entries'][path] if path else None
+
+    def get_curve(self, serial):
+        """
+        Get the curve of a serial as zero-copy views into the map.
+
+        Returns:
+            tuple or None: (voltage, current) float32 arrays
+        """
+        entry = self.get_entry(serial)
+        if entry is None:
+            return None
+        points = self.points[entry['offset']:entry['offset'] + entry['length']]
+        return points[:, 0], points[:, 1]
+
+    def load_curves(self, serials=None):
+        """
+        Stack cached curves for iv_analysis.
+
+        Returns:
+            tuple: (voltage, current, reported DataFrame) like iv_analysis.load_curves
+        """
+        import iv_analysis
+
+        serials = self.serials() if serials is None else serials
+        voltages, currents, rows = [], [], []
+        for serial in serials:
+            serial = serial.strip().upper()
+            entry = self.get_entry(serial)
+            if entry is None:
+                continue
+            voltage, current = self.get_curve(serial)
+            voltages.append(voltage)
+            currents.append(current)
+            row = dict(entry['results'])
+            row['file'] = self.by_serial[serial]
+            row['serial'] = serial
+            rows.append(row)
+
+        voltage, current = iv_analysis.stack_curves(voltages, currents)
+        return voltage, current, pd.DataFrame(rows)
+
+# Parameters
+iv_source_folder = 'source ivc'
+
+if __name__ == "__main__":
+    update_cache(iv_source_folder)
+    cache = IVCache()
+    print(f"Cached serials: {len(cache.serials())}")
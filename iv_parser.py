@@ -0,0 +1,250 @@
+import pandas as pd
+from datetime import datetime
+from fs_walker import find_files
+
+# Header keys in i5/i6 .ivc files mapped to common flasher result names
+IVC_RESULT_FIELDS = {
+    'Pmax': 'Pmax',
+    'Voc': 'Voc',
+    'Isc': 'Isc',
+    'Vpm': 'Vpm',
+    'Ipm': 'Ipm',
+    'Fill Factor': 'FF',
+    'Rseries': 'Rs',
+    'Rshunt': 'Rsh',
+    'Module Temp': 'TMod',
+    'Corrected To': 'CTMod',
+    'RCCC': 'Irr',
+}
+
+# Header keys in i7 SmartSweep .txt files mapped to common flasher result names
+SMARTSWEEP_RESULT_FIELDS = {
+    'Pmax': 'Pmax',
+    'Voc': 'Voc',
+    'Isc': 'Isc',
+    'Vpmax': 'Vpm',
+    'Ipmax': 'Ipm',
+    'FF': 'FF',
+    'Rs': 'Rs',
+    'Rsh': 'Rsh',
+    'TempDUT': 'TMod',
+    'TempTgt': 'CTMod',
+    'Gavg': 'Irr',
+    'Gtgt': 'CIrr',
+}
+
+# Columns of the Gsolar flasher CSV export (i6 has this header row)
+GSOLAR_COLUMNS = [
+    'Title', 'Comment', 'ID', 'SN', 'Date', 'Time1', 'Mod_Type', 'Pmax',
+    'Fill_Factor', 'Voc', 'Isc', 'Vpm', 'Ipm', 'RCCC', 'Irr_Target',
+    'Module_temp', 'Corrected_To', 'Rseries', 'Rshunt', 'Module_Eff',
+    'Sweep_Time', 'Sweep_Direction', 'Sweep_Mode', 'Irr_Flag', 'LTI',
+    'StdIsc1', 'T_MonCell', 'T_Ambient', 'Module_Type', 'Area_Module',
+    'Manufacturer', 'producer', 'celltype', 'moduletype'
+]
+
+# i5 exports the same layout without a header row and with Ipm before Vpm
+I5_COLUMNS = GSOLAR_COLUMNS[:11] + ['Ipm', 'Vpm'] + GSOLAR_COLUMNS[13:]
+
+# CSV columns mapped to common flasher result names (Gsolar and DataLog layouts)
+CSV_RESULT_FIELDS = {
+    'Pmax': 'Pmax',
+    'Voc': 'Voc',
+    'Isc': 'Isc',
+    'Vpm': 'Vpm',
+    'Vpmax': 'Vpm',
+    'Ipm': 'Ipm',
+    'Ipmax': 'Ipm',
+    'Fill_Factor': 'FF',
+    'FF': 'FF',
+    'Rseries': 'Rs',
+    'Rs': 'Rs',
+    'Rshunt': 'Rsh',
+    'Rsh': 'Rsh',
+    'Module_temp': 'TMod',
+    'TMod': 'TMod',
+    'Corrected_To': 'CTMod',
+    'CTMod': 'CTMod',
+    'RCCC': 'Irr',
+    'Irr': 'Irr',
+    'Irr_Target': 'CIrr',
+    'CIrr': 'CIrr',
+}
+
+RESULT_NAMES = ['Pmax', 'Voc', 'Isc', 'Vpm', 'Ipm', 'FF', 'Rs', 'Rsh', 'TMod', 'CTMod', 'Irr', 'CIrr']
+
+SERIAL_LENGTH = 7
+
+# Timestamp formats used by the testers, normalised to ISO 'YYYY-MM-DD HH:MM:SS'
+TIMESTAMP_FORMATS = ['%Y/%m/%d %H:%M:%S', '%d-%m-%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S']
+
+def to_float(value):
+    """Convert a header value to float, returning None for N/A or empty values."""
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+def normalize_timestamp(value):
+    """Convert a tester timestamp to 'YYYY-MM-DD HH:MM:SS', keeping the raw value if unknown."""
+    if not value:
+        return None
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), timestamp_format).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    return value
+
+def serial_from_sn(sn):
+    """Extract the module serial from a tester SN like I5240612A7F2555 -> A7F2555."""
+    sn = str(sn).strip().upper()
+    if len(sn) < SERIAL_LENGTH:
+        return None
+    return sn[-SERIAL_LENGTH:]
+
+def parse_ivc_file(file_path):
+    """
+    Parse an i5/i6 .ivc file.
+
+    Returns:
+        dict: {'header': {key: str}, 'voltage': [float], 'current': [float]}
+    """
+    header = {}
+    voltage = []
+    current = []
+    in_curve = False
+
+    with open(file_path, 'r', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if in_curve:
+                parts = line.split()
+                if len(parts) >= 2:
+                    try:
+                        voltage.append(float(parts[0]))
+                        current.append(float(parts[1]))
+                    except ValueError:
+                        continue
+            elif line.startswith('Voltage:'):
+                in_curve = True
+            elif ':' in line:
+                key, value = line.split(':', 1)
+                header[key.strip()] = value.strip()
+
+    return {'header': header, 'voltage': voltage, 'current': current}
+
+def parse_smartsweep_file(file_path):
+    """
+    Parse an i7 SmartSweep .txt export.
+
+    'voltage'/'current' are the tester-corrected points; the Vraw/Iraw columns are not read.
+
+    Returns:
+        dict: {'header': {key: str}, 'voltage': [float], 'current': [float]}
+    """
+    header = {}
+    voltage = []
+    current = []
+    columns = None
+    in_curve = False
+
+    with open(file_path, 'r', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('*') or line.startswith('---'):
+                continue
+            if in_curve:
+                parts = line.split(',')
+                if columns is None:
+                    columns = {name: i for i, name in enumerate(parts)}
+                    continue
+                try:
+                    voltage.append(float(parts[columns['Voltage']]))
+                    current.append(float(parts[columns['Current']]))
+                except (KeyError, IndexError, ValueError):
+                    continue
+            elif line.startswith('IV curve data'):
+                in_curve = True
+            elif ':' in line:
+                key, value = line.split(':', 1)
+                header[key.strip()] = value.strip()
+
+    return {'header': header, 'voltage': voltage, 'current': current}
+
+def parse_iv_file(file_path):
+    """Parse an .ivc or SmartSweep .txt file based on its extension."""
+    if file_path.lower().endswith('.ivc'):
+        return parse_ivc_file(file_path)
+    return parse_smartsweep_file(file_path)
+
+def get_serial(parsed):
+    """Get the module serial from a parsed IV file header."""
+    header = parsed['header']
+    serial = header.get('ID') or header.get('Snr')
+    if serial:
+        return serial.strip().upper()
+    if header.get('SN'):
+        return serial_from_sn(header['SN'])
+    return None
+
+def get_flasher_results(parsed):
+    """Get the tester-reported results from a parsed IV file under common names."""
+    header = parsed['header']
+    fields = IVC_RESULT_FIELDS if 'Rseries' in header or 'Fill Factor' in header else SMARTSWEEP_RESULT_FIELDS
+    results = {name: None for name in RESULT_NAMES}
+    for key, name in fields.items():
+        if key in header:
+            results[name] = to_float(header[key])
+
+    # i6 and SmartSweep report fill factor in percent
+    if results['FF'] is not None and results['FF'] > 1:
+        results['FF'] = results['FF'] / 100
+
+    if 'Date' in header:
+        date = header['Date']
+        if 'Time' in header and len(date.split()) == 1:
+            date = f"{date} {header['Time']}"
+        results['measured_at'] = normalize_timestamp(date)
+    else:
+        results['measured_at'] = normalize_timestamp(header.get('MeasDate'))
+    results['sn'] = header.get('SN')
+    return results
+
+def read_flasher_csv(csv_path):
+    """
+    Read a flasher CSV export (i5 headerless, i6 Gsolar, i7 DataLog) into a DataFrame
+    with 'serial', 'sn', 'measured_at' and the common result columns.
+    """
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    if 'ID' not in df.columns:
+        df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, header=None, names=I5_COLUMNS)
+
+    results = pd.DataFrame(index=df.index)
+
+    # DataLog keeps the tester SN in 'Ref'; Gsolar keeps it in 'SN'
+    sn_column = 'SN' if 'SN' in df.columns else 'Ref'
+    results['sn'] = df[sn_column].str.strip() if sn_column in df.columns else ''
+    results['serial'] = df['ID'].str.strip().str.upper()
+
+    time_column = 'Time1' if 'Time1' in df.columns else 'Time'
+    measured_at = pd.to_datetime(df['Date'].str.strip() + ' ' + df[time_column].str.strip(),
+                                 format='%d-%m-%Y %H:%M:%S', errors='coerce')
+    results['measured_at'] = measured_at.dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    for column, name in CSV_RESULT_FIELDS.items():
+        if column in df.columns and name not in results.columns:
+            results[name] = pd.to_numeric(df[column], errors='coerce')
+    for name in RESULT_NAMES:
+        if name not in results.columns:
+            results[name] = float('nan')
+
+    # DataLog reports fill factor in percent
+    results.loc[results['FF'] > 1, 'FF'] = results['FF'] / 100
+    return results
+
+def find_iv_files(root_folder):
+    """List all .ivc and .txt IV files under a folder."""
+    return find_files(root_folder, ('.ivc', '.txt'))
@@ -0,0 +1,324 @@
+import os
+import re
+import uuid
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import iv_analysis
+from datalog_generator import DEFAULT_START_TIME, MODULE_AREA, format_serials
+
+# Module parameter distributions at STC (mean, standard deviation)
+ISC_DISTRIBUTION = (13.30, 0.10)
+VOC_DISTRIBUTION = (49.70, 0.20)
+RS_DISTRIBUTION = (0.12, 0.015)
+RSH_MEDIAN = 200.0
+RSH_LOG_SIGMA = 0.6
+IDEALITY_DISTRIBUTION = (1.00, 0.03)
+
+# Measurement conditions of the flasher (mean, standard deviation)
+IRRADIANCE_DISTRIBUTION = (1000.0, 0.5)
+MODULE_TEMP_DISTRIBUTION = (25.0, 0.8)
+
+# Measurement noise (standard deviation)
+VOLTAGE_NOISE = 0.003
+CURRENT_NOISE = 0.002
+
+CELLS_IN_SERIES = 72
+THERMAL_VOLTAGE = 0.025693  # kT/q at 25 degC
+
+# Points per curve: i5 sweeps 0 V -> Voc, i7 SmartSweep sweeps slightly past both ends
+IVC_POINTS = 400
+SMARTSWEEP_POINTS = 1980
+SMARTSWEEP_RANGE = (-1.2, 51.0)
+
+IVC_MOD_TYPE = 'TP530HG10'
+
+# Real SmartSweep export used as the header template for generated .txt files
+smartsweep_template = os.path.join('source ivc', 'i7', 'A8C7A01.txt')
+
+# Files per output subfolder, so million-file corpora stay listable
+files_per_folder = 10000
+
+# Curves generated and written per worker task
+batch_size = 1000
+
+# Seconds between two measurements (uniform)
+MEASUREMENT_INTERVAL = (20, 90)
+
+def sample_module_parameters(rng, count):
+    """Draw single-diode parameters for 'count' modules."""
+    return {
+        'Isc': rng.normal(*ISC_DISTRIBUTION, count),
+        'Voc': rng.normal(*VOC_DISTRIBUTION, count),
+        'Rs': np.clip(rng.normal(*RS_DISTRIBUTION, count), 0.02, None),
+        'Rsh': rng.lognormal(np.log(RSH_MEDIAN), RSH_LOG_SIGMA, count),
+        'n': rng.normal(*IDEALITY_DISTRIBUTION, count),
+    }
+
+def single_diode_curves(params, voltage_grid):
+    """
+    Evaluate the single-diode model for many modules on a voltage grid.
+
+    The model is explicit in the diode voltage Vd = V + I*Rs:
+        I = Iph - I0 * (exp(Vd / a) - 1) - Vd / Rsh,  V = Vd - I * Rs
+    so curves are sampled on a dense Vd grid and interpolated onto 'voltage_grid'.
+
+    Returns:
+        ndarray: (n_modules, len(voltage_grid)) currents
+    """
+    isc, voc, rs, rsh = (params[name][:, None] for name in ('Isc', 'Voc', 'Rs', 'Rsh'))
+    a = params['n'][:, None] * CELLS_IN_SERIES * THERMAL_VOLTAGE
+
+    # Photo and saturation currents that reproduce the sampled Isc and Voc
+    iph = isc * (1 + rs / rsh)
+    i0 = (iph - voc / rsh) / np.expm1(voc / a)
+
+    span = voltage_grid[-1] - voltage_grid[0]
+    diode_voltage = np.linspace(voltage_grid[0] - 2 * isc * rs, voltage_grid[-1] + 0.05 * span,
+                                4 * len(voltage_grid), axis=1)[:, :, 0]
+    current = iph - i0 * np.expm1(diode_voltage / a) - diode_voltage / rsh
+    voltage = diode_voltage - current * rs
+
+    # V(Vd) is monotonic, so each row can be interpolated directly
+    return np.stack([np.interp(voltage_grid, v, i) for v, i in zip(voltage, current)])
+
+def generate_curves(rng, count, voltage_grid):
+    """
+    Generate noisy STC curves on a voltage grid, plus their parameters and reported results.
+
+    Returns:
+        tuple: (voltage, current, params, results)
+    """
+    params = sample_module_parameters(rng, count)
+    current = single_diode_curves(params, voltage_grid)
+    voltage = np.broadcast_to(voltage_grid, current.shape).copy()
+    voltage += rng.normal(0, VOLTAGE_NOISE, voltage.shape)
+    current += rng.normal(0, CURRENT_NOISE, current.shape)
+    voltage[:, 0] = voltage_grid[0]
+
+    order = np.argsort(voltage, axis=1)
+    voltage = np.take_along_axis(voltage, order, axis=1)
+    current = np.take_along_axis(current, order, axis=1)
+    results = iv_analysis.extract_parameters(voltage, current)
+    return voltage, current, params, results
+
+def format_ivc_header(key, value):
+    """Format one .ivc header line: keys padded to 19 columns, numbers right-aligned to column 25."""
+    if isinstance(value, str):
+        return f"{key + ':':<19}{value}"
+    return f"{key + ':':<15}{value:>10.3f}"
+
+def write_ivc_file(file_path, serial, measured_at, results, row, voltage, current, module_temp, irradiance):
+    """Write one curve as an i5 .ivc file."""
+    header = [
+        ('Date', measured_at.strftime('%Y/%m/%d %H:%M:%S')),
+        ('ID', serial),
+        ('SN', f"I5{measured_at.strftime('%y%m%d')}{serial}"),
+        ('Time', measured_at.strftime('%H:%M:%S')),
+        ('Rshunt', results['Rsh'][row]),
+        ('Rseries', results['Rs'][row]),
+        ('Fill Factor', results['FF'][row]),
+        ('Isc', results['Isc'][row]),
+        ('Voc', results['Voc'][row]),
+        ('Ipm', results['Ipm'][row]),
+        ('Vpm', results['Vpm'][row]),
+        ('Pmax', results['Pmax'][row]),
+        ('Corrected To', 25.0),
+        ('StdIsc1', 0.170),
+        ('RCCC', irradiance),
+        ('Module Temp', module_temp),
+        ('Mod Type', IVC_MOD_TYPE),
+    ]
+    lines = [format_ivc_header(key, value) for key, value in header]
+    lines.append(' Voltage:\t Current:')
+    keep = voltage >= 0
+    points = np.column_stack([voltage[keep], current[keep]]).tolist()
+    lines.extend(map('%.3f\t%.3f'.__mod__, map(tuple, points)))
+    with open(file_path, 'w', newline='\n') as f:
+        f.write('\n'.join(lines))
+
+def load_smartsweep_template(template_path=None):
+    """Read the header lines (between the title and the IV data) of a real SmartSweep export."""
+    template_path = template_path or smartsweep_template
+    header_lines = []
+    with open(template_path, 'r') as f:
+        lines = f.read().splitlines()
+    start = lines.index('All possible value of one measure') + 2
+    for line in lines[start:]:
+        if not line.strip():
+            break
+        header_lines.append(line)
+    return header_lines
+
+SMARTSWEEP_LINE_PATTERN = re.compile(r'^([^:]+:[\t ]?)(\s*)(\S.*)?$')
+
+def fill_smartsweep_header(template_lines, values):
+    """Replace template header values, keeping each line's key, separator and value width."""
+    lines = []
+    for line in template_lines:
+        match = SMARTSWEEP_LINE_PATTERN.match(line)
+        key = line.split(':', 1)[0]
+        if not match or key not in values:
+            lines.append(line)
+            continue
+        value = values[key]
+        if not isinstance(value, str):
+            value = f"{value:.4f}"
+        width = len(match.group(2)) + len(match.group(3) or '')
+        lines.append(f"{match.group(1)}{value:>{width}}")
+    return lines
+
+def write_smartsweep_file(file_path, template_lines, serial, measured_at, results, row,
+                          voltage, current, raw_voltage, raw_current, irradiance, module_temp, session_id):
+    """Write one curve as an i7 SmartSweep .txt export."""
+    timestamp = measured_at.strftime('%Y-%m-%d %H:%M:%S.%f')
+    values = {
+        'Isc': results['Isc'][row],
+        'Voc': results['Voc'][row],
+        'Pmax': results['Pmax'][row],
+        'Ipmax': results['Ipm'][row],
+        'Vpmax': results['Vpm'][row],
+        'FF': results['FF'][row],
+        'Rs': results['Rs'][row],
+        'Rsh': results['Rsh'][row],
+        'Eff': results['Pmax'][row] / (MODULE_AREA * 100),
+        'Gavg': float(np.mean(irradiance)),
+        'TempDUT': module_temp,
+        'MeasDate': timestamp,
+        'Now': timestamp,
+        'Snr': serial,
+        'sessionId': session_id,
+    }
+    lines = [
+        '****Header****',
+        f"date {measured_at.strftime('%m/%d/%y %H:%M:%S')}",
+        '****Body****',
+        '',
+        'All possible value of one measure',
+        '',
+    ]
+    lines.extend(fill_smartsweep_header(template_lines, values))
+    lines.extend(['', '-----------------------', '', 'IV curve data :', '',
+                  'TimeOffset,Vimp,Iraw,Vraw,Graw,Current,Voltage,Irradiance'])
+
+    points = len(voltage)
+    time_offset = np.linspace(0.0015, 0.0114, points)
+    vimp = np.linspace(voltage[0] - 4.45, voltage[-1] + 2.9, points)
+    data = np.column_stack([time_offset, vimp, raw_current, raw_voltage, irradiance, current, voltage, irradiance])
+    lines.extend(map(','.join(['%.4f'] * data.shape[1]).__mod__, map(tuple, data.tolist())))
+
+    with open(file_path, 'w', newline='\n') as f:
+        f.write('\n'.join(lines) + '\n\n')
+
+def generate_batch(output_folder, file_format, batch_number, count, first_file_number, files_per_folder,
+                   template_lines, start_serial, start_time, seed):
+    """
+    Generate and write one batch of IV files (runs in a worker process).
+
+    Each batch has its own generator derived from (seed, batch_number), so the output does
+    not depend on the number of workers. Everything the batch needs is passed in (spawned
+    workers do not see the parent's module settings or working folder).
+    """
+    rng = np.random.default_rng([seed, batch_number])
+    serials = format_serials(np.arange(start_serial, start_serial + count))
+
+    if file_format == 'ivc':
+        voltage_grid = np.linspace(0.0, VOC_DISTRIBUTION[0] + 4 * VOC_DISTRIBUTION[1], IVC_POINTS)
+        extension = '.ivc'
+    else:
+        voltage_grid = np.linspace(*SMARTSWEEP_RANGE, SMARTSWEEP_POINTS)
+        extension = '.txt'
+
+    voltage, current, params, results = generate_curves(rng, count, voltage_grid)
+    irradiance = rng.normal(*IRRADIANCE_DISTRIBUTION, count)
+    module_temp = rng.normal(*MODULE_TEMP_DISTRIBUTION, count)
+    intervals = rng.uniform(*MEASUREMENT_INTERVAL, count).cumsum()
+
+    if file_format != 'ivc':
+        # Uncorrected points as the tester measured them before correction to 1000 W/m2 / 25 degC
+        raw_voltage, raw_current = iv_analysis.correct_to_target(voltage, current, 1000.0, 25.0, irradiance, module_temp)
+
+    written = 0
+    for row in range(count):
+        file_number = first_file_number + row
+        folder = os.path.join(output_folder, f"{file_format}_{file_number // files_per_folder:04d}")
+        os.makedirs(folder, exist_ok=True)
+        file_path = os.path.join(folder, f"{serials[row]}{extension}")
+        measured_at = datetime.fromtimestamp(start_time + intervals[row])
+        try:
+            if file_format == 'ivc':
+                # i5 voltage stops shortly after Voc
+                keep = voltage[row] <= results['Voc'][row] + 0.02
+                write_ivc_file(file_path, serials[row], measured_at, results, row,
+                               voltage[row][keep], np.clip(current[row][keep], 0, None),
+                               module_temp[row], irradiance[row])
+            else:
+                point_irradiance = irradiance[row] + rng.normal(0, 0.2, len(voltage[row]))
+                write_smartsweep_file(file_path, template_lines, serials[row], measured_at, results, row,
+                                      voltage[row], current[row], raw_voltage[row], raw_current[row],
+                                      point_irradiance, module_temp[row],
+                                      str(uuid.UUID(bytes=rng.bytes(16), version=4)))
+            written += 1
+        except Exception as e:
+            print(f"Error writing {file_path}: {e}")
+    return written
+
+def generate_iv_files(output_folder, count, file_format='ivc', start_serial=0x7F3000, seed=None,
+                      start_time=None, max_workers=None):
+    """
+    Generate physically plausible IV files in parallel.
+
+    Args:
+        output_folder (str): Target folder (subfolders of files_per_folder files are created)
+        count (int): Number of files
+        file_format (str): 'ivc' for i5 .ivc files or 'txt' for i7 SmartSweep exports
+        start_serial (int): Serial number of the first module (A7F3000 by default)
+        seed (int): Seed for reproducible output (None for random)
+        start_time (datetime): Time before the first measurement (default: DEFAULT_START_TIME)
+        max_workers (int): Worker processes (default: CPU count)
+
+    Returns:
+        int: Number of files written
+    """
+    if file_format not in ('ivc', 'txt'):
+        print(f"Unknown IV file format: {file_format}")
+        return 0
+
+    seed = np.random.SeedSequence(seed).entropy if seed is None else seed
+    start_time = (start_time or DEFAULT_START_TIME).timestamp()
+    template_lines = load_smartsweep_template() if file_format == 'txt' else None
+    os.makedirs(output_folder, exist_ok=True)
+    print(f"Generating {count} .{file_format} files in {output_folder} (seed {seed})...")
+
+    written = 0
+    num_batches = (count + batch_size - 1) // batch_size
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for batch_number in range(num_batches):
+            first_file_number = batch_number * batch_size
+            batch_count = min(batch_size, count - first_file_number)
+            # A batch spans at most batch_size maximum intervals, so batches never overlap in time
+            batch_start_time = start_time + first_file_number * MEASUREMENT_INTERVAL[1]
+            futures.append(executor.submit(
+                generate_batch, output_folder, file_format, batch_number, batch_count, first_file_number,
+                files_per_folder, template_lines, start_serial + first_file_number, batch_start_time, seed
+            ))
+        for future in as_completed(futures):
+            try:
+                written += future.result()
+            except Exception as e:
+                print(f"Error generating batch: {e}")
+                continue
+            print(f"Progress: {written}/{count} files generated...")
+
+    print(f"Successfully generated {written} .{file_format} files.")
+    return written
+
+# Parameters
+output_folder = 'D:\\ivc_target'
+target_count = 10
+file_format = 'ivc'
+
+if __name__ == "__main__":
+    generate_iv_files(output_folder, target_count, file_format)
@@ -0,0 +1,91 @@
+# Expected image size (width, height), or None to accept any plausible size
+expected_dimensions = None
+
+# Smallest width/height accepted
+min_dimension = 16
+
+# Start-of-frame markers that carry the image dimensions (baseline, progressive, lossless, arithmetic)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Markers without a length field
+STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+SOI = b'\xff\xd8'
+EOI = b'\xff\xd9'
+SOS_MARKER = 0xDA
+
+class InvalidJPEGError(ValueError):
+    """A file failed JPEG validation. Carries the bytes already read, so they need not be read again."""
+
+    def __init__(self, reason, data=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.data = data
+
+def read_dimensions(data):
+    """
+    Walk the marker segments up to the first scan and read the frame size.
+
+    Returns:
+        tuple or None: (width, height), or None if no frame header comes before the scan
+    """
+    position = 2
+    length = len(data)
+    while position + 4 <= length:
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            position += 1
+            continue
+        if marker in STANDALONE_MARKERS:
+            position += 2
+            continue
+        segment_length = (data[position + 2] << 8) | data[position + 3]
+        if segment_length < 2:
+            return None
+        if marker in SOF_MARKERS:
+            if position + 9 > length:
+                return None
+            height = (data[position + 5] << 8) | data[position + 6]
+            width = (data[position + 7] << 8) | data[position + 8]
+            return width, height
+        if marker == SOS_MARKER:
+            return None
+        position += 2 + segment_length
+    return None
+
+def validate_jpeg(data):
+    """
+    Check a JPEG without decoding it: SOI at the start, EOI at the end (zero padding allowed)
+    and a frame header with plausible dimensions.
+
+    Returns:
+        tuple: (width, height)
+
+    Raises:
+        InvalidJPEGError: With the reason the data is not a complete JPEG
+    """
+    if not data:
+        raise InvalidJPEGError('empty file', data)
+    if not data.startswith(SOI):
+        raise InvalidJPEGError('missing SOI marker', data)
+    if not data.rstrip(b'\x00').endswith(EOI):
+        raise InvalidJPEGError('missing EOI marker (truncated)', data)
+
+    dimensions = read_dimensions(data)
+    if dimensions is None:
+        raise InvalidJPEGError('no frame header before the scan', data)
+    width, height = dimensions
+    if width < min_dimension or height < min_dimension:
+        raise InvalidJPEGError(f"implausible dimensions {width}x{height}", data)
+    if expected_dimensions and dimensions != tuple(expected_dimensions):
+        raise InvalidJPEGError(f"dimensions {width}x{height}, expected "
+                               f"{expected_dimensions[0]}x{expected_dimensions[1]}", data)
+    return dimensions
+
+def validate_jpeg_file(file_path):
+    """Validate a JPEG file on disk. Returns (width, height) or raises InvalidJPEGError."""
+    with open(file_path, 'rb') as f:
+        return validate_jpeg(f.read())
@@ -0,0 +1,491 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import iv_parser
+from fs_walker import walk_files
+
+# Module index database (one row per image and per flasher measurement, keyed by serial)
+index_db_path = "D:\\ELimagesnew\\module_index.db"
+
+# EL image names start with the 7 character module serial: A7BFB1A_JIN_Z_240601_043230.jpg
+SERIAL_PATTERN = re.compile(r'^([A-Z0-9]{7})(?=[_.])', re.IGNORECASE)
+
+# Capture timestamp embedded by the EL station: _240601_043230
+CAPTURE_TIME_PATTERN = re.compile(r'_(\d{6}_\d{6})(?=[_.])')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg')
+
+# Tables whose primary key changed, created on their own so older databases can be upgraded
+IMAGES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS images (
+        file_name TEXT NOT NULL,
+        serial TEXT NOT NULL,
+        path TEXT NOT NULL,
+        line TEXT,
+        stage TEXT NOT NULL,
+        quality TEXT,
+        station TEXT,
+        captured_at TEXT,
+        PRIMARY KEY (file_name, stage)
+    )
+"""
+
+IMAGE_HASHES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS image_hashes (
+        path TEXT PRIMARY KEY,
+        file_name TEXT NOT NULL,
+        serial TEXT,
+        dhash INTEGER NOT NULL,
+        phash INTEGER NOT NULL
+    )
+"""
+
+def parse_el_filename(file_name):
+    """
+    Parse an EL image file name into serial, station code and capture time.
+
+    Returns:
+        dict or None: {'serial', 'station', 'captured_at'} or None if no serial is found
+    """
+    match = SERIAL_PATTERN.match(file_name)
+    if not match:
+        return None
+
+    parts = os.path.splitext(file_name)[0].split('_')
+    station = parts[1] if len(parts) > 1 and not parts[1].isdigit() else None
+
+    captured_at = None
+    time_match = CAPTURE_TIME_PATTERN.search(file_name)
+    if time_match:
+        try:
+            captured_at = datetime.strptime(time_match.group(1), '%y%m%d_%H%M%S')
+        except ValueError:
+            pass
+
+    return {'serial': match.group(1).upper(), 'station': station, 'captured_at': captured_at}
+
+def get_el_stage(file_path):
+    """Determine PreEL/PostEL stage from the folder names of an image path."""
+    path = file_path.replace('\\', '/').upper()
+    if 'PREEL' in path:
+        return 'PreEL'
+    if 'POSTEL' in path:
+        return 'PostEL'
+    return 'EL'
+
+def get_el_quality(file_path):
+    """Determine NG/Normal quality from the folder names or the station quality letter."""
+    folder_parts = os.path.dirname(file_path).replace('\\', '/').split('/')
+    for part in folder_parts:
+        upper_part = part.upper()
+        if upper_part == 'NG' or upper_part.endswith('_BAD'):
+            return 'NG'
+        if upper_part == 'NORMAL':
+            return 'Normal'
+
+    # Station quality letter: Z = NG, A/B = Normal
+    parts = os.path.splitext(os.path.basename(file_path))[0].split('_')
+    if len(parts) > 2 and parts[2].upper() == 'Z':
+        return 'NG'
+    return 'Normal'
+
+class ModuleIndex:
+    """Module-centric index joining EL images and flasher results by serial."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or index_db_path
+        db_folder = os.path.dirname(self.db_path)
+        if db_folder:
+            os.makedirs(db_folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(IMAGES_TABLE_SQL)
+        self.upgrade_table('images', IMAGES_TABLE_SQL, ['file_name', 'stage'])
+        self.conn.execute(IMAGE_HASHES_TABLE_SQL)
+        self.upgrade_table('image_hashes', IMAGE_HASHES_TABLE_SQL, ['path'])
+        self.conn.executescript("""
+            CREATE INDEX IF NOT EXISTS idx_images_serial ON images(serial);
+            CREATE INDEX IF NOT EXISTS idx_images_path ON images(path);
+
+            CREATE TABLE IF NOT EXISTS flasher_results (
+                source TEXT PRIMARY KEY,
+                serial TEXT NOT NULL,
+                sn TEXT,
+                measured_at TEXT,
+                Pmax REAL, Voc REAL, Isc REAL, Vpm REAL, Ipm REAL, FF REAL,
+                Rs REAL, Rsh REAL, TMod REAL, CTMod REAL, Irr REAL, CIrr REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_flasher_serial ON flasher_results(serial);
+
+            CREATE TABLE IF NOT EXISTS el_pairs (
+                post_file_name TEXT PRIMARY KEY,
+                serial TEXT NOT NULL,
+                pre_path TEXT,
+                post_path TEXT,
+                shift_y INTEGER,
+                shift_x INTEGER,
+                score REAL,
+                new_defect_cells INTEGER,
+                flagged INTEGER,
+                diff_path TEXT,
+                computed_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_el_pairs_serial ON el_pairs(serial);
+            CREATE INDEX IF NOT EXISTS idx_el_pairs_pre_path ON el_pairs(pre_path);
+            CREATE INDEX IF NOT EXISTS idx_el_pairs_post_path ON el_pairs(post_path);
+
+            CREATE TABLE IF NOT EXISTS serial_access (
+                serial TEXT PRIMARY KEY,
+                last_access TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS tier_redirects (
+                old_path TEXT PRIMARY KEY,
+                new_path TEXT NOT NULL,
+                tier TEXT,
+                moved_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tier_redirects_new ON tier_redirects(new_path);
+
+            CREATE TABLE IF NOT EXISTS indexed_sources (
+                path TEXT PRIMARY KEY,
+                mtime REAL
+            );
+
+            CREATE TABLE IF NOT EXISTS content_hashes (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER,
+                mtime REAL
+            );
+        """)
+        self.conn.commit()
+
+    def upgrade_table(self, table, create_sql, key):
+        """Recreate a table made by an older version with another primary key, keeping its rows."""
+        columns = list(self.conn.execute(f"PRAGMA table_info({table})"))
+        if [row['name'] for row in sorted(columns, key=lambda row: row['pk']) if row['pk']] == key:
+            return
+        self.conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        self.conn.execute(create_sql)
+        names = ', '.join(row['name'] for row in columns)
+        self.conn.execute(f"INSERT OR REPLACE INTO {table} ({names}) SELECT {names} FROM {table}_old")
+        self.conn.execute(f"DROP TABLE {table}_old")
+        self.conn.commit()
+
+    def close(self):
+        """Close the index database."""
+        with self.lock:
+            self.conn.close()
+
+    def is_indexed(self, path, mtime):
+        """Check whether a source file was already indexed at this modification time."""
+        with self.lock:
+            row = self.conn.execute("SELECT mtime FROM indexed_sources WHERE path = ?", (path,)).fetchone()
+        return row is not None and row['mtime'] == mtime
+
+    def mark_indexed(self, path, mtime):
+        """Record that a source file has been indexed."""
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO indexed_sources (path, mtime) VALUES (?, ?)", (path, mtime))
+            self.conn.commit()
+
+    def add_content_hash(self, path, content_hash, size, mtime):
+        """Record the MD5 of a stored file, so it can be found again without reading the file."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO content_hashes (path, content_hash, size, mtime) VALUES (?, ?, ?, ?)",
+                (path, content_hash, size, mtime)
+            )
+            self.conn.commit()
+
+    def get_content_hash(self, path, size, mtime):
+        """MD5 recorded for a file, or None if unknown or the file changed since (size/mtime differ)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash, size, mtime FROM content_hashes WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None or row['size'] != size or row['mtime'] != mtime:
+            return None
+        return row['content_hash']
+
+    def add_image(self, file_path, line=None, original_filename=None):
+        """
+        Add or update an EL image in the index.
+
+        The original station file name and the stage are the key, so a file that is copied
+        to the central store and later moved to the archive keeps a single, updated entry,
+        while copies of one name in different stage folders are kept apart.
+        """
+        file_name = original_filename or os.path.basename(file_path)
+        info = parse_el_filename(file_name)
+        if info is None:
+            return False
+
+        captured_at = info['captured_at'].isoformat(sep=' ') if info['captured_at'] else None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images "
+                "(file_name, serial, path, line, stage, quality, station, captured_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_name, info['serial'], file_path, line, get_el_stage(file_path),
+                 get_el_quality(file_path), info['station'], captured_at)
+            )
+            self.conn.commit()
+        return True
+
+    def add_image_hashes(self, rows):
+        """
+        Add or update perceptual hashes: (path, dhash, phash) tuples, hashes as signed 64-bit
+        integers (see image_hashes.to_signed). The path is the key, so images of the same
+        name in different folders (stages, re-shots) each keep their own row.
+        """
+        values = []
+        for path, dhash, phash in rows:
+            file_name = os.path.basename(path)
+            info = parse_el_filename(file_name)
+            values.append((path, file_name, info['serial'] if info else None, dhash, phash))
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO image_hashes (path, file_name, serial, dhash, phash) VALUES (?, ?, ?, ?, ?)",
+                values
+            )
+            self.conn.commit()
+        return len(values)
+
+    def get_image_hashes(self):
+        """All perceptual hash rows, in insertion order."""
+        with self.lock:
+            return [dict(row) for row in self.conn.execute("SELECT * FROM image_hashes ORDER BY rowid")]
+
+    def add_el_pair(self, row):
+        """Add or update a PreEL/PostEL comparison (see el_pairing.pair_images)."""
+        columns = list(row)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO el_pairs ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [row[column] for column in columns]
+            )
+            self.conn.commit()
+
+    def record_access(self, serial):
+        """Note that a module was looked up (storage tiering keeps recently used modules warm)."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO serial_access (serial, last_access, hits) VALUES (?, ?, 1) "
+                "ON CONFLICT(serial) DO UPDATE SET last_access = excluded.last_access, hits = hits + 1",
+                (serial, datetime.now().isoformat(sep=' ', timespec='seconds'))
+            )
+            self.conn.commit()
+
+    def get_recent_serials(self, since):
+        """Serials looked up at or after a datetime."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT serial FROM serial_access WHERE last_access >= ?",
+                (since.isoformat(sep=' ', timespec='seconds'),)
+            ).fetchall()
+        return {row['serial'] for row in rows}
+
+    def get_last_access(self):
+        """Serial -> time of the last lookup (ISO text)."""
+        with self.lock:
+            return {row['serial']: row['last_access']
+                    for row in self.conn.execute("SELECT serial, last_access FROM serial_access")}
+
+    def add_redirect(self, old_path, new_path, tier):
+        """
+        Record that a file moved between storage tiers and point every catalog entry at the
+        new location. Earlier redirects to old_path are carried forward, so they never chain.
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tier_redirects (old_path, new_path, tier, moved_at) VALUES (?, ?, ?, ?)",
+                (old_path, new_path, tier, datetime.now().isoformat(sep=' ', timespec='seconds'))
+            )
+            self.conn.execute("UPDATE tier_redirects SET new_path = ?, tier = ? WHERE new_path = ?",
+                              (new_path, tier, old_path))
+            # A file moved back to where it once was needs no redirect
+            self.conn.execute("DELETE FROM tier_redirects WHERE old_path = new_path")
+            self.update_paths(old_path, new_path)
+            self.conn.commit()
+
+    def move_path(self, old_path, new_path):
+        """Point every catalog entry of a moved file (e.g. archived) at its new location."""
+        with self.lock:
+            self.update_paths(old_path, new_path)
+            self.conn.commit()
+
+    def update_paths(self, old_path, new_path):
+        """Replace a file's path in the image, hash and pair tables (lock held)."""
+        self.conn.execute("UPDATE images SET path = ? WHERE path = ?", (new_path, old_path))
+        self.conn.execute("UPDATE OR REPLACE image_hashes SET path = ? WHERE path = ?", (new_path, old_path))
+        self.conn.execute("UPDATE OR REPLACE content_hashes SET path = ? WHERE path = ?", (new_path, old_path))
+        self.conn.execute("UPDATE el_pairs SET pre_path = ? WHERE pre_path = ?", (new_path, old_path))
+        self.conn.execute("UPDATE el_pairs SET post_path = ? WHERE post_path = ?", (new_path, old_path))
+
+    def resolve_path(self, path):
+        """Current location of a file that may have moved to another storage tier."""
+        with self.lock:
+            row = self.conn.execute("SELECT new_path FROM tier_redirects WHERE old_path = ?", (path,)).fetchone()
+        return row['new_path'] if row else path
+
+    def get_serials_with_stages(self, *stages):
+        """Serials that have an image at every one of the given stages."""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT serial FROM images WHERE stage IN ({', '.join('?' for _ in stages)}) "
+                "GROUP BY serial HAVING COUNT(DISTINCT stage) = ?",
+                (*stages, len(stages))
+            ).fetchall()
+        return [row['serial'] for row in rows]
+
+    def add_flasher_results(self, rows):
+        """Add flasher result rows (dicts with 'source', 'serial' and result fields)."""
+        columns = ['source', 'serial', 'sn', 'measured_at'] + iv_parser.RESULT_NAMES
+        placeholders = ', '.join('?' for _ in columns)
+        values = [tuple(row.get(column) for column in columns) for row in rows if row.get('serial')]
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO flasher_results ({', '.join(columns)}) VALUES ({placeholders})",
+                values
+            )
+            self.conn.commit()
+        return len(values)
+
+    def add_iv_file(self, file_path):
+        """Add the tester-reported results of an .ivc or SmartSweep .txt file."""
+        parsed = iv_parser.parse_iv_file(file_path)
+        serial = iv_parser.get_serial(parsed)
+        if not serial:
+            print(f"No serial found in IV file: {file_path}")
+            return 0
+        row = iv_parser.get_flasher_results(parsed)
+        row['source'] = file_path
+        row['serial'] = serial
+        return self.add_flasher_results([row])
+
+    def add_csv_file(self, csv_path):
+        """Add all measurements from a flasher CSV export."""
+        df = iv_parser.read_flasher_csv(csv_path)
+        df = df.astype(object).where(df.notna(), None)
+        rows = []
+        for row_number, row in enumerate(df.to_dict('records')):
+            row['source'] = f"{csv_path}#{row_number}"
+            rows.append(row)
+        return self.add_flasher_results(rows)
+
+    def sync_folder(self, root_folder, line=None, throttle=None):
+        """
+        Index new or changed files under a folder.
+
+        Images, IV files and CSV exports are recognised by extension. Files already
+        indexed at the same modification time are skipped. A shift_schedule.JobThrottle
+        paces the indexing outside off-peak windows.
+
+        Returns:
+            int: Number of files indexed
+        """
+        if not os.path.exists(root_folder):
+            print(f"Folder does not exist: {root_folder}")
+            return 0
+
+        indexed_count = 0
+        for record in walk_files(root_folder, IMAGE_EXTENSIONS + ('.ivc', '.txt', '.csv')):
+            file_path = record.path
+            lower_name = record.name.lower()
+            try:
+                # Modification time from the directory listing
+                if self.is_indexed(file_path, record.mtime):
+                    continue
+                if throttle is not None:
+                    throttle.wait()
+                if lower_name.endswith(IMAGE_EXTENSIONS):
+                    self.add_image(file_path, line)
+                elif lower_name.endswith('.csv'):
+                    self.add_csv_file(file_path)
+                else:
+                    self.add_iv_file(file_path)
+                self.mark_indexed(file_path, record.mtime)
+                indexed_count += 1
+            except Exception as e:
+                print(f"Error indexing {file_path}: {e}")
+
+        print(f"Indexed {indexed_count} new files from {root_folder}")
+        return indexed_count
+
+    def lookup(self, serial):
+        """
+        Get everything known about a module.
+
+        Returns:
+            dict: {'serial', 'quality', 'images': {stage: [image rows]}, 'flasher_results': [rows],
+                   'el_pairs': [PreEL/PostEL comparison rows]}
+        """
+        serial = serial.strip().upper()
+        self.record_access(serial)
+        with self.lock:
+            image_rows = self.conn.execute(
+                "SELECT * FROM images WHERE serial = ? ORDER BY captured_at", (serial,)
+            ).fetchall()
+            flasher_rows = self.conn.execute(
+                "SELECT * FROM flasher_results WHERE serial = ? ORDER BY measured_at", (serial,)
+            ).fetchall()
+            pair_rows = self.conn.execute(
+                "SELECT * FROM el_pairs WHERE serial = ? ORDER BY computed_at", (serial,)
+            ).fetchall()
+
+        images = {}
+        for row in image_rows:
+            images.setdefault(row['stage'], []).append(dict(row))
+
+        # Latest capture decides the current quality of the module
+        quality = image_rows[-1]['quality'] if image_rows else None
+
+        return {
+            'serial': serial,
+            'quality': quality,
+            'images': images,
+            'flasher_results': [dict(row) for row in flasher_rows],
+            'el_pairs': [dict(row) for row in pair_rows],
+        }
+
+    def find_image(self, serial, stage):
+        """Get the latest indexed image of a module at a given stage, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM images WHERE serial = ? AND stage = ? ORDER BY captured_at DESC LIMIT 1",
+                (serial.strip().upper(), stage)
+            ).fetchone()
+        return dict(row) if row else None
+
+def print_module(module):
+    """Print an index lookup result."""
+    print(f"Module {module['serial']} - Quality: {module['quality'] or 'unknown'}")
+    for stage, images in module['images'].items():
+        for image in images:
+            print(f"  [{stage}] {image['quality']}: {image['path']} (captured {image['captured_at']})")
+    for result in module['flasher_results']:
+        print(f"  [Flasher] {result['measured_at']}: Pmax={result['Pmax']} Voc={result['Voc']} "
+              f"Isc={result['Isc']} FF={result['FF']}")
+    for pair in module['el_pairs']:
+        print(f"  [Pre/PostEL] {pair['computed_at']}: score={pair['score']:.4f} "
+              f"new defect cells={pair['new_defect_cells']}{' FLAGGED' if pair['flagged'] else ''}")
+
+# Parameters
+source_folders = ['source_images', 'images', 'source ivc', 'source_csv']
+serial_to_show = 'A7BFB1A'
+
+if __name__ == "__main__":
+    index = ModuleIndex()
+    for folder in source_folders:
+        index.sync_folder(folder)
+    print_module(index.lookup(serial_to_show))
+    index.close()
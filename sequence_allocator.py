@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+# Sequence numbers handed out per counter file access
+default_block_size = 1000
+
+def lock_file(f):
+    """Take an exclusive lock on an open file, waiting until it is free."""
+    if os.name == 'nt':
+        import msvcrt
+        while True:
+            try:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after 10 seconds; keep waiting
+                time.sleep(0.1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+def unlock_file(f):
+    """Release a lock taken with lock_file."""
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class SequenceAllocator:
+    """
+    Persistent sequence counter shared by concurrent generators.
+
+    The counter file holds the next free number. Each generator reserves a whole block
+    under a file lock and then hands out numbers from memory, so no file-existence
+    probes or folder walks are needed to find a free name.
+    """
+
+    def __init__(self, counter_path, initial_number=None, block_size=None):
+        """
+        Args:
+            counter_path (str): Counter file (created on first use)
+            initial_number (int or callable): First number when the counter file does not exist yet;
+                a callable is only evaluated then (e.g. a one-time scan of existing files)
+            block_size (int): Numbers reserved per counter file access
+        """
+        self.counter_path = counter_path
+        self.initial_number = initial_number
+        self.block_size = block_size or default_block_size
+        self.lock = threading.Lock()
+        self.next_number = None
+        self.block_end = None
+
+    def reserve(self, count):
+        """
+        Reserve 'count' consecutive numbers directly from the counter file.
+
+        Returns:
+            int: The first reserved number
+        """
+        counter_folder = os.path.dirname(self.counter_path)
+        if counter_folder:
+            os.makedirs(counter_folder, exist_ok=True)
+
+        # 'a+' creates the file without truncating it
+        with open(self.counter_path, 'a+') as f:
+            lock_file(f)
+            try:
+                f.seek(0)
+                content = f.read().strip()
+                if content:
+                    first_number = int(content)
+                else:
+                    initial = self.initial_number() if callable(self.initial_number) else self.initial_number
+                    first_number = initial or 0
+                f.seek(0)
+                f.truncate()
+                f.write(str(first_number + count))
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                unlock_file(f)
+        return first_number
+
+    def next(self):
+        """Get the next number, reserving a new block when the current one is used up."""
+        with self.lock:
+            if self.next_number is None or self.next_number >= self.block_end:
+                self.next_number = self.reserve(self.block_size)
+                self.block_end = self.next_number + self.block_size
+            number = self.next_number
+            self.next_number += 1
+            return number
+
+    def take(self, count):
+        """
+        Get 'count' consecutive numbers in a single reservation.
+
+        Returns:
+            range: The reserved numbers
+        """
+        with self.lock:
+            first_number = self.reserve(count)
+        return range(first_number, first_number + count)
+
+    def peek(self):
+        """Get the next number the counter file would hand out, without reserving it."""
+        if not os.path.exists(self.counter_path):
+            return None
+        with open(self.counter_path, 'r') as f:
+            content = f.read().strip()
+        return int(content) if content else None
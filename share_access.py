@@ -0,0 +1,124 @@
+import os
+import subprocess
+
+# Share access backend: 'netuse' (Windows UNC paths), 'cifs' (Linux mounts), 'local' (plain folders)
+# or 'auto' for netuse on Windows and cifs elsewhere
+share_backend = 'auto'
+
+# cifs: shares are mounted at <cifs_mount_root>/<share name>/<line alias>
+cifs_mount_root = '/mnt/elshares'
+cifs_mount_options = 'vers=3.0,ro'
+
+# local: stand-in share folders at <local_share_root>/<line alias>, unless a line sets 'share_path'
+local_share_root = 'shares'
+
+class NetUseBackend:
+    """Windows shares, accessed through UNC paths after NetUseAdd (pywin32)."""
+    name = 'netuse'
+    # SMB change notifications reach ReadDirectoryChangesW
+    needs_polling = False
+
+    def __init__(self, share_name):
+        self.share_name = share_name
+
+    def get_path(self, line):
+        return f"\\\\{line['address']}\\{self.share_name}"
+
+    def connect(self, line):
+        import win32net
+        win32net.NetUseAdd(None, 2, {
+            'remote': self.get_path(line),
+            'password': line['password'],
+            'username': line['username'],
+            'asg_type': 0,
+            'local': '',
+        })
+
+    def disconnect(self, line):
+        import win32net
+        win32net.NetUseDel(self.get_path(line), 0)
+
+class CifsMountBackend:
+    """Windows shares mounted on Linux with mount.cifs (needs cifs-utils and mount permission)."""
+    name = 'cifs'
+    # inotify only sees changes made through this mount, not files written by the line PCs
+    needs_polling = True
+
+    def __init__(self, share_name, mount_root=None, options=None):
+        self.share_name = share_name
+        self.mount_root = mount_root or cifs_mount_root
+        self.options = options or cifs_mount_options
+        self.mounted = set()
+
+    def get_path(self, line):
+        return line.get('mount_point') or os.path.join(self.mount_root, self.share_name, line['alias'])
+
+    def connect(self, line):
+        mount_point = self.get_path(line)
+        if os.path.ismount(mount_point):
+            return
+        os.makedirs(mount_point, exist_ok=True)
+        # mount.cifs reads the password from PASSWD, keeping it off the command line
+        result = subprocess.run(
+            ['mount', '-t', 'cifs', f"//{line['address']}/{self.share_name}", mount_point,
+             '-o', f"username={line['username']},{self.options}"],
+            env={**os.environ, 'PASSWD': line['password']},
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise OSError(f"mount failed for {mount_point}: {result.stderr.strip()}")
+        self.mounted.add(mount_point)
+
+    def disconnect(self, line):
+        mount_point = self.get_path(line)
+        # Only unmount what this process mounted
+        if mount_point not in self.mounted:
+            return
+        result = subprocess.run(['umount', mount_point], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise OSError(f"umount failed for {mount_point}: {result.stderr.strip()}")
+        self.mounted.discard(mount_point)
+
+class LocalBackend:
+    """Local folders standing in for the shares (simulator, benchmarks, tests)."""
+    name = 'local'
+    needs_polling = False
+
+    def __init__(self, share_name, share_root=None):
+        self.share_name = share_name
+        self.share_root = share_root or local_share_root
+
+    def get_path(self, line):
+        return line.get('share_path') or os.path.join(self.share_root, line['alias'])
+
+    def connect(self, line):
+        if not os.path.isdir(self.get_path(line)):
+            raise OSError(f"Local share folder not found: {self.get_path(line)}")
+
+    def disconnect(self, line):
+        pass
+
+BACKENDS = {
+    'netuse': NetUseBackend,
+    'cifs': CifsMountBackend,
+    'local': LocalBackend,
+}
+
+def get_share_backend(share_name, name=None):
+    """
+    Create the share access backend for a shared folder name.
+
+    Args:
+        share_name (str): Shared folder name on the production line PCs
+        name (str): Backend name (default: share_backend); 'auto' picks the platform default
+
+    Returns:
+        Backend with get_path(line), connect(line), disconnect(line) and needs_polling
+        (True when native file system events do not report remote changes)
+    """
+    name = name or share_backend
+    if name == 'auto':
+        name = 'netuse' if os.name == 'nt' else 'cifs'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown share backend: {name}")
+    return BACKENDS[name](share_name)
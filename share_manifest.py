@@ -0,0 +1,278 @@
+import os
+import csv
+import time
+import hashlib
+import threading
+
+from fs_walker import walk_files, list_dir, skip_dir_names, FileRecord
+
+# Manifest file in the share root: one row per station image, paths relative to the root
+# with '/' separators
+MANIFEST_NAME = 'el_manifest.csv'
+MANIFEST_COLUMNS = ['path', 'size', 'mtime', 'md5']
+
+# Folder list written with each manifest: every folder under the root (including empty ones),
+# and whether it held files that were still being written at the snapshot
+MANIFEST_DIRS_NAME = 'el_manifest_dirs.csv'
+MANIFEST_DIRS_COLUMNS = ['path', 'unsettled']
+
+# Files listed in the manifest
+manifest_extensions = ('.jpg', '.jpeg')
+
+# Agent: seconds between manifest rewrites (the manifest is rewritten even when nothing
+# changed, so its modification time tells the collector the agent is alive)
+agent_interval_seconds = 30
+
+# Agent: files modified more recently than this are still being written and wait for the
+# next rewrite
+agent_settle_seconds = 5
+
+# Collector: a manifest older than this is stale and the share is walked instead
+manifest_max_age_seconds = 120
+
+# The agent sets the modification time of the manifest and its folder list to its snapshot time
+# (files changed after it are not listed). The collector relists the folders modified since
+# then and the folders that held unsettled files, and walks folders the agent did not see, so
+# files written between the snapshot and the start of the watcher are not missed.
+
+def get_manifest_path(share_root):
+    return os.path.join(share_root, MANIFEST_NAME)
+
+def get_manifest_dirs_path(share_root):
+    return os.path.join(share_root, MANIFEST_DIRS_NAME)
+
+def get_file_hash(file_path):
+    """Get MD5 hash of a file."""
+    hasher = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def read_manifest(share_root):
+    """
+    Read the manifest of a share.
+
+    Returns:
+        dict or None: relative path -> {'path', 'size', 'mtime', 'md5'}, or None if there
+                      is no readable manifest
+    """
+    try:
+        with open(get_manifest_path(share_root), 'r', newline='') as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            row['size'] = int(row['size'])
+            row['mtime'] = float(row['mtime'])
+    except (OSError, ValueError, KeyError, csv.Error) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Error reading manifest of {share_root}: {e}")
+        return None
+    return {row['path']: row for row in rows}
+
+def read_manifest_dirs(share_root):
+    """
+    Read the folder list written with the manifest of a share.
+
+    Returns:
+        dict or None: relative folder ('/' separators, '' for the root) -> True if it held
+                      unsettled files, or None if there is no readable folder list
+    """
+    try:
+        with open(get_manifest_dirs_path(share_root), 'r', newline='') as f:
+            return {row['path']: row['unsettled'] == '1' for row in csv.DictReader(f)}
+    except (OSError, KeyError, csv.Error) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Error reading manifest folder list of {share_root}: {e}")
+        return None
+
+def build_manifest(share_root, previous=None, settled_before=None, folders=None):
+    """
+    List the settled images under a share root with size, mtime and MD5.
+
+    Files unchanged since the previous manifest (same size and mtime) keep their hash, so
+    only new and changed files are read.
+
+    Args:
+        settled_before (float): Snapshot time; files modified later are left out
+                                (default: agent_settle_seconds ago)
+        folders (dict): If given, filled with relative folder -> True if it holds files
+                        that were left out (see read_manifest_dirs)
+
+    Returns:
+        list: Manifest rows, sorted by path
+    """
+    previous = previous or {}
+    settled_before = time.time() - agent_settle_seconds if settled_before is None else settled_before
+    rows = []
+    unsettled_dirs = set()
+    walked_dirs = []
+    for record in walk_files(share_root, manifest_extensions, folders=walked_dirs):
+        if record.mtime > settled_before:
+            unsettled_dirs.add(record.rel_dir)
+            continue
+        rel_path = '/'.join(filter(None, record.rel_dir.split(os.sep) + [record.name]))
+        known = previous.get(rel_path)
+        if known is not None and known['size'] == record.size and known['mtime'] == record.mtime:
+            md5 = known['md5']
+        else:
+            try:
+                md5 = get_file_hash(record.path)
+            except OSError:
+                # Removed or locked by the station; picked up next time
+                unsettled_dirs.add(record.rel_dir)
+                continue
+        rows.append({'path': rel_path, 'size': record.size, 'mtime': record.mtime, 'md5': md5})
+    if folders is not None:
+        for rel_dir in walked_dirs:
+            folders['/'.join(filter(None, rel_dir.split(os.sep)))] = rel_dir in unsettled_dirs
+    return sorted(rows, key=lambda row: row['path'])
+
+def write_manifest(share_root, rows, snapshot_time=None, folders=None):
+    """
+    Replace the manifest atomically (readers never see a half-written file), dated at the
+    snapshot time if given. The folder list, if given, is written first with the same date,
+    so a reader can tell whether the two belong to the same snapshot.
+    """
+    if folders is not None:
+        dirs_path = get_manifest_dirs_path(share_root)
+        temp_path = dirs_path + '.tmp'
+        with open(temp_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=MANIFEST_DIRS_COLUMNS)
+            writer.writeheader()
+            writer.writerows({'path': path, 'unsettled': int(unsettled)} for path, unsettled in sorted(folders.items()))
+        if snapshot_time is not None:
+            os.utime(temp_path, (snapshot_time, snapshot_time))
+        os.replace(temp_path, dirs_path)
+
+    manifest_path = get_manifest_path(share_root)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        writer.writerows({**row, 'mtime': repr(row['mtime'])} for row in rows)
+    if snapshot_time is not None:
+        os.utime(temp_path, (snapshot_time, snapshot_time))
+    os.replace(temp_path, manifest_path)
+
+def update_manifest(share_root):
+    """Rebuild and rewrite the manifest of a share. Returns the number of files listed."""
+    snapshot_time = time.time() - agent_settle_seconds
+    folders = {}
+    rows = build_manifest(share_root, read_manifest(share_root), snapshot_time, folders)
+    write_manifest(share_root, rows, snapshot_time, folders)
+    return len(rows)
+
+class ManifestAgent(threading.Thread):
+    """
+    Keeps the manifest of a share root up to date, every agent_interval_seconds.
+
+    Runs on the station PC next to the images (see __main__), or in-process as a stand-in
+    for a station in tests.
+    """
+
+    def __init__(self, share_root, interval=None):
+        super().__init__(daemon=True)
+        self.share_root = share_root
+        self.interval = interval or agent_interval_seconds
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                update_manifest(self.share_root)
+            except Exception as e:
+                print(f"Error updating manifest of {self.share_root}: {e}")
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+def list_changed_files(share_root, manifest, snapshot_time, extensions, folders):
+    """
+    Files missing from a manifest: the folders modified since the snapshot and the folders
+    that held unsettled files are relisted, and folders the agent did not see are walked.
+
+    Args:
+        folders (dict): Folder list of the same snapshot (see read_manifest_dirs)
+
+    Returns:
+        list: FileRecord per file not in the manifest
+    """
+    known_dirs = {os.path.join(*rel_dir.split('/')) if rel_dir else '': unsettled
+                  for rel_dir, unsettled in folders.items()}
+
+    records = []
+    for rel_dir, unsettled in known_dirs.items():
+        path = os.path.join(share_root, rel_dir)
+        try:
+            if not unsettled and os.stat(path).st_mtime < snapshot_time:
+                continue
+        except OSError:
+            continue
+        files, subdirs = list_dir(path, rel_dir, extensions, skip_dir_names, None, True)
+        records.extend(record for record in files
+                       if '/'.join(filter(None, record.rel_dir.split(os.sep) + [record.name])) not in manifest)
+        for subdir_path, subdir in subdirs:
+            if subdir not in known_dirs:
+                records.extend(record._replace(rel_dir=os.path.join(subdir, record.rel_dir).rstrip(os.sep))
+                               for record in walk_files(subdir_path, extensions))
+    return records
+
+def list_share_files(share_root, extensions=None, max_age=None):
+    """
+    List the files on a share from its manifest, walking the share only when the manifest
+    is missing, unreadable or stale, or its folder list does not match. Folders changed
+    since the manifest's snapshot are relisted for the files written after it.
+
+    Args:
+        share_root (str): Share root (where the agent writes the manifest)
+        extensions (iterable): Lowercase extensions to keep; None for all files listed
+        max_age (float): Stale after this many seconds (default manifest_max_age_seconds)
+
+    Returns:
+        list: FileRecord per file
+    """
+    max_age = manifest_max_age_seconds if max_age is None else max_age
+    try:
+        snapshot_time = os.path.getmtime(get_manifest_path(share_root))
+        age = time.time() - snapshot_time
+    except OSError:
+        snapshot_time, age = None, None
+    manifest = read_manifest(share_root) if age is not None and age <= max_age else None
+    manifest_dirs = read_manifest_dirs(share_root) if manifest is not None else None
+    try:
+        if manifest_dirs is not None and os.path.getmtime(get_manifest_dirs_path(share_root)) != snapshot_time:
+            # Written for another snapshot (the agent is between the two files)
+            manifest_dirs = None
+    except OSError:
+        manifest_dirs = None
+    if manifest is None or manifest_dirs is None:
+        if age is not None and age > max_age:
+            print(f"Manifest of {share_root} is stale ({age:.0f}s old); walking the share")
+        elif manifest is not None:
+            print(f"Manifest folder list of {share_root} is missing or from another snapshot; walking the share")
+        return list(walk_files(share_root, extensions))
+
+    extensions = None if extensions is None else tuple(extension.lower() for extension in extensions)
+    records = []
+    for rel_path, row in manifest.items():
+        *folders, name = rel_path.split('/')
+        if extensions is not None and not name.lower().endswith(extensions):
+            continue
+        rel_dir = os.path.join(*folders) if folders else ''
+        records.append(FileRecord(os.path.join(share_root, rel_dir, name), name, rel_dir, row['size'], row['mtime']))
+    records.extend(list_changed_files(share_root, manifest, snapshot_time, extensions, manifest_dirs))
+    return records
+
+# Parameters
+share_root = "D:\\ELimagesnew"
+
+if __name__ == "__main__":
+    agent = ManifestAgent(share_root)
+    agent.start()
+    print(f"Writing manifest of {share_root} every {agent.interval}s. Press Ctrl+C to stop...")
+    try:
+        while agent.is_alive():
+            agent.join(1)
+    except KeyboardInterrupt:
+        agent.stop()
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+# Shift start times (wall clock, HH:MM); each start closes the previous shift
+shift_starts = ['06:00', '14:00', '22:00']
+
+# Wall-clock windows (start, end) in which heavy jobs run unthrottled (shift changeovers,
+# when the stations are idle); a window may wrap past midnight
+off_peak_windows = [('05:45', '06:30'), ('13:45', '14:30'), ('21:45', '22:30')]
+
+# Outside off-peak windows heavy jobs pause after every batch, and wait while live ingest is busy
+peak_batch_size = 50
+peak_pause_seconds = 1.0
+max_busy_wait = 10.0
+
+SHIFT_NAMES = 'ABCDEFGH'
+
+def parse_clock(text):
+    """Parse 'HH:MM' into minutes after midnight."""
+    hours, minutes = text.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def get_shift_boundaries(start, end, starts=None):
+    """
+    List the shift boundaries after start, up to and including end.
+
+    Returns:
+        list: datetime of each boundary, oldest first
+    """
+    starts = sorted(parse_clock(s) for s in (starts or shift_starts))
+    boundaries = []
+    day = datetime(start.year, start.month, start.day)
+    while day <= end:
+        for minutes in starts:
+            boundary = day + timedelta(minutes=minutes)
+            if start < boundary <= end:
+                boundaries.append(boundary)
+        day += timedelta(days=1)
+    return boundaries
+
+def previous_shift_boundary(now=None, starts=None):
+    """The latest shift boundary at or before now."""
+    now = now or datetime.now()
+    return get_shift_boundaries(now - timedelta(days=1), now, starts)[-1]
+
+def next_shift_boundary(now=None, starts=None):
+    """The first shift boundary after now."""
+    now = now or datetime.now()
+    return get_shift_boundaries(now, now + timedelta(days=1), starts)[0]
+
+def get_shift_name(moment=None, starts=None):
+    """
+    Name of the shift running at a moment: start date and letter, e.g. '2024-06-01 C'.
+
+    A night shift keeps the date it started on.
+    """
+    starts = sorted(starts or shift_starts, key=parse_clock)
+    boundary = previous_shift_boundary(moment, starts)
+    letter = SHIFT_NAMES[[parse_clock(s) for s in starts].index(boundary.hour * 60 + boundary.minute)]
+    return f"{boundary.strftime('%Y-%m-%d')} {letter}"
+
+def is_off_peak(now=None, windows=None):
+    """Check whether a moment falls in one of the off-peak windows."""
+    now = now or datetime.now()
+    minutes = now.hour * 60 + now.minute
+    for start, end in (off_peak_windows if windows is None else windows):
+        start, end = parse_clock(start), parse_clock(end)
+        if start <= end:
+            if start <= minutes < end:
+                return True
+        elif minutes >= start or minutes < end:
+            return True
+    return False
+
+class ShiftScheduler:
+    """
+    Wall-clock shift calendar whose progress survives restarts.
+
+    The last handled boundary is kept in a state file, so boundaries that passed while the
+    collector was down are reported as due on the next start.
+    """
+
+    def __init__(self, state_path, starts=None):
+        self.state_path = state_path
+        self.starts = starts or shift_starts
+        self.last_boundary = self.load_state()
+        if self.last_boundary is None:
+            # First start: nothing is owed for shifts before the collector ran
+            self.mark_done(previous_shift_boundary(starts=self.starts))
+
+    def load_state(self):
+        """Read the last handled boundary from the state file, or None."""
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, 'r') as f:
+                return datetime.fromisoformat(json.load(f)['last_boundary'])
+        except Exception as e:
+            print(f"Ignoring unreadable shift state {self.state_path}: {e}")
+            return None
+
+    def mark_done(self, boundary):
+        """Record a boundary (and all before it) as handled."""
+        self.last_boundary = boundary
+        state_folder = os.path.dirname(self.state_path)
+        if state_folder:
+            os.makedirs(state_folder, exist_ok=True)
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'last_boundary': boundary.isoformat()}, f)
+        os.replace(temp_path, self.state_path)
+
+    def due_boundaries(self, now=None):
+        """List the boundaries that passed since the last handled one, oldest first."""
+        return get_shift_boundaries(self.last_boundary, now or datetime.now(), self.starts)
+
+    def next_boundary(self, now=None):
+        """The next boundary still to come."""
+        return next_shift_boundary(now, self.starts)
+
+class JobThrottle:
+    """
+    Paces a heavy batch job (archival, indexing) so it does not compete with live ingest.
+
+    Call wait() once per item. In off-peak windows it returns immediately; otherwise it pauses
+    after every peak_batch_size items and waits (up to max_busy_wait) while busy() is true.
+    """
+
+    def __init__(self, busy=None, batch_size=None, pause_seconds=None):
+        self.busy = busy
+        self.batch_size = batch_size or peak_batch_size
+        self.pause_seconds = peak_pause_seconds if pause_seconds is None else pause_seconds
+        self.count = 0
+        self.paused_seconds = 0.0
+
+    def wait(self):
+        self.count += 1
+        if is_off_peak():
+            return
+        start = time.time()
+        if self.count % self.batch_size == 0:
+            time.sleep(self.pause_seconds)
+        if self.busy is not None:
+            while self.busy() and time.time() - start < max_busy_wait:
+                time.sleep(0.5)
+        self.paused_seconds += time.time() - start
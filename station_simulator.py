@@ -0,0 +1,435 @@
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from datalog_generator import format_serials
+from share_manifest import ManifestAgent
+
+# Simulated production lines: images per minute (Poisson arrivals), plus a burst of
+# burst_size images every burst_interval seconds (e.g. a station flushing its buffer)
+SIMULATED_LINES = [
+    {'alias': 'Galaxy', 'suffix': 'GAL', 'images_per_minute': 60, 'burst_interval': 120, 'burst_size': 20},
+    {'alias': 'Jigani', 'suffix': 'JIG', 'images_per_minute': 60, 'burst_interval': 120, 'burst_size': 20},
+    {'alias': 'vega', 'suffix': 'VEGA', 'images_per_minute': 60, 'burst_interval': 120, 'burst_size': 20},
+    {'alias': 'Mecury', 'suffix': 'MERC', 'images_per_minute': 60, 'burst_interval': 120, 'burst_size': 20},
+]
+
+# Sample images the simulated stations write, by (stage, bad)
+SAMPLE_IMAGE_FOLDERS = {
+    ('PreEL', False): 'source_images/Jinchen_PreEL_Vega',
+    ('PreEL', True): 'source_images/Jinchen_PreEL_Vega_bad',
+    ('PostEL', False): 'source_images/Jinchen_Vega_PostEL',
+    ('PostEL', True): 'source_images/Jinchen_Vega_PostEL_bad',
+}
+
+# Station folder names on the share, as used by the EL stations
+STATION_FOLDERS = {
+    ('PreEL', False): 'Jinchen_PreEL_{alias}',
+    ('PreEL', True): 'Jinchen_PreEL_{alias}_bad',
+    ('PostEL', False): 'Jinchen_{alias}_PostEL',
+    ('PostEL', True): 'Jinchen_{alias}_PostEL_bad',
+}
+
+# Quality letter in the station file name (Z = NG, A = PostEL normal, B = PreEL normal)
+QUALITY_LETTERS = {
+    ('PreEL', False): 'B',
+    ('PreEL', True): 'Z',
+    ('PostEL', False): 'A',
+    ('PostEL', True): 'Z',
+}
+
+STATION_CODE = 'JIN'
+
+# Share of modules written to the _bad folders
+ng_rate = 0.05
+
+# Share of images written slowly: the first part, a pause, then the rest
+partial_write_rate = 0.1
+partial_write_delay = 2.0
+
+# Bytes per write call (stations write over SMB in chunks)
+write_chunk_size = 64 * 1024
+
+# Run a manifest agent (share_manifest.ManifestAgent) on every stand-in share, as a station PC would
+run_manifest_agents = False
+
+# First serial of the first simulated line; each line gets its own range
+simulator_start_serial = 0x900000
+serials_per_line = 0x10000
+
+# Seconds the collector gets to connect and sync before the stations start writing
+collector_startup_delay = 5
+
+def load_sample_images():
+    """Read the sample images into memory, by (stage, bad)."""
+    samples = {}
+    for key, folder in SAMPLE_IMAGE_FOLDERS.items():
+        samples[key] = []
+        for file_name in sorted(os.listdir(folder)):
+            if file_name.lower().endswith(('.jpg', '.jpeg')):
+                with open(os.path.join(folder, file_name), 'rb') as f:
+                    samples[key].append(f.read())
+        if not samples[key]:
+            raise ValueError(f"No sample images found in {folder}")
+    return samples
+
+def get_station_path(share_folder, alias, serial, stage, bad, captured_at):
+    """Path an EL station writes an image to: share/YYYY/MM/DD/station folder/SERIAL_JIN_Q_YYMMDD_HHMMSS.jpg"""
+    file_name = f"{serial}_{STATION_CODE}_{QUALITY_LETTERS[(stage, bad)]}_{captured_at.strftime('%y%m%d_%H%M%S')}.jpg"
+    return os.path.join(share_folder, captured_at.strftime('%Y'), captured_at.strftime('%m'), captured_at.strftime('%d'),
+                        STATION_FOLDERS[(stage, bad)].format(alias=alias), file_name)
+
+def write_image(file_path, data, pause_after=None):
+    """
+    Write image bytes in chunks, optionally pausing once part of the file is on disk.
+
+    Args:
+        pause_after (int): Byte count after which to pause for partial_write_delay (None for no pause)
+    """
+    with open(file_path, 'wb') as f:
+        for start in range(0, len(data), write_chunk_size):
+            if pause_after is not None and start <= pause_after < start + write_chunk_size:
+                f.write(data[start:pause_after])
+                f.flush()
+                time.sleep(partial_write_delay)
+                f.write(data[pause_after:start + write_chunk_size])
+            else:
+                f.write(data[start:start + write_chunk_size])
+
+class StationSimulator(threading.Thread):
+    """Writes EL images for one production line into its stand-in share folder."""
+
+    def __init__(self, line, share_root, samples, duration, records, records_lock, start_serial, seed=None):
+        super().__init__(daemon=True)
+        self.line = line
+        self.alias = line['alias']
+        self.share_folder = os.path.join(share_root, self.alias)
+        self.samples = samples
+        self.duration = duration
+        self.records = records
+        self.records_lock = records_lock
+        self.next_serial = start_serial
+        self.rng = random.Random(seed)
+        self.stop_event = threading.Event()
+
+    def write_next_image(self):
+        """Write one image with a new serial into a station folder."""
+        stage = 'PreEL' if self.rng.random() < 0.5 else 'PostEL'
+        bad = self.rng.random() < ng_rate
+        serial = format_serials([self.next_serial])[0]
+        self.next_serial += 1
+
+        file_path = get_station_path(self.share_folder, self.alias, serial, stage, bad, datetime.now())
+        file_name = os.path.basename(file_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        data = self.rng.choice(self.samples[(stage, bad)])
+        partial = self.rng.random() < partial_write_rate
+        started_at = time.time()
+        write_image(file_path, data, self.rng.randrange(1, len(data)) if partial else None)
+
+        with self.records_lock:
+            self.records[file_name] = {
+                'line': self.alias,
+                'path': file_path,
+                'size': len(data),
+                'partial': partial,
+                'started_at': started_at,
+                'written_at': time.time(),
+            }
+
+    def run(self):
+        rate = self.line.get('images_per_minute', 60) / 60.0
+        burst_interval = self.line.get('burst_interval')
+        start = time.time()
+        end = start + self.duration
+        next_burst = start + burst_interval if burst_interval else float('inf')
+        next_arrival = start + self.rng.expovariate(rate)
+
+        while not self.stop_event.is_set():
+            next_event = min(next_arrival, next_burst)
+            if next_event >= end:
+                break
+            if self.stop_event.wait(max(next_event - time.time(), 0)):
+                break
+            try:
+                if next_burst <= next_arrival:
+                    for _ in range(self.line.get('burst_size', 0)):
+                        self.write_next_image()
+                    next_burst += burst_interval
+                else:
+                    self.write_next_image()
+                    next_arrival += self.rng.expovariate(rate)
+            except Exception as e:
+                print(f"[{self.alias}] Simulator error: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+
+class OutputWatcher(FileSystemEventHandler):
+    """Records when each collector output file was first and last seen changing."""
+
+    def __init__(self):
+        self.copies = {}
+        self.lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ('created', 'modified', 'closed'):
+            return
+        if not event.src_path.lower().endswith(('.jpg', '.jpeg')):
+            return
+        now = time.time()
+        with self.lock:
+            copy = self.copies.setdefault(event.src_path, {'first_seen': now, 'last_seen': now})
+            copy['last_seen'] = now
+
+def get_station_filename(output_filename):
+    """Station file name of a collector output file (ORIGINAL_SUFFIX_QUALITY_YYMMDD_HHMMSS.ext)."""
+    name_without_ext, extension = os.path.splitext(output_filename)
+    parts = name_without_ext.rsplit('_', 4)
+    return f"{parts[0]}{extension}" if len(parts) == 5 else output_filename
+
+def percentile(values, q):
+    """Percentile of a list, or None when it is empty."""
+    return float(np.percentile(values, q)) if values else None
+
+def build_report(records, copies):
+    """
+    Match collector output files to the images the stations wrote.
+
+    Latency runs from the moment a station finished writing an image to the last change of its copy.
+
+    Returns:
+        dict: Per line (and 'ALL'): written, copied, missing, truncated, latency percentiles, files/s
+    """
+    copied = {}
+    for dest_path, copy in copies.items():
+        station_name = get_station_filename(os.path.basename(dest_path))
+        if station_name in records:
+            copied[station_name] = (dest_path, copy)
+
+    lines = sorted({record['line'] for record in records.values()})
+    report = {}
+    for line in lines + ['ALL']:
+        line_records = {name: record for name, record in records.items() if line in ('ALL', record['line'])}
+        latencies = []
+        truncated = 0
+        first_write = None
+        last_copy = None
+        for name, record in line_records.items():
+            first_write = min(first_write or record['started_at'], record['started_at'])
+            if name not in copied:
+                continue
+            dest_path, copy = copied[name]
+            last_copy = max(last_copy or copy['last_seen'], copy['last_seen'])
+            try:
+                if os.path.getsize(dest_path) != record['size']:
+                    truncated += 1
+                    continue
+            except OSError:
+                continue
+            latencies.append(copy['last_seen'] - record['written_at'])
+
+        copied_count = sum(1 for name in line_records if name in copied)
+        elapsed = (last_copy - first_write) if last_copy and first_write else None
+        report[line] = {
+            'written': len(line_records),
+            'copied': copied_count,
+            'missing': len(line_records) - copied_count,
+            'truncated': truncated,
+            'partial_writes': sum(1 for record in line_records.values() if record['partial']),
+            'latency_p50': percentile(latencies, 50),
+            'latency_p95': percentile(latencies, 95),
+            'latency_p99': percentile(latencies, 99),
+            'latency_max': max(latencies) if latencies else None,
+            'files_per_second': copied_count / elapsed if elapsed else None,
+        }
+    return report
+
+def print_report(report):
+    """Print the per-line latency and throughput report."""
+    def seconds(value):
+        return f"{value:.3f}s" if value is not None else '-'
+
+    print(f"\n{'='*60}")
+    print("COLLECTOR LATENCY REPORT")
+    print(f"{'='*60}")
+    for line, stats in report.items():
+        rate = f"{stats['files_per_second']:.2f}" if stats['files_per_second'] else '-'
+        print(f"[{line}] written: {stats['written']} (partial writes: {stats['partial_writes']}), "
+              f"copied: {stats['copied']}, missing: {stats['missing']}, truncated copies: {stats['truncated']}")
+        print(f"  latency p50: {seconds(stats['latency_p50'])}, p95: {seconds(stats['latency_p95'])}, "
+              f"p99: {seconds(stats['latency_p99'])}, max: {seconds(stats['latency_max'])}, files/s: {rate}")
+    print(f"{'='*60}\n")
+
+def run_stations(share_root, duration, lines=None, seed=None):
+    """
+    Run one station simulator per line until duration seconds have passed.
+
+    Returns:
+        dict: Station file name -> write record
+    """
+    lines = lines or SIMULATED_LINES
+    samples = load_sample_images()
+    records = {}
+    records_lock = threading.Lock()
+
+    simulators = []
+    agents = []
+    for i, line in enumerate(lines):
+        os.makedirs(os.path.join(share_root, line['alias']), exist_ok=True)
+        if run_manifest_agents:
+            agents.append(ManifestAgent(os.path.join(share_root, line['alias'])))
+        simulators.append(StationSimulator(
+            line, share_root, samples, duration, records, records_lock,
+            start_serial=simulator_start_serial + i * serials_per_line,
+            seed=None if seed is None else seed + i
+        ))
+
+    for worker in agents + simulators:
+        worker.start()
+    try:
+        for simulator in simulators:
+            while simulator.is_alive():
+                simulator.join(timeout=1)
+    except KeyboardInterrupt:
+        for simulator in simulators:
+            simulator.stop()
+        for simulator in simulators:
+            simulator.join()
+    finally:
+        for agent in agents:
+            agent.stop()
+
+    print(f"Stations wrote {len(records)} images into {share_root}")
+    return records
+
+def run_simulation(share_root, output_folder, duration, drain_time=30, lines=None, seed=None):
+    """
+    Drive a collector that is already running against the stand-in shares, and measure its output.
+
+    Args:
+        share_root (str): Folder holding one stand-in share folder per line alias
+        output_folder (str): The collector's centralized folder
+        duration (float): Seconds the stations keep writing
+        drain_time (float): Seconds to keep watching the output after the stations stop
+
+    Returns:
+        dict: Report from build_report
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    watcher = OutputWatcher()
+    observer = Observer()
+    observer.schedule(watcher, output_folder, recursive=True)
+    observer.start()
+    try:
+        records = run_stations(share_root, duration, lines, seed)
+        time.sleep(drain_time)
+    finally:
+        observer.stop()
+        observer.join()
+
+    report = build_report(records, watcher.copies)
+    print_report(report)
+    return report
+
+def configure_collector(bench_root, lines=None):
+    """
+    Point collectionwitharch at local stand-in shares, output, archive and index under bench_root.
+
+    Returns:
+        tuple: (collectionwitharch module, share root, centralized folder)
+    """
+    import collectionwitharch as collector
+    import image_previews
+    import el_pairing
+
+    lines = lines or SIMULATED_LINES
+    share_root = os.path.join(bench_root, 'shares')
+    output_folder = os.path.join(bench_root, 'Data_processed_new')
+    for line in lines:
+        os.makedirs(os.path.join(share_root, line['alias']), exist_ok=True)
+    os.makedirs(output_folder, exist_ok=True)
+
+    collector.PRODUCTION_LINES = [
+        {'alias': line['alias'], 'suffix': line['suffix'], 'share_path': os.path.join(share_root, line['alias'])}
+        for line in lines
+    ]
+    collector.share_backend_name = 'local'
+    collector.share_backend = None
+    collector.centralized_folder = output_folder
+    collector.archive_base_folder = os.path.join(output_folder, 'archive')
+    collector.module_index_path = os.path.join(bench_root, 'module_index.db')
+    collector.quarantine_folder = os.path.join(bench_root, 'quarantine')
+    if collector.module_index is not None:
+        collector.module_index.close()
+    collector.module_index = None
+    collector.journal_path = os.path.join(bench_root, 'fs_journal.db')
+    if collector.journal is not None:
+        collector.journal.close()
+    collector.journal = None
+    collector.latency_db_path = os.path.join(bench_root, 'latency.db')
+    collector.close_latency_tracker()
+    collector.transfer_limiter = None
+    collector.ingest_queue_path = os.path.join(bench_root, 'ingest_queue.db')
+    collector.close_ingest_queue()
+    # The ingest workers get these settings from this process (see ingest_workers.get_worker_config)
+    image_previews.preview_cache_folder = os.path.join(bench_root, 'preview_cache')
+    el_pairing.pair_diff_folder = os.path.join(bench_root, 'el_pairs')
+    # No archival mid-run: it would move output files away while they are measured
+    collector.archive_at_shift_end = False
+    collector.shift_state_path = os.path.join(bench_root, 'shift_state.json')
+    collector.processed_files.clear()
+    collector.in_flight_files.clear()
+    collector.validation_failures.clear()
+    collector.cancel_validation_retries()
+    collector.corruption_counts.clear()
+    return collector, share_root, output_folder
+
+def run_collector_benchmark(bench_root, duration, drain_time=30, lines=None, seed=None, core='threads'):
+    """
+    Run a collector against local stand-in shares under bench_root while the stations write,
+    then stop it and report latency and throughput.
+
+    Args:
+        core (str): 'threads' for collectionwitharch.start_monitoring, 'async' for async_collector
+
+    Returns:
+        dict: Report from build_report
+    """
+    lines = lines or SIMULATED_LINES
+    collector, share_root, output_folder = configure_collector(bench_root, lines)
+    result = {}
+
+    def drive():
+        time.sleep(collector_startup_delay)
+        try:
+            result['report'] = run_simulation(share_root, output_folder, duration, drain_time, lines, seed)
+        finally:
+            # start_monitoring stops on SIGINT
+            signal.raise_signal(signal.SIGINT)
+
+    driver = threading.Thread(target=drive, daemon=True)
+    driver.start()
+    if core == 'async':
+        import async_collector
+        async_collector.start_monitoring()
+    else:
+        collector.start_monitoring()
+    driver.join()
+    return result.get('report')
+
+# Parameters
+bench_root = "D:\\ELimagesnew\\simulator"
+duration = 300
+drain_time = 30
+seed = None
+collector_core = 'threads'
+
+if __name__ == "__main__":
+    run_collector_benchmark(bench_root, duration, drain_time, seed=seed, core=collector_core)
@@ -0,0 +1,186 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from module_index import ModuleIndex, parse_el_filename, IMAGE_EXTENSIONS
+from shift_schedule import get_shift_name
+from fs_walker import walk_files
+import cold_compression
+
+# Storage tiers: hot is the centralized folder (images of the running shifts), warm the
+# archive on the same fast local disk, cold a bulk volume that archived shifts age out to
+warm_archive_folder = "D:\\ELimagesnew\\Data_processed_new\\archive"
+cold_archive_folder = "E:\\ELimages_cold"
+
+# Archived images older than this move from warm to cold
+warm_days = 30
+
+# Warm tier size limit in GB (None for no limit); above it the least recently used images
+# move to cold even if they are younger than warm_days
+warm_capacity_gb = None
+
+# Images of serials looked up within this many days stay warm (and are recalled from cold)
+recent_access_days = 7
+
+# Losslessly recompress images after they move to cold (method and tools in cold_compression.py)
+compress_cold = False
+
+# State of the files of each tier in the collector's file journal (fs_journal.py)
+JOURNAL_STATES = {'warm': 'archive', 'cold': 'cold'}
+
+def get_tier(path):
+    """Tier of a path: 'cold', 'warm' or 'hot'."""
+    path = os.path.normcase(os.path.abspath(path))
+    if path.startswith(os.path.normcase(os.path.abspath(cold_archive_folder))):
+        return 'cold'
+    if path.startswith(os.path.normcase(os.path.abspath(warm_archive_folder))):
+        return 'warm'
+    return 'hot'
+
+def move_file(source_file, dest_file, module_index, tier, journal=None):
+    """
+    Move a file between tiers, crash-safe: copy, verify, record the redirect, then delete.
+
+    A crash before the redirect is recorded leaves an extra copy on the destination tier,
+    never a catalog entry pointing at a missing file. With a file journal, the move is
+    journaled too, so the file still counts as collected.
+    """
+    os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+    shutil.copy2(source_file, dest_file)
+    if os.path.getsize(dest_file) != os.path.getsize(source_file):
+        os.remove(dest_file)
+        raise IOError(f"Size mismatch after copying {source_file} to {dest_file}")
+    module_index.add_redirect(source_file, dest_file, tier)
+    os.remove(source_file)
+    if journal is not None:
+        journal.record_move(source_file, dest_file, JOURNAL_STATES[tier])
+
+def list_warm_images(folder=None):
+    """
+    List the images on the warm tier.
+
+    Returns:
+        list: (path, size, mtime, serial) tuples
+    """
+    images = []
+    for record in walk_files(folder or warm_archive_folder, IMAGE_EXTENSIONS):
+        info = parse_el_filename(record.name)
+        images.append((record.path, record.size, record.mtime, info['serial'] if info else None))
+    return images
+
+def select_for_cold(images, recent_serials, last_access, now=None):
+    """
+    Choose the warm images to move to cold.
+
+    Images older than warm_days go, except those of recently used serials. If the warm tier
+    is still above warm_capacity_gb, more images go in least recently used order (serial
+    last looked up, then image age), recently used serials last.
+
+    Returns:
+        list: The selected image tuples
+    """
+    now = now or datetime.now()
+    cutoff = (now - timedelta(days=warm_days)).timestamp()
+    selected = [image for image in images if image[2] < cutoff and image[3] not in recent_serials]
+
+    if warm_capacity_gb is not None:
+        capacity = warm_capacity_gb * 1024 ** 3
+        remaining = sum(image[1] for image in images) - sum(image[1] for image in selected)
+        chosen = {image[0] for image in selected}
+
+        def lru_key(image):
+            return (image[3] in recent_serials, last_access.get(image[3], ''), image[2])
+
+        for image in sorted((image for image in images if image[0] not in chosen), key=lru_key):
+            if remaining <= capacity:
+                break
+            selected.append(image)
+            remaining -= image[1]
+    return selected
+
+def run_tiering(module_index, warm_folder=None, cold_folder=None, throttle=None, journal=None):
+    """
+    Move aged and least recently used images from the warm archive to the cold volume.
+
+    The relative archive path is kept on cold, and the module index is updated through its
+    redirect table, so lookups keep finding the images.
+
+    Returns:
+        dict: shift name -> (files moved, bytes moved)
+    """
+    warm_folder = warm_folder or warm_archive_folder
+    cold_folder = cold_folder or cold_archive_folder
+    since = datetime.now() - timedelta(days=recent_access_days)
+    recent_serials = module_index.get_recent_serials(since)
+    last_access = module_index.get_last_access()
+    selected = select_for_cold(list_warm_images(warm_folder), recent_serials, last_access)
+    print(f"Tiering: {len(selected)} images to move from {warm_folder} to {cold_folder}")
+
+    moved = {}
+    for file_path, size, mtime, serial in selected:
+        dest_file = os.path.join(cold_folder, os.path.relpath(file_path, warm_folder))
+        try:
+            if throttle is not None:
+                throttle.wait()
+            move_file(file_path, dest_file, module_index, 'cold', journal)
+        except Exception as e:
+            print(f"Error moving {file_path} to cold storage: {e}")
+            continue
+        shift = get_shift_name(datetime.fromtimestamp(mtime))
+        files, total = moved.get(shift, (0, 0))
+        moved[shift] = (files + 1, total + size)
+
+    for shift, (files, total) in sorted(moved.items()):
+        print(f"  Shift {shift}: {files} images, {total / (1024 * 1024):.1f} MB moved to cold")
+    if compress_cold and moved:
+        cold_compression.compress_folder(module_index, cold_folder)
+    return moved
+
+def recall_serial(module_index, serial, warm_folder=None, cold_folder=None, journal=None):
+    """
+    Move the cold images of a module back to the warm tier (for a module under active review).
+
+    Returns:
+        int: Number of images recalled
+    """
+    warm_folder = warm_folder or warm_archive_folder
+    cold_folder = cold_folder or cold_archive_folder
+    recalled = 0
+    for stage_images in module_index.lookup(serial)['images'].values():
+        for image in stage_images:
+            if get_tier(image['path']) != 'cold' or not os.path.exists(image['path']):
+                continue
+            dest_file = os.path.join(warm_folder, os.path.relpath(image['path'], cold_folder))
+            try:
+                if image['path'].lower().endswith('.jxl'):
+                    # Recompressed on cold: rebuild the original JPEG on warm
+                    dest_file = os.path.splitext(dest_file)[0] + '.jpg'
+                    os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+                    cold_compression.restore_jpeg(image['path'], dest_file)
+                    shutil.copystat(image['path'], dest_file)
+                    module_index.add_redirect(image['path'], dest_file, 'warm')
+                    os.remove(image['path'])
+                    if journal is not None:
+                        journal.record_move(image['path'], dest_file, JOURNAL_STATES['warm'])
+                else:
+                    move_file(image['path'], dest_file, module_index, 'warm', journal)
+                recalled += 1
+            except Exception as e:
+                print(f"Error recalling {image['path']}: {e}")
+    if recalled:
+        print(f"Recalled {recalled} images of {serial} to {warm_folder}")
+    return recalled
+
+def recall_recent(module_index, warm_folder=None, cold_folder=None, journal=None):
+    """Recall the cold images of every serial looked up within recent_access_days."""
+    since = datetime.now() - timedelta(days=recent_access_days)
+    return sum(recall_serial(module_index, serial, warm_folder, cold_folder, journal)
+               for serial in module_index.get_recent_serials(since))
+
+if __name__ == "__main__":
+    index = ModuleIndex()
+    try:
+        recall_recent(index)
+        run_tiering(index)
+    finally:
+        index.close()
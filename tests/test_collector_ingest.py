@@ -0,0 +1,99 @@
+import os
+import shutil
+import time
+
+import pytest
+
+import el_pairing
+import ingest_workers
+import station_simulator
+from ingest_queue import IngestQueue
+from ingest_workers import IngestWorkerPool
+from module_index import ModuleIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_IMAGES = os.path.join(ROOT, 'source_images')
+
+@pytest.fixture
+def collector(tmp_path):
+    """collectionwitharch configured on stand-in shares under tmp_path, closed afterwards."""
+    collector, _, _ = station_simulator.configure_collector(str(tmp_path), [{'alias': 'L1', 'suffix': 'L1S'}])
+    yield collector
+    collector.close_ingest_queue()
+    collector.close_latency_tracker()
+    for name in ('module_index', 'journal'):
+        if getattr(collector, name) is not None:
+            getattr(collector, name).close()
+            setattr(collector, name, None)
+    if ingest_workers.worker_index is not None:
+        ingest_workers.worker_index.close()
+        ingest_workers.worker_index = None
+
+def write_station_file(collector, folder, file_name):
+    """Put a sample image on the stand-in share of line L1, as a station would."""
+    share_path = collector.get_share_path(collector.PRODUCTION_LINES[0])
+    station_file = os.path.join(share_path, folder, file_name)
+    os.makedirs(os.path.dirname(station_file), exist_ok=True)
+    shutil.copy(os.path.join(SOURCE_IMAGES, folder, file_name), station_file)
+    return station_file
+
+def run_queued_jobs(collector, kind):
+    """Run the queued jobs of a kind in this process, the way a worker process would."""
+    ingest_workers.apply_worker_config(ingest_workers.get_worker_config(collector.module_index_path))
+    queue = collector.get_ingest_queue()
+    results = []
+    for job in queue.claim('test', [kind], 100):
+        result = ingest_workers.run_job(job)
+        queue.complete(job['id'], result)
+        results.append(result)
+    return results
+
+def test_copied_images_get_perceptual_hashes(collector):
+    station_file = write_station_file(collector, 'Jinchen_PreEL_Vega', 'A7BFB1A_JIN_B_240601_054723.jpg')
+    dest_file = collector.copy_to_central(station_file, collector.PRODUCTION_LINES[0])
+
+    assert 'perceptual_hash' in collector.ingest_job_kinds
+    results = run_queued_jobs(collector, 'perceptual_hash')
+    assert len(results) == 1
+
+    index = ModuleIndex(collector.module_index_path)
+    try:
+        rows = index.get_image_hashes()
+    finally:
+        index.close()
+    assert [row['path'] for row in rows] == [dest_file]
+    assert rows[0]['serial'] == 'A7BFB1A'
+
+def test_worker_processes_pair_new_images_with_the_parent_settings(collector, tmp_path, monkeypatch):
+    # Set here only: a spawned worker sees it through the worker config
+    monkeypatch.setattr(el_pairing, 'pair_diff_folder', os.path.join(tmp_path, 'pairs_from_parent'))
+    line = collector.PRODUCTION_LINES[0]
+    pre_file = collector.copy_to_central(
+        write_station_file(collector, 'Jinchen_PreEL_Vega', 'A7BFB1A_JIN_B_240601_054723.jpg'), line)
+    post_file = collector.copy_to_central(
+        write_station_file(collector, 'Jinchen_Vega_PostEL', 'A7BFB1A_JIN_A_240601_085813.jpg'), line)
+    collector.close_ingest_queue()
+
+    pool = IngestWorkerPool(collector.ingest_queue_path, workers=1, kinds=['el_pair'],
+                            index_path=collector.module_index_path)
+    pool.start()
+    queue = IngestQueue(collector.ingest_queue_path)
+    try:
+        deadline = time.time() + 60
+        while time.time() < deadline and queue.counts().get(('el_pair', 'done'), 0) < 2:
+            time.sleep(0.2)
+        counts = queue.counts()
+    finally:
+        pool.stop()
+        queue.close()
+    assert counts.get(('el_pair', 'done')) == 2
+
+    index = ModuleIndex(collector.module_index_path)
+    try:
+        pairs = index.lookup('A7BFB1A')['el_pairs']
+    finally:
+        index.close()
+    assert len(pairs) == 1
+    assert (pairs[0]['pre_path'], pairs[0]['post_path']) == (pre_file, post_file)
+    assert os.path.dirname(pairs[0]['diff_path']) == el_pairing.pair_diff_folder
+    assert os.path.exists(pairs[0]['diff_path'])
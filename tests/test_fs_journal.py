@@ -0,0 +1,118 @@
+import os
+import shutil
+import time
+
+import pytest
+
+import fs_journal
+from fs_journal import FileJournal
+
+# Directory mtimes are set explicitly, in the past, so every checkpoint has settled
+SETTLED_TIME = time.time() - 3600
+
+def describe(path):
+    """Alias from the folder below the root; .tmp files are not journaled."""
+    if path.endswith('.tmp'):
+        return None, None, None
+    parts = path.split(os.sep)
+    return parts[-3], 'central', os.path.basename(path)
+
+def write_file(path, data=b'x'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def settle(root, offset=0):
+    """Give every folder under root a settled mtime (offset makes it differ from the last one)."""
+    for folder, _, _ in os.walk(root):
+        os.utime(folder, (SETTLED_TIME + offset, SETTLED_TIME + offset))
+
+@pytest.fixture
+def store(tmp_path):
+    root = os.path.join(tmp_path, 'central')
+    for alias in ('L1', 'L2'):
+        for day in ('d1', 'd2'):
+            for i in range(3):
+                write_file(os.path.join(root, alias, day, f"{alias}_{day}_{i}.jpg"))
+    write_file(os.path.join(root, 'L1', 'd1', 'partial.tmp'))
+    settle(root)
+    journal = FileJournal(os.path.join(tmp_path, 'fs_journal.db'))
+    yield root, journal
+    journal.close()
+
+def test_first_reconcile_journals_every_file(store):
+    root, journal = store
+    stats = journal.reconcile([root], describe)
+
+    assert stats['files_added'] == 12
+    assert stats['dirs_listed'] == 7
+    assert journal.count_files('L1', 'central') == 6
+    assert journal.list_files('L2', 'central')[0] == os.path.join(root, 'L2', 'd1', 'L2_d1_0.jpg')
+    assert not journal.has_file('L1', 'partial.tmp')
+
+def test_unchanged_folders_are_not_listed_again(store):
+    root, journal = store
+    journal.reconcile([root], describe)
+
+    stats = journal.reconcile([root], describe)
+    assert stats == {'dirs_checked': 7, 'dirs_listed': 0, 'files_added': 0, 'files_removed': 0}
+
+def test_changes_made_outside_the_collector_are_picked_up(store):
+    root, journal = store
+    journal.reconcile([root], describe)
+
+    write_file(os.path.join(root, 'L1', 'd2', 'new.jpg'))
+    os.remove(os.path.join(root, 'L2', 'd1', 'L2_d1_0.jpg'))
+    shutil.rmtree(os.path.join(root, 'L2', 'd2'))
+    write_file(os.path.join(root, 'L2', 'd3', 'moved_in.jpg'))
+    settle(root, offset=10)
+
+    stats = journal.reconcile([root], describe)
+    assert stats['files_added'] == 2
+    assert stats['files_removed'] == 1
+    assert journal.has_file('L1', 'new.jpg', 'central')
+    assert not journal.has_file('L2', 'L2_d1_0.jpg')
+    assert journal.list_files('L2', 'central') == [
+        os.path.join(root, 'L2', 'd1', 'L2_d1_1.jpg'),
+        os.path.join(root, 'L2', 'd1', 'L2_d1_2.jpg'),
+        os.path.join(root, 'L2', 'd3', 'moved_in.jpg'),
+    ]
+    # The removed folder is forgotten with its files
+    assert journal.reconcile([root], describe)['dirs_checked'] == 7
+
+def test_files_journaled_by_the_collector_are_kept(store):
+    root, journal = store
+    journal.reconcile([root], describe)
+
+    path = os.path.join(root, 'L1', 'd1', 'copied.jpg')
+    write_file(path)
+    journal.record_create(path, 'L1', 'central', 'station.jpg', '/share/station.jpg')
+    settle(root, offset=10)
+
+    stats = journal.reconcile([root], describe)
+    assert stats['files_added'] == 0
+    assert journal.has_file('L1', 'station.jpg', 'central')
+    assert '/share/station.jpg' in journal.get_sources()
+
+def test_recently_modified_folders_are_listed_until_settled(store, monkeypatch):
+    root, journal = store
+    monkeypatch.setattr(fs_journal, 'mtime_settle_seconds', 3600 * 24)
+    # Nothing has settled, so nothing is checkpointed
+    journal.reconcile([root], describe)
+    assert journal.reconcile([root], describe)['dirs_listed'] == 7
+
+    monkeypatch.setattr(fs_journal, 'mtime_settle_seconds', 0)
+    journal.reconcile([root], describe)
+    assert journal.reconcile([root], describe)['dirs_listed'] == 0
+
+def test_roots_no_longer_reconciled_are_dropped(store, tmp_path):
+    root, journal = store
+    other_root = os.path.join(tmp_path, 'archive')
+    write_file(os.path.join(other_root, 'L1', 'd1', 'archived.jpg'))
+    settle(other_root)
+    journal.reconcile([root, other_root], describe)
+    assert journal.has_file('L1', 'archived.jpg')
+
+    journal.reconcile([root], describe)
+    assert not journal.has_file('L1', 'archived.jpg')
+    assert journal.count_files('L1', 'central') == 6
@@ -0,0 +1,64 @@
+import numpy as np
+
+import image_hashes
+from image_hashes import HammingIndex
+
+def brute_force(values, query, max_distance):
+    matches = []
+    for i, value in enumerate(values):
+        distance = bin(value ^ query).count('1')
+        if distance <= max_distance:
+            matches.append((i, distance))
+    return matches
+
+def flip_bits(value, rng, count):
+    for bit in rng.choice(64, count, replace=False):
+        value ^= 1 << int(bit)
+    return value
+
+def make_hashes(rng, count):
+    """Random hashes plus near-duplicates of some of them at 0-12 bits."""
+    values = [int(value) for value in rng.integers(0, 1 << 64, count, dtype=np.uint64)]
+    for i in range(count // 2):
+        values.append(flip_bits(values[i], rng, int(rng.integers(0, 13))))
+    return values
+
+def test_search_matches_brute_force():
+    rng = np.random.default_rng(7)
+    values = make_hashes(rng, 400)
+    index = HammingIndex()
+    for value in values:
+        index.add(value)
+    index.rebuild()
+
+    for query_id in range(0, len(values), 7):
+        query = flip_bits(values[query_id], rng, int(rng.integers(0, 4)))
+        for max_distance in (0, 3, 4, 7, 10, 12):
+            found = index.search(query, max_distance)
+            assert sorted(found) == brute_force(values, query, max_distance)
+            # Nearest first
+            assert [distance for _, distance in found] == sorted(distance for _, distance in found)
+
+def test_search_covers_hashes_added_after_rebuild(monkeypatch):
+    monkeypatch.setattr(image_hashes, 'rebuild_threshold', 1000)
+    rng = np.random.default_rng(11)
+    values = make_hashes(rng, 200)
+    index = HammingIndex(blocks=8)
+    for value in values[:150]:
+        index.add(value)
+    index.rebuild()
+    for value in values[150:]:
+        index.add(value)
+    assert len(index) == len(values)
+
+    for query in values[::5]:
+        assert sorted(index.search(query, 9)) == brute_force(values, query, 9)
+
+def test_search_handles_top_bit_hashes():
+    values = [(1 << 64) - 1, 1 << 63, ((1 << 64) - 1) ^ 0b101]
+    index = HammingIndex()
+    for value in values:
+        index.add(value)
+    index.rebuild()
+    assert sorted(index.search(values[0], 2)) == [(0, 0), (2, 2)]
+    assert index.search(1 << 63, 0) == [(1, 0)]
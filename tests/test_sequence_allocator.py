@@ -0,0 +1,60 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from sequence_allocator import SequenceAllocator
+
+def allocate_numbers(counter_path, count):
+    """Draw numbers from a fresh allocator (run in a separate process)."""
+    allocator = SequenceAllocator(counter_path, block_size=7)
+    numbers = [allocator.next() for _ in range(count)]
+    numbers.extend(allocator.take(3))
+    return numbers
+
+def test_threads_get_unique_numbers(tmp_path):
+    counter_path = os.path.join(tmp_path, 'counter.txt')
+    allocator = SequenceAllocator(counter_path, initial_number=100, block_size=5)
+    numbers = []
+    numbers_lock = threading.Lock()
+
+    def worker():
+        drawn = [allocator.next() for _ in range(50)]
+        with numbers_lock:
+            numbers.extend(drawn)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(numbers) == 400
+    assert len(set(numbers)) == 400
+    assert min(numbers) == 100
+
+def test_processes_sharing_a_counter_file_get_unique_numbers(tmp_path):
+    counter_path = os.path.join(tmp_path, 'counter.txt')
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(allocate_numbers, [counter_path] * 8, [20] * 8))
+
+    numbers = [number for result in results for number in result]
+    assert len(numbers) == 8 * 23
+    assert len(set(numbers)) == len(numbers)
+
+def test_counter_file_persists_across_allocators(tmp_path):
+    counter_path = os.path.join(tmp_path, 'counter.txt')
+    scans = []
+
+    def initial_number():
+        scans.append(1)
+        return 42
+
+    first = SequenceAllocator(counter_path, initial_number=initial_number, block_size=10)
+    assert first.next() == 42
+    assert first.peek() == 52
+
+    second = SequenceAllocator(counter_path, initial_number=initial_number)
+    assert list(second.take(2)) == [52, 53]
+    assert first.next() == 43
+    # The initial scan only runs while the counter file does not exist
+    assert len(scans) == 1
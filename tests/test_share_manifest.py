@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+import share_manifest
+from share_manifest import build_manifest, write_manifest, list_share_files
+
+# The agent's snapshot, in the past so every mtime can be placed before or after it
+SNAPSHOT_TIME = time.time() - 60
+
+def write_file(path, mtime, data=b'\xff\xd8\xff\xd9'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+
+def set_mtime(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+def take_snapshot(share_root):
+    """Write the manifest and folder list as the agent does (update_manifest), at SNAPSHOT_TIME."""
+    folders = {}
+    rows = build_manifest(share_root, None, SNAPSHOT_TIME, folders)
+    write_manifest(share_root, rows, SNAPSHOT_TIME, folders)
+    return rows, folders
+
+def listed_paths(share_root):
+    return sorted(os.path.relpath(record.path, share_root)
+                  for record in list_share_files(share_root, ('.jpg',), max_age=3600))
+
+@pytest.fixture
+def share_root(tmp_path):
+    root = os.path.join(tmp_path, 'share')
+    before = SNAPSHOT_TIME - 100
+    write_file(os.path.join(root, 'day1', 'PreEL', 'A.jpg'), before)
+    write_file(os.path.join(root, 'day1', 'PostEL', 'B.jpg'), before)
+    os.makedirs(os.path.join(root, 'day1', 'NG'))
+    for folder in ('day1/PreEL', 'day1/PostEL', 'day1/NG', 'day1', ''):
+        set_mtime(os.path.join(root, folder), before)
+    return root
+
+def test_manifest_listing_does_not_walk_the_share(share_root):
+    take_snapshot(share_root)
+    # Gone from the share but still in the manifest: only a walk would drop it
+    os.remove(os.path.join(share_root, 'day1', 'PreEL', 'A.jpg'))
+    set_mtime(os.path.join(share_root, 'day1', 'PreEL'), SNAPSHOT_TIME - 100)
+
+    assert listed_paths(share_root) == [os.path.join('day1', 'PostEL', 'B.jpg'),
+                                        os.path.join('day1', 'PreEL', 'A.jpg')]
+
+def test_file_added_to_a_folder_that_was_empty_at_the_snapshot(share_root):
+    _, folders = take_snapshot(share_root)
+    assert folders['day1/NG'] is False
+
+    # The new file changes the mtime of its own folder only, not of day1
+    write_file(os.path.join(share_root, 'day1', 'NG', 'C.jpg'), SNAPSHOT_TIME + 10)
+    set_mtime(os.path.join(share_root, 'day1', 'NG'), SNAPSHOT_TIME + 10)
+    set_mtime(os.path.join(share_root, 'day1'), SNAPSHOT_TIME - 100)
+
+    assert os.path.join('day1', 'NG', 'C.jpg') in listed_paths(share_root)
+
+def test_file_still_being_written_at_the_snapshot(share_root):
+    # Created before the snapshot (folder mtime older) but written until after it
+    write_file(os.path.join(share_root, 'day1', 'PreEL', 'D.jpg'), SNAPSHOT_TIME + 5)
+    set_mtime(os.path.join(share_root, 'day1', 'PreEL'), SNAPSHOT_TIME - 30)
+
+    rows, folders = take_snapshot(share_root)
+    assert 'day1/PreEL/D.jpg' not in {row['path'] for row in rows}
+    assert folders['day1/PreEL'] is True
+
+    assert os.path.join('day1', 'PreEL', 'D.jpg') in listed_paths(share_root)
+
+def test_new_folders_are_walked(share_root):
+    take_snapshot(share_root)
+    write_file(os.path.join(share_root, 'day2', 'PreEL', 'E.jpg'), SNAPSHOT_TIME + 10)
+    set_mtime(os.path.join(share_root, 'day2', 'PreEL'), SNAPSHOT_TIME + 10)
+    set_mtime(os.path.join(share_root, 'day2'), SNAPSHOT_TIME + 10)
+    set_mtime(share_root, SNAPSHOT_TIME + 10)
+
+    assert os.path.join('day2', 'PreEL', 'E.jpg') in listed_paths(share_root)
+
+def test_folder_list_of_another_snapshot_falls_back_to_a_walk(share_root):
+    take_snapshot(share_root)
+    os.remove(os.path.join(share_root, 'day1', 'PreEL', 'A.jpg'))
+    set_mtime(share_manifest.get_manifest_dirs_path(share_root), SNAPSHOT_TIME - 30)
+
+    assert listed_paths(share_root) == [os.path.join('day1', 'PostEL', 'B.jpg')]
@@ -0,0 +1,89 @@
+import os
+import shutil
+import time
+
+import pytest
+
+import storage_tiers
+from fs_journal import FileJournal
+from module_index import ModuleIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_IMAGE = os.path.join(ROOT, 'source_images', 'Jinchen_PreEL_Vega', 'A7BFB1A_JIN_B_240601_054723.jpg')
+
+@pytest.fixture
+def tiers(tmp_path, monkeypatch):
+    """Warm and cold folders, module index and journal under tmp_path."""
+    warm = os.path.join(tmp_path, 'archive')
+    cold = os.path.join(tmp_path, 'cold')
+    monkeypatch.setattr(storage_tiers, 'warm_archive_folder', warm)
+    monkeypatch.setattr(storage_tiers, 'cold_archive_folder', cold)
+    monkeypatch.setattr(storage_tiers, 'compress_cold', False)
+    monkeypatch.setattr(storage_tiers, 'warm_capacity_gb', None)
+    index = ModuleIndex(os.path.join(tmp_path, 'module_index.db'))
+    journal = FileJournal(os.path.join(tmp_path, 'fs_journal.db'))
+    yield warm, cold, index, journal
+    index.close()
+    journal.close()
+
+def archive_image(warm, index, journal, serial, age_days):
+    """Put an archived PreEL image of a serial on the warm tier, as archive_files leaves it."""
+    file_name = f"{serial}_JIN_B_240601_054723.jpg"
+    path = os.path.join(warm, 'L1', 'Jinchen_PreEL_Vega', file_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.copy(SAMPLE_IMAGE, path)
+    mtime = time.time() - age_days * 86400
+    os.utime(path, (mtime, mtime))
+    index.add_image(path, 'L1', file_name)
+    journal.record_create(path, 'L1', 'archive', file_name)
+    return path
+
+def image_path(index, serial):
+    return index.lookup(serial)['images']['PreEL'][0]['path']
+
+def test_aged_images_move_to_cold_and_recall_back(tiers):
+    warm, cold, index, journal = tiers
+    old_file = archive_image(warm, index, journal, 'A7BFB10', age_days=60)
+    new_file = archive_image(warm, index, journal, 'A7BFB11', age_days=1)
+
+    moved = storage_tiers.run_tiering(index, journal=journal)
+    assert sum(files for files, _ in moved.values()) == 1
+
+    cold_file = os.path.join(cold, os.path.relpath(old_file, warm))
+    assert not os.path.exists(old_file)
+    assert os.path.getsize(cold_file) == os.path.getsize(SAMPLE_IMAGE)
+    assert os.path.exists(new_file)
+    # Lookups and the journal follow the file
+    assert image_path(index, 'A7BFB10') == cold_file
+    assert storage_tiers.get_tier(cold_file) == 'cold'
+    assert journal.has_file('L1', os.path.basename(old_file), 'cold')
+    assert not journal.has_file('L1', os.path.basename(old_file), 'archive')
+    assert journal.list_files('L1', 'archive') == [new_file]
+
+    assert storage_tiers.recall_serial(index, 'A7BFB10', journal=journal) == 1
+    assert os.path.exists(old_file)
+    assert not os.path.exists(cold_file)
+    assert image_path(index, 'A7BFB10') == old_file
+    assert journal.list_files('L1', 'archive') == sorted([old_file, new_file])
+    assert journal.list_files('L1', 'cold') == []
+
+def test_recently_used_serials_stay_warm(tiers):
+    warm, cold, index, journal = tiers
+    kept_file = archive_image(warm, index, journal, 'A7BFB12', age_days=60)
+    index.record_access('A7BFB12')
+
+    assert storage_tiers.run_tiering(index, journal=journal) == {}
+    assert os.path.exists(kept_file)
+    assert journal.list_files('L1', 'archive') == [kept_file]
+
+def test_recall_recent_brings_back_looked_up_serials(tiers):
+    warm, cold, index, journal = tiers
+    old_file = archive_image(warm, index, journal, 'A7BFB13', age_days=60)
+    storage_tiers.run_tiering(index, journal=journal)
+    assert not os.path.exists(old_file)
+
+    # lookup() records the access, as a review of the module would
+    index.lookup('A7BFB13')
+    assert storage_tiers.recall_recent(index, journal=journal) == 1
+    assert os.path.exists(old_file)
+    assert journal.has_file('L1', os.path.basename(old_file), 'archive')
@@ -0,0 +1,197 @@
+import time
+import asyncio
+import threading
+from collections import deque
+
+# Transfer limits in bytes per second and files per second (None for unlimited).
+# A production line can override its own limits with 'bandwidth_limit' / 'iops_limit' keys.
+line_bandwidth_limit = 20 * 1024 * 1024
+line_iops_limit = None
+global_bandwidth_limit = 60 * 1024 * 1024
+global_iops_limit = None
+
+# Seconds of traffic a bucket may burst after being idle
+burst_seconds = 1.0
+
+# Backlog transfers wait while live transfers are running, but never longer than this per file
+max_backlog_wait = 5.0
+
+class TokenBucket:
+    """Thread-safe token bucket. Large requests go into debt, which later requests wait out."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take 'amount' tokens now and return the seconds to wait before using them."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(-self.tokens / self.rate, 0.0)
+
+    def acquire(self, amount):
+        """Take 'amount' tokens, sleeping until they are available. Returns the seconds waited."""
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class TransferLimiter:
+    """
+    Per-line and global bandwidth/IOPS limits for copies from the shares.
+
+    Live transfers (files that just arrived) have priority: backlog transfers hold back while
+    any live transfer is running, up to max_backlog_wait per file.
+    """
+
+    def __init__(self, unlimited=False):
+        self.unlimited = unlimited
+        self.global_buckets = self.make_buckets(None, None) if unlimited else \
+            self.make_buckets(global_bandwidth_limit, global_iops_limit)
+        self.line_buckets = {}
+        self.condition = threading.Condition()
+        self.live_active = 0
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    @staticmethod
+    def make_buckets(bandwidth_limit, iops_limit):
+        return (TokenBucket(bandwidth_limit) if bandwidth_limit else None,
+                TokenBucket(iops_limit) if iops_limit else None)
+
+    def get_line_buckets(self, line):
+        alias = line['alias']
+        with self.stats_lock:
+            if alias not in self.line_buckets:
+                self.line_buckets[alias] = self.make_buckets(None, None) if self.unlimited else \
+                    self.make_buckets(line.get('bandwidth_limit', line_bandwidth_limit),
+                                      line.get('iops_limit', line_iops_limit))
+                self.stats[alias] = {'files': 0, 'bytes': 0, 'throttled_seconds': 0.0, 'backlog_wait_seconds': 0.0}
+            return self.line_buckets[alias]
+
+    def wait_for_live(self):
+        """Hold a backlog transfer back while live transfers are running."""
+        deadline = time.monotonic() + max_backlog_wait
+        with self.condition:
+            while self.live_active > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+    def begin(self, line, size, live=True):
+        """Wait until a transfer of 'size' bytes may start. Call end() when it is done."""
+        start = time.monotonic()
+        if live:
+            with self.condition:
+                self.live_active += 1
+        else:
+            self.wait_for_live()
+        backlog_wait = time.monotonic() - start
+
+        line_bandwidth, line_iops = self.get_line_buckets(line)
+        waits = [bucket.reserve(amount) for bucket, amount in (
+            (line_bandwidth, size), (line_iops, 1),
+            (self.global_buckets[0], size), (self.global_buckets[1], 1)) if bucket is not None]
+        throttle_wait = max(waits, default=0.0)
+        if throttle_wait:
+            time.sleep(throttle_wait)
+
+        with self.stats_lock:
+            stats = self.stats[line['alias']]
+            stats['files'] += 1
+            stats['bytes'] += size
+            stats['throttled_seconds'] += throttle_wait
+            stats['backlog_wait_seconds'] += backlog_wait
+
+    def end(self, live=True):
+        if live:
+            with self.condition:
+                self.live_active -= 1
+                self.condition.notify_all()
+
+    def transfer(self, line, size, live=True):
+        """Context manager around one copy: with limiter.transfer(line, size, live): copy..."""
+        return _Transfer(self, line, size, live)
+
+    def print_stats(self):
+        with self.stats_lock:
+            for alias, stats in self.stats.items():
+                print(f"  {alias}: {stats['files']} files, {stats['bytes'] / (1024 * 1024):.1f} MB, "
+                      f"throttled {stats['throttled_seconds']:.1f}s, "
+                      f"backlog held back {stats['backlog_wait_seconds']:.1f}s")
+
+class _Transfer:
+    def __init__(self, limiter, line, size, live):
+        self.limiter = limiter
+        self.line = line
+        self.size = size
+        self.live = live
+
+    def __enter__(self):
+        try:
+            self.limiter.begin(self.line, self.size, self.live)
+        except BaseException:
+            self.limiter.end(self.live)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limiter.end(self.live)
+        return False
+
+class FairTransferQueue:
+    """
+    Asyncio queue of transfers with per-line fairness and live-over-backlog priority.
+
+    Lines take turns (round robin), so one line with a large backlog cannot starve the others,
+    and any line's live files are handed out before backlog files.
+    """
+
+    def __init__(self):
+        self.live = {}
+        self.backlog = {}
+        self.live_turns = deque()
+        self.backlog_turns = deque()
+        self.available = asyncio.Condition()
+
+    def qsize(self):
+        return sum(len(q) for q in self.live.values()) + sum(len(q) for q in self.backlog.values())
+
+    def backlog_size(self):
+        return sum(len(q) for q in self.backlog.values())
+
+    async def put(self, alias, item, live=True):
+        queues, turns = (self.live, self.live_turns) if live else (self.backlog, self.backlog_turns)
+        async with self.available:
+            if alias not in queues:
+                queues[alias] = deque()
+                turns.append(alias)
+            queues[alias].append(item)
+            self.available.notify()
+
+    def take_next(self, queues, turns):
+        for _ in range(len(turns)):
+            alias = turns[0]
+            turns.rotate(-1)
+            if queues[alias]:
+                return queues[alias].popleft()
+        return None
+
+    async def get(self):
+        """Get the next item: live files first, lines in turn. Returns (item, live)."""
+        async with self.available:
+            while True:
+                item = self.take_next(self.live, self.live_turns)
+                if item is not None:
+                    return item, True
+                item = self.take_next(self.backlog, self.backlog_turns)
+                if item is not None:
+                    return item, False
+                await self.available.wait()